@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+An optional element cache used by the proxies to avoid refetching elements.
+
+"""
+import time
+import threading
+
+from codec import get_codec
+
+
+class LocalStore(object):
+    """
+    A process-local, dict-backed cache store with LRU and TTL eviction.
+
+    It has the same get/set/delete interface as a memcached client so the 
+    ElementCache can use either one.
+
+    :param max_size: The maximum number of items kept in the store. When the 
+                     store is full, the least recently used item is evicted.
+
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+
+        #: Number of items evicted to make room for new items.
+        self.evictions = 0
+
+        #: Number of items removed because their TTL expired.
+        self.expirations = 0
+
+        # format: items[key] = link, where link = [prev, next, key, value, expires]
+        # and the links form a circular list with the most recently used last
+        self.items = dict()
+        self.root = []
+        self.root[:] = [self.root, self.root, None, None, None]
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        """Returns the value for the key, or None if it's missing or expired."""
+        self.lock.acquire()
+        try:
+            link = self.items.get(key)
+            if link is None:
+                return None
+            if link[4] and link[4] < time.time():
+                self._remove(link)
+                self.expirations += 1
+                return None
+            # move it to the most-recently-used end
+            self._unlink(link)
+            self._append(link)
+            return link[3]
+        finally:
+            self.lock.release()
+
+    def set(self, key, value, time=0):
+        """Stores the value for time seconds, or until it's evicted if time is 0."""
+        expires = _expiry(time)
+        self.lock.acquire()
+        try:
+            link = self.items.get(key)
+            if link is not None:
+                self._remove(link)
+            while len(self.items) >= self.max_size:
+                self._remove(self.root[1])
+                self.evictions += 1
+            link = [None, None, key, value, expires]
+            self._append(link)
+            self.items[key] = link
+            return True
+        finally:
+            self.lock.release()
+
+    def delete(self, key):
+        """Removes the key from the store."""
+        self.lock.acquire()
+        try:
+            link = self.items.get(key)
+            if link is not None:
+                self._remove(link)
+            return True
+        finally:
+            self.lock.release()
+
+    def flush_all(self):
+        """Removes all the items from the store."""
+        self.lock.acquire()
+        try:
+            self.items.clear()
+            self.root[:] = [self.root, self.root, None, None, None]
+        finally:
+            self.lock.release()
+
+    def stats(self):
+        """Returns a dict of the store's size and eviction counters."""
+        return dict(size=len(self.items), evictions=self.evictions,
+                    expirations=self.expirations)
+
+    def _append(self, link):
+        last = self.root[0]
+        link[0], link[1] = last, self.root
+        last[1] = self.root[0] = link
+
+    def _unlink(self, link):
+        prev, next = link[0], link[1]
+        prev[1], next[0] = next, prev
+
+    def _remove(self, link):
+        self._unlink(link)
+        del self.items[link[2]]
+
+
+def _expiry(ttl):
+    if ttl:
+        return time.time() + ttl
+    return None
+
+
+class ElementCache(object):
+    """
+    Caches the raw results of elements retrieved by ID, keyed by the 
+    element's base type and ID.
+
+    The results are stored as JSON strings so each element initialized from 
+    the cache gets its own copy of the data, and so the store can be anything 
+    with a memcached-compatible get/set/delete interface.
+
+    :param store: The cache store, e.g. a LocalStore or a memcached client.
+    :param result_class: The resource's Result class.
+    :param ttl: Seconds a cached element is kept. 0 means no expiry.
+    :param namespace: Prefix for the cache keys, e.g. the graph's root URI.
+    :param codec: Optional Codec, or backend name, used to encode the results.
+
+    """
+
+    def __init__(self, store, result_class, ttl=60, namespace="bulbs", codec=None):
+        self.store = store
+        self.result_class = result_class
+        self.ttl = ttl
+        self.namespace = namespace
+        self.codec = get_codec(codec)
+
+        #: Number of lookups that were found in the cache.
+        self.hits = 0
+
+        #: Number of lookups that weren't found in the cache.
+        self.misses = 0
+
+    def get(self, base_type, _id):
+        """Returns the cached Result object for the element, or None."""
+        value = self.store.get(self.get_key(base_type, _id))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.result_class(self.codec.loads(value))
+
+    def set(self, base_type, result):
+        """Caches the Result object for the element."""
+        if result is not None:
+            key = self.get_key(base_type, result.get_id())
+            self.store.set(key, self.codec.dumps(result.raw), self.ttl)
+
+    def delete(self, base_type, _id):
+        """Removes the element from the cache."""
+        self.store.delete(self.get_key(base_type, _id))
+
+    def get_key(self, base_type, _id):
+        # memcached keys can't contain whitespace
+        key = "%s|%s|%s" % (self.namespace, base_type, _id)
+        return key.replace(" ", "_")
+
+    def stats(self):
+        """Returns a dict of the hit/miss counters and the store's counters."""
+        stats = dict(hits=self.hits, misses=self.misses)
+        store_stats = getattr(self.store, "stats", None)
+        if callable(store_stats):
+            stats.update(store_stats())
+        return stats
+
+
+def get_element_cache(config, result_class):
+    """Returns an ElementCache if config.cache_store is set; otherwise, None."""
+    if config.cache_store is None:
+        return None
+    return ElementCache(config.cache_store, result_class, config.cache_ttl, 
+                        namespace=config.root_uri, codec=config.codec)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+JSON codecs used to encode request bodies and decode response bodies.
+
+The fastest installed backend is selected when this module is imported.
+Set config.codec to a backend name or to a Codec to override it.
+
+"""
+
+
+class Codec(object):
+    """
+    A JSON backend's encode and decode functions.
+
+    :param name: The backend's name, e.g. ujson.
+    :param loads: Function that decodes a JSON str (bytes) or unicode.
+    :param dumps: Function that encodes an object as a JSON str.
+
+    """
+
+    def __init__(self,name,loads,dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return "<Codec: %s>" % self.name
+
+
+def load_ujson():
+    import ujson
+    return Codec("ujson",ujson.loads,ujson.dumps)
+
+def load_simplejson():
+    import simplejson
+    # compact separators, like ujson's, to keep request bodies small
+    def dumps(obj):
+        return simplejson.dumps(obj,separators=(',',':'))
+    return Codec("simplejson",simplejson.loads,dumps)
+
+def load_json():
+    import json
+    def dumps(obj):
+        return json.dumps(obj,separators=(',',':'))
+    return Codec("json",json.loads,dumps)
+
+#: Backend names and loaders, fastest first. All of them decode the str
+#: returned by httplib2 directly, without decoding it to unicode first.
+BACKENDS = [("ujson", load_ujson),
+            ("simplejson", load_simplejson),
+            ("json", load_json)]
+
+# format: codecs[name] = Codec
+_codecs = dict()
+
+
+def load_codec(name):
+    """
+    Returns the Codec for the backend name. Raises ValueError if the name
+    isn't a known backend and ImportError if it isn't installed.
+    """
+    codec = _codecs.get(name)
+    if codec is None:
+        loaders = dict(BACKENDS)
+        if name not in loaders:
+            raise ValueError("Unknown JSON backend: %s" % name)
+        codec = loaders[name]()
+        _codecs[name] = codec
+    return codec
+
+def get_default_codec():
+    """Returns the Codec for the fastest installed backend."""
+    for name, loader in BACKENDS:
+        try:
+            return load_codec(name)
+        except ImportError:
+            continue
+    raise ImportError("No JSON backend is installed")
+
+#: The Codec used when config.codec is None.
+default_codec = get_default_codec()
+
+
+def get_codec(codec=None):
+    """
+    Returns a Codec for the value of config.codec, which can be None for the
+    default codec, a backend name, or a Codec.
+    """
+    if codec is None:
+        return default_codec
+    if isinstance(codec,Codec):
+        return codec
+    return load_codec(codec)
@@ -17,3 +17,66 @@ class Config(object):
         self.vertex_autoindex = "vertices"
         self.edge_autoindex = "edges"
         self.autoindex = True
+        # Max number of keep-alive connections per host, and the number of
+        # seconds an idle connection is kept open before it's closed. When 
+        # pool_size connections are in use, requests wait up to pool_timeout
+        # seconds for one to be free (None waits until one is).
+        self.pool_size = 10
+        self.pool_idle_timeout = 60
+        self.pool_timeout = None
+        # Max number of operations sent in one batch request.
+        self.batch_size = 500
+        # Element cache, which is off by default. Set cache_store to a 
+        # bulbs.cache.LocalStore or a memcached-compatible client to cache 
+        # elements retrieved by ID for cache_ttl seconds.
+        self.cache_store = None
+        self.cache_ttl = 60
+        # Response bodies larger than this many bytes have their result 
+        # arrays decoded one result at a time as they're iterated, instead 
+        # of all at once. None turns streaming off.
+        self.stream_threshold = None
+        # Number of elements fetched per request when iterating g.V or g.E.
+        self.page_size = 1000
+        # Max number of requests run concurrently by an async graph's 
+        # executor or by graph.parallel(). Workers beyond pool_size wait 
+        # for a connection, so keep it at or below pool_size.
+        self.max_workers = 10
+        # If True, Gremlin scripts from gremlin.groovy are defined once on 
+        # the server as named closures and then invoked by name, instead of 
+        # sending the full script body with every request (Neo4j Server).
+        self.register_scripts = False
+        # Socket timeout in seconds for connecting to the server and for 
+        # each read (httplib2 uses the same timeout for both). None waits 
+        # forever.
+        self.timeout = None
+        # Number of times a request that fails with a connection error, 
+        # timeout, or 502/503/504 is retried, and the HTTP methods that are 
+        # safe to retry (GET covers element gets and index lookups).
+        self.retries = 2
+        self.retry_methods = ("GET",)
+        # Retries wait a random time up to retry_backoff seconds, doubling 
+        # with each retry, up to retry_backoff_max seconds.
+        self.retry_backoff = 0.1
+        self.retry_backoff_max = 2.0
+        # After this many consecutive failures, requests to the root URI 
+        # fail fast for breaker_reset_timeout seconds. The circuit state is
+        # shared by every Config in the process with the same root URI. 
+        # 0 turns it off, which is the default.
+        self.breaker_threshold = 0
+        self.breaker_reset_timeout = 30
+        # Request bodies larger than this many bytes are gzipped with the
+        # compress_level (1-9). None turns it off; the server must accept
+        # Content-Encoding: gzip, e.g. through a gzip filter or a proxy.
+        self.compress_threshold = None
+        self.compress_level = 6
+        # httplib2 asks for gzip or deflate responses and decodes them. Set
+        # this to False to ask for uncompressed responses instead, which 
+        # saves CPU when the server is on a fast local network.
+        self.compress_responses = True
+        # JSON codec for request and response bodies: None uses the fastest
+        # installed backend (ujson, simplejson, then json), or set a backend
+        # name or a bulbs.codec.Codec.
+        self.codec = None
+        # Objects notified before and after each request, such as a 
+        # bulbs.metrics.MetricsCollector; see bulbs.metrics.Listener.
+        self.listeners = []
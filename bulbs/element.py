@@ -7,7 +7,14 @@
 Vertex and Edge container classes and proxies.
 
 """
-from utils import initialize_element, initialize_elements, coerce_id
+import copy
+
+from utils import initialize_element, initialize_elements, coerce_id, chunks
+from executor import Executor
+from lazy import get_adjacent_handles, ElementHandle
+
+#: Vertex methods that can be run by get_adjacent().
+ADJACENCY_METHODS = ("outE", "inE", "bothE", "outV", "inV", "bothV")
 
 def get_base_type(element_class):
     if issubclass(element_class,Vertex):
@@ -18,6 +25,125 @@ def get_base_type(element_class):
         raise TypeError("%s is not an Element class" % element_class)
     return base_type
 
+def get_adjacent(requests,max_in_flight=10):
+    """
+    Runs many adjacency queries concurrently over the pooled connections. 
+
+    Each request is a (vertex, direction, label) tuple, where direction is 
+    one of ADJACENCY_METHODS and label may be None. Returns a list of 
+    (elements, error) tuples in request order: elements is a list and error 
+    is None if the query succeeded, and elements is None and error is the 
+    exception if it failed.
+    """
+    requests = list(requests)
+    for vertex, direction, label in requests:
+        if direction not in ADJACENCY_METHODS:
+            raise ValueError("Unknown direction: %s" % direction)
+    executor = Executor(max_in_flight)
+    try:
+        futures = [executor.submit(_get_adjacent,vertex,direction,label) \
+                       for vertex, direction, label in requests]
+        outcomes = []
+        for future in futures:
+            error = future.exception()
+            elements = future.result() if error is None else None
+            outcomes.append((elements, error))
+    finally:
+        executor.shutdown(wait=False)
+    return outcomes
+
+def _get_adjacent(vertex,direction,label):
+    elements = getattr(vertex,direction)(label)
+    return list(elements or [])
+
+def get_one(resource,base_type,get,_id):
+    """
+    Returns the element with the _id using the resource's get method, or from
+    the resource's element cache if it's enabled. Returns None if not found.
+    """
+    cache = resource.cache
+    if cache is not None:
+        result = cache.get(base_type,coerce_id(_id))
+        if result is not None:
+            return initialize_element(resource,result)
+    try:
+        resp = get(_id)
+    except LookupError:
+        return None
+    if cache is not None:
+        cache.set(base_type,resp.results)
+    return initialize_element(resource,resp.results)
+
+def get_many(resource,base_type,multi_get,ids):
+    """
+    Returns a list of the elements with the IDs, in the same order as the IDs,
+    with None for IDs that weren't found. The IDs are requested in chunks of 
+    config.batch_size using the resource's multi_get method, and IDs found in
+    the resource's element cache aren't requested.
+    """
+    cache = resource.cache
+    ids = [coerce_id(_id) for _id in ids]
+    unique_ids = []
+    elements = dict()
+    for _id in ids:
+        if _id in elements:
+            continue
+        elements[_id] = None
+        result = cache.get(base_type,_id) if cache is not None else None
+        if result is not None:
+            elements[_id] = initialize_element(resource,result)
+        else:
+            unique_ids.append(_id)
+    for id_list in chunks(unique_ids,resource.config.batch_size):
+        resp = multi_get(id_list)
+        for element in initialize_elements(resource,resp):
+            if cache is not None:
+                cache.set(base_type,element._result)
+            elements[element._id] = element
+    return [elements.get(_id) for _id in ids]
+
+def is_vertex(obj):
+    """Returns True if obj is a Vertex or a lazy handle for a vertex."""
+    if isinstance(obj,ElementHandle):
+        return obj._type == "vertex"
+    return isinstance(obj,Vertex)
+
+def invalidate(resource,base_type,_id):
+    """
+    Removes the element from the resource's element cache, if it's enabled.
+    Call it after the write, so a get made during the write can't put the 
+    old element back in the cache.
+    """
+    cache = resource.cache
+    if cache is not None:
+        cache.delete(base_type,coerce_id(_id))
+
+def get_edge_ids(resource,_id):
+    """
+    Returns the IDs of the vertex's edges, which are removed from the element
+    cache along with the vertex when it's deleted. It costs a request, so it's
+    only made if the cache is enabled. If the resource can't list the edges 
+    (Rexster), the deleted edges stay in the cache until they expire.
+    """
+    if resource.cache is None:
+        return []
+    try:
+        resp = resource.bothE(_id)
+    except NotImplementedError:
+        return []
+    if resp.total_size == 0:
+        return []
+    results = resp.results
+    if hasattr(results,"get_id"):
+        results = [results]
+    return [result.get_id() for result in results]
+
+def invalidate_vertex(resource,_id,edge_ids):
+    """Removes a deleted vertex and its edges from the element cache."""
+    invalidate(resource,"vertex",_id)
+    for edge_id in edge_ids:
+        invalidate(resource,"edge",edge_id)
+
 
 class Element(object):
     """This is an abstract base class for Vertex and Edge"""
@@ -34,9 +160,16 @@ class Element(object):
         self._result = result
         self._data = result.data
         #self._set_pretty_vars(self._resource)
-        self._vertices = VertexProxy(Vertex,self._resource)
-        self._edges = EdgeProxy(Edge,self._resource)
         #print "TTTTT", type(self._resource)
+
+    @property
+    def _vertices(self):
+        # created when used, not for every element
+        return VertexProxy(Vertex,self._resource)
+
+    @property
+    def _edges(self):
+        return EdgeProxy(Edge,self._resource)
  
     @property
     def _id(self):
@@ -51,13 +184,27 @@ class Element(object):
         Create and assign a new property of an Element that will be persisted.
         Once it's created, it can be changed by __setattr__ with obj.prop = value.
         """
+        changed = key not in self._data or self._data[key] != value
         self._data[key] = value
+        if changed:
+            # keys changed since the element was loaded, used by Model.save()
+            self.__dict__.setdefault("_changed",set()).add(key)
     
     def __getitem__(self, key):
         """
         Return a property of en Element.
         """
-        return self._data[key]
+        value = self._data[key]
+        if isinstance(value,(list,dict)):
+            self._snapshot(key,value)
+        return value
+
+    def _snapshot(self,key,value):
+        # lists and dicts can be changed in place without __setitem__, so 
+        # Model._get_changes() compares them to a copy taken on first access
+        mutables = self.__dict__.get("_mutables")
+        if mutables is not None and key not in mutables:
+            mutables[key] = copy.deepcopy(value)
 
     def __iter__(self):
         return self._data.__iter__()
@@ -91,39 +238,55 @@ class Element(object):
 
     def map(self):
         """Returns a dict of the element's data that's stored in the DB."""
+        if self.__dict__.get("_mutables") is not None:
+            for key, value in self._data.items():
+                if isinstance(value,(list,dict)):
+                    self._snapshot(key,value)
         return self._data
 
 
 class Vertex(Element):
     """A container for Vertex elements returned by the resource."""     
          
-    def outE(self,label=None):
+    def outE(self,label=None,lazy=False,fields=None):
         """Return the outgoing edges of the vertex."""
+        if lazy or fields is not None:
+            return get_adjacent_handles(self._resource,"outE",self._id,label,fields)
         resp = self._resource.outE(self._id,label)
         return initialize_elements(self._resource,resp)
 
-    def inE(self,label=None):
+    def inE(self,label=None,lazy=False,fields=None):
         """Return the incoming edges of the vertex."""
+        if lazy or fields is not None:
+            return get_adjacent_handles(self._resource,"inE",self._id,label,fields)
         resp = self._resource.inE(self._id,label)
         return initialize_elements(self._resource,resp)
 
-    def bothE(self,label=None):
+    def bothE(self,label=None,lazy=False,fields=None):
         """Return all incoming and outgoing edges of the vertex."""
+        if lazy or fields is not None:
+            return get_adjacent_handles(self._resource,"bothE",self._id,label,fields)
         resp = self._resource.bothE(self._id,label)
         return initialize_elements(self._resource,resp)
 
-    def outV(self,label=None):
+    def outV(self,label=None,lazy=False,fields=None):
         """Return the out-adjacent vertices to the vertex."""
+        if lazy or fields is not None:
+            return get_adjacent_handles(self._resource,"outV",self._id,label,fields)
         resp = self._resource.outV(self._id,label)
         return initialize_elements(self._resource,resp)
 
-    def inV(self,label=None):
+    def inV(self,label=None,lazy=False,fields=None):
         """Return the in-adjacent vertices of the vertex."""
+        if lazy or fields is not None:
+            return get_adjacent_handles(self._resource,"inV",self._id,label,fields)
         resp = self._resource.inV(self._id,label)
         return initialize_elements(self._resource,resp)
         
-    def bothV(self,label=None):
+    def bothV(self,label=None,lazy=False,fields=None):
         """Return all incoming- and outgoing-adjacent vertices of vertex."""
+        if lazy or fields is not None:
+            return get_adjacent_handles(self._resource,"bothV",self._id,label,fields)
         resp = self._resource.bothV(self._id,label)
         return initialize_elements(self._resource,resp)
     
@@ -181,11 +344,14 @@ class VertexProxy(object):
     def get(self,_id):
         """Retrieves an element from Rexster and returns it."""
         #print "TYPE", type(self.resource)
-        try:
-            resp = self.resource.get_vertex(_id)
-            return initialize_element(self.resource,resp.results)
-        except LookupError:
-            return None
+        return get_one(self.resource,"vertex",self.resource.get_vertex,_id)
+
+    def get_many(self,ids):
+        """
+        Retrieves the vertices with the IDs and returns them in a list in the 
+        same order as the IDs, with None for the IDs that weren't found.
+        """
+        return get_many(self.resource,"vertex",self.resource.multi_get_vertices,ids)
         
     def get_all(self):
         # for this 
@@ -196,11 +362,18 @@ class VertexProxy(object):
         """Updates an element in the graph DB and returns it.""" 
         # NOTE: this no longer returns an initialized element because not all 
         # Resources return element data, e.g. Neo4jServer retuns nothing.
-        return self.resource.update_vertex(_id,data)
+        try:
+            return self.resource.update_vertex(_id,data)
+        finally:
+            invalidate(self.resource,"vertex",_id)
                     
     def delete(self,_id):
         """Deletes a vertex from a graph DB and returns the response."""
-        return self.resource.delete_vertex(_id)
+        edge_ids = get_edge_ids(self.resource,_id)
+        try:
+            return self.resource.delete_vertex(_id)
+        finally:
+            invalidate_vertex(self.resource,_id,edge_ids)
     
     def remove_properties(self,_id):
         """Removes all properties from a element and returns the response.""" 
@@ -232,20 +405,29 @@ class EdgeProxy(object):
 
     def get(self,_id):
         """Retrieves an element from Rexster and returns it."""
-        try:
-            resp = self.resource.get_edge(_id)
-            return initialize_element(self.resource,resp.results)
-        except LookupError:
-            return None
+        return get_one(self.resource,"edge",self.resource.get_edge,_id)
+
+    def get_many(self,ids):
+        """
+        Retrieves the edges with the IDs and returns them in a list in the 
+        same order as the IDs, with None for the IDs that weren't found.
+        """
+        return get_many(self.resource,"edge",self.resource.multi_get_edges,ids)
 
     def update(self,_id,data):
         # NOTE: this no longer returns an initialized element because not all 
         # Resources return element data, e.g. Neo4jServer retuns nothing.
-        return self.resource.update_edge(_id,data)
+        try:
+            return self.resource.update_edge(_id,data)
+        finally:
+            invalidate(self.resource,"edge",_id)
                     
     def delete(self,_id):
         """Deletes a vertex from a graph DB and returns the response."""
-        return self.resource.delete_edge(_id)
+        try:
+            return self.resource.delete_edge(_id)
+        finally:
+            invalidate(self.resource,"edge",_id)
 
     def remove_properties(self,_id):
         """Removes all properties from a element and returns the response."""
@@ -259,9 +441,9 @@ class EdgeProxy(object):
 
     def _coerce_vertex_id(self,v):
         """Returns the vertex ID coerced into an int if need be."""
-        # param v is either a Vertex object or a vertex ID.
+        # param v is either a Vertex object, a vertex handle, or a vertex ID.
         # the vertex ID may have been passed in as a string
-        if isinstance(v,Vertex):
+        if is_vertex(v):
             vertex_id = v._id
         else:
             # using corece_id to support linked-data URI IDs
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+A small thread-pool executor used to run blocking requests concurrently.
+
+"""
+import sys
+import threading
+from Queue import Queue
+
+
+class Future(object):
+    """
+    The pending result of a call submitted to an Executor.
+
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        """Returns True if the call has finished."""
+        return self._done.isSet()
+
+    def result(self,timeout=None):
+        """
+        Waits for the call to finish and returns its result, or re-raises
+        the exception it raised.
+
+        :param timeout: Seconds to wait. Defaults to waiting forever.
+
+        """
+        self._wait(timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self,timeout=None):
+        """Waits for the call to finish and returns its exception, if any."""
+        self._wait(timeout)
+        if self._exc_info is not None:
+            return self._exc_info[1]
+
+    def add_done_callback(self,callback):
+        """
+        Calls callback(future) when the call finishes, or right away
+        if it's already finished.
+
+        """
+        self._lock.acquire()
+        try:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+        finally:
+            self._lock.release()
+        callback(self)
+
+    def set_result(self,result):
+        self._result = result
+        self._finish()
+
+    def set_exc_info(self,exc_info):
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        self._lock.acquire()
+        try:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for callback in callbacks:
+            callback(self)
+
+    def _wait(self,timeout):
+        self._done.wait(timeout)
+        if not self.done():
+            raise RuntimeError("Timed out waiting for result")
+
+
+class Executor(object):
+    """
+    Runs calls in a fixed-size pool of daemon worker threads.
+
+    Workers are started as calls are submitted, up to max_workers,
+    so max_workers also caps the number of requests in flight.
+
+    :param max_workers: Maximum number of worker threads.
+
+    """
+
+    def __init__(self,max_workers=10):
+        assert max_workers > 0, "max_workers must be positive"
+        self.max_workers = max_workers
+        self.queue = Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.shutdown_called = False
+
+    def submit(self,func,*args,**kwds):
+        """Schedules func(*args, **kwds) and returns a Future."""
+        if self.shutdown_called:
+            raise RuntimeError("Can't submit calls after shutdown")
+        future = Future()
+        self.queue.put((future, func, args, kwds))
+        self._add_worker()
+        return future
+
+    def map(self,func,*iterables):
+        """Submits func for each set of arguments and returns a list of Futures."""
+        return [self.submit(func,*args) for args in zip(*iterables)]
+
+    def shutdown(self,wait=True):
+        """Stops the workers once the queued calls have run."""
+        self.shutdown_called = True
+        for worker in self.workers:
+            self.queue.put(None)
+        if wait:
+            for worker in self.workers:
+                worker.join()
+
+    def _add_worker(self):
+        self.lock.acquire()
+        try:
+            if len(self.workers) >= self.max_workers:
+                return
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        finally:
+            self.lock.release()
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            future, func, args, kwds = item
+            try:
+                result = func(*args,**kwds)
+            except:
+                future.set_exc_info(sys.exc_info())
+            else:
+                future.set_result(result)
+
+
+class AsyncProxy(object):
+    """
+    Wraps an object so its methods run on an Executor and return Futures.
+
+    Attributes that aren't callable are returned unchanged.
+
+    :param target: The object to wrap, e.g. a Resource or VertexProxy.
+    :param executor: The Executor the calls run on.
+
+    """
+
+    def __init__(self,target,executor):
+        self.target = target
+        self.executor = executor
+
+    def __getattr__(self,name):
+        attr = getattr(self.target,name)
+        if not callable(attr):
+            return attr
+        def submit(*args,**kwds):
+            return self.executor.submit(attr,*args,**kwds)
+        submit.__name__ = name
+        submit.__doc__ = attr.__doc__
+        return submit
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Streaming export of the graph to GraphML or JSON lines.
+
+"""
+import time
+import gzip
+import shutil
+import tempfile
+from xml.sax.saxutils import escape, quoteattr
+
+from sugar import ElementSequence
+from codec import get_codec
+
+
+GRAPHML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+    '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+
+GRAPHML_TYPES = [(bool, "boolean"), (int, "long"), (long, "long"),
+                 (float, "double"), (basestring, "string")]
+
+
+class ExportStats(object):
+    """Progress and throughput counters for an Exporter."""
+
+    def __init__(self):
+        self.started = time.time()
+
+        #: Number of vertices and edges written.
+        self.vertices = 0
+        self.edges = 0
+
+        #: Number of uncompressed bytes written.
+        self.bytes = 0
+
+        #: Number of seconds the export took.
+        self.elapsed = 0
+
+    def throughput(self):
+        """Returns the number of elements written per second."""
+        if self.elapsed == 0:
+            return 0.0
+        return (self.vertices + self.edges) / self.elapsed
+
+    def __repr__(self):
+        return "<ExportStats: %d vertices, %d edges, %d bytes, %.1f/s>" \
+            % (self.vertices, self.edges, self.bytes, self.throughput())
+
+
+class Writer(object):
+    """Writes UTF-8 to a file object, optionally gzipped, and counts bytes."""
+
+    def __init__(self,fout,compress=False):
+        self.fout = fout
+        self.gzip = gzip.GzipFile(fileobj=fout,mode="wb") if compress else None
+        self.bytes = 0
+
+    def write(self,text):
+        if isinstance(text,unicode):
+            text = text.encode("utf-8")
+        self.bytes += len(text)
+        (self.gzip or self.fout).write(text)
+
+    def copy(self,fin):
+        """Writes the rest of the file object fin."""
+        shutil.copyfileobj(fin,self)
+
+    def close(self):
+        # only close the gzip stream; the caller owns the file object
+        if self.gzip is not None:
+            self.gzip.close()
+
+
+class Exporter(object):
+    """
+    Writes the whole graph to a file object a page at a time, so memory
+    stays constant no matter how big the graph is.
+
+    :param resource: The Resource object for the database.
+    :param page_size: Optional number of elements fetched per request.
+                      Defaults to config.page_size.
+
+    Example::
+
+    >>> exporter = Exporter(g.resource)
+    >>> stats = exporter.write_graphml(open("graph.xml.gz","wb"),compress=True)
+    >>> stats = exporter.write_json_lines(open("graph.jsonl","wb"))
+
+    """
+
+    def __init__(self,resource,page_size=None):
+        self.resource = resource
+        self.page_size = page_size or resource.config.page_size
+        self.codec = get_codec(resource.config.codec)
+
+    def write_graphml(self,fout,compress=False):
+        """
+        Writes the graph as GraphML and returns the ExportStats.
+
+        GraphML declares the property keys before the graph, so the elements
+        are spooled to a temp file while the keys are collected.
+
+        :param fout: File object to write to. It isn't closed.
+        :param compress: Boolean. If True, gzip the output.
+
+        """
+        stats = ExportStats()
+        keys = dict(node=dict(), edge=dict())
+        spool = tempfile.TemporaryFile()
+        try:
+            body = Writer(spool)
+            for result in self._iter_vertices():
+                body.write('<node id=%s>' % quoteattr(str(result.get_id())))
+                self._write_data(body,keys['node'],"v",result.data)
+                body.write('</node>\n')
+                stats.vertices += 1
+            for result in self._iter_edges():
+                body.write('<edge id=%s source=%s target=%s label=%s>' % (
+                        quoteattr(str(result.get_id())),
+                        quoteattr(str(result.get_outV())),
+                        quoteattr(str(result.get_inV())),
+                        quoteattr(result.get_label() or "")))
+                self._write_data(body,keys['edge'],"e",result.data)
+                body.write('</edge>\n')
+                stats.edges += 1
+            writer = Writer(fout,compress)
+            writer.write(GRAPHML_HEADER)
+            for key_for in ("node", "edge"):
+                for name, (key_id, key_type) in sorted(keys[key_for].items()):
+                    writer.write('<key id=%s for="%s" attr.name=%s attr.type="%s"/>\n' \
+                                     % (quoteattr(key_id), key_for,
+                                        quoteattr(name), key_type))
+            writer.write('<graph id="G" edgedefault="directed">\n')
+            spool.seek(0)
+            writer.copy(spool)
+            writer.write('</graph>\n</graphml>\n')
+            writer.close()
+        finally:
+            spool.close()
+        return self._finish(stats,writer)
+
+    def write_json_lines(self,fout,compress=False):
+        """
+        Writes each vertex, then each edge, as a JSON object on its own line
+        and returns the ExportStats. Objects have the element's properties
+        plus _id and _type, and edges also have _outV, _label, and _inV.
+
+        :param fout: File object to write to. It isn't closed.
+        :param compress: Boolean. If True, gzip the output.
+
+        """
+        stats = ExportStats()
+        writer = Writer(fout,compress)
+        for result in self._iter_vertices():
+            element = dict(result.data or {})
+            element.update(_id=result.get_id(), _type="vertex")
+            writer.write(self.codec.dumps(element) + "\n")
+            stats.vertices += 1
+        for result in self._iter_edges():
+            element = dict(result.data or {})
+            element.update(_id=result.get_id(), _type="edge",
+                           _outV=result.get_outV(), _label=result.get_label(),
+                           _inV=result.get_inV())
+            writer.write(self.codec.dumps(element) + "\n")
+            stats.edges += 1
+        writer.close()
+        return self._finish(stats,writer)
+
+    def _iter_vertices(self):
+        get_range = self.resource.get_vertices_range
+        sequence = ElementSequence(self.resource,get_range,self.page_size)
+        return sequence.iter_results(prefetch=True)
+
+    def _iter_edges(self):
+        get_range = self.resource.get_edges_range
+        sequence = ElementSequence(self.resource,get_range,self.page_size)
+        return sequence.iter_results(prefetch=True)
+
+    def _write_data(self,writer,keys,prefix,data):
+        for name, value in (data or {}).items():
+            if value is None:
+                continue
+            key_type = self._get_type(value)
+            if key_type is None:
+                # lists and maps are stored as JSON strings
+                key_type, value = "string", self.codec.dumps(value)
+            if name not in keys:
+                keys[name] = ("%s_%s" % (prefix, name), key_type)
+            elif keys[name][1] != key_type:
+                # the key's values have mixed types so fall back to string
+                keys[name] = (keys[name][0], "string")
+            if isinstance(value,bool):
+                value = str(value).lower()
+            elif isinstance(value,float):
+                value = repr(value)
+            elif not isinstance(value,basestring):
+                value = str(value)
+            writer.write('<data key=%s>%s</data>' % (quoteattr(keys[name][0]),
+                                                     escape(value)))
+
+    def _get_type(self,value):
+        for python_type, key_type in GRAPHML_TYPES:
+            if isinstance(value,python_type):
+                return key_type
+
+    def _finish(self,stats,writer):
+        stats.bytes = writer.bytes
+        stats.elapsed = time.time() - stats.started
+        return stats
@@ -23,6 +23,26 @@ def get_edges() {
   g.getEdges()
 }
 
+// Inclusive ranges of elements, used to page through the graph
+
+def get_vertices_range(start,end) {
+  g.V[start..end]
+}
+
+def get_edges_range(start,end) {
+  g.E[start..end]
+}
+
+// Multi-get: returns the elements that exist and skips missing IDs
+
+def multi_get_vertices(ids) {
+  ids.collect{ g.v(it) }.findAll{ it != null }
+}
+
+def multi_get_edges(ids) {
+  ids.collect{ g.e(it) }.findAll{ it != null }
+}
+
 // These edge-label conditionals are a messy hack until Gremin allows null labels. 
 // See https://github.com/tinkerpop/gremlin/issues/267
 
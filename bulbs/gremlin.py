@@ -4,10 +4,21 @@
 # BSD License (see LICENSE for details)
 #
 """
-An interface for executing Gremlin scripts on the resource.
+An interface for executing Gremlin scripts on the resource, and a profiler
+for the scripts it runs.
 
 """
+import math
+import threading
+from collections import deque
+
 from utils import initialize_elements, get_one_result
+from lazy import get_handles
+from metrics import Listener
+from codec import default_codec
+
+import logging
+log = logging.getLogger(__name__)
 
 
 class Gremlin(object):
@@ -27,14 +38,20 @@ class Gremlin(object):
         resp = self.resource.gremlin(script,params)
         return get_one_result(resp)
         
-    def query(self,script,params):
+    def query(self,script,params,lazy=False,fields=None):
         """
         Returns initialized results of an arbitrary Gremlin query.
 
         :param script: Gremlin script to send to the resource.
         :param params: Paramaters to bind to the Gremlin script. 
+        :param lazy: If True, returns a list of lazy element handles, which 
+                     fetch all their properties in one batch when first used.
+        :param fields: Optional list of property names. If given, returns 
+                       lazy element handles with only those properties.
 
         """
+        if lazy or fields is not None:
+            return get_handles(self.resource,script,params,fields)
         resp = self.resource.gremlin(script,params)
         return initialize_elements(self.resource,resp)
  
@@ -46,3 +63,122 @@ class Gremlin(object):
     #       elements are cached in Redis or Membase.
     #
 
+
+class ScriptProfile(object):
+    """Timings and counters for one Gremlin script."""
+
+    def __init__(self,name,max_samples):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.results = 0
+        # the most recent latencies, used for the percentiles
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self,event):
+        self.calls += 1
+        if event.error is not None:
+            self.errors += 1
+        self.total_time += event.elapsed
+        self.request_bytes += event.request_bytes
+        self.response_bytes += event.response_bytes
+        self.results += event.result_count
+        self.samples.append(event.elapsed)
+
+    def percentile(self,percent):
+        """Returns the latency at the percentile of the recent samples."""
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        # nearest rank
+        rank = int(math.ceil(percent / 100.0 * len(samples)))
+        return samples[min(max(rank,1),len(samples)) - 1]
+
+    def to_dict(self):
+        return dict(name=self.name, calls=self.calls, errors=self.errors,
+                    total_time=self.total_time, 
+                    mean=self.total_time / self.calls if self.calls else 0.0,
+                    p50=self.percentile(50), p95=self.percentile(95), 
+                    p99=self.percentile(99), request_bytes=self.request_bytes,
+                    response_bytes=self.response_bytes, results=self.results)
+
+
+class Profiler(Listener):
+    """
+    Request listener that profiles Gremlin calls by script name, including 
+    scripts loaded with GroovyScripts.override(). Scripts that aren't from 
+    a Groovy file are profiled under the name "<inline>".
+
+    :param slow_threshold: Optional number of seconds; calls slower than
+                           this are logged as warnings.
+    :param max_samples: Number of recent latencies kept per script for 
+                        the percentiles.
+
+    Example::
+
+    >>> profiler = Profiler(slow_threshold=0.5)
+    >>> g.config.listeners.append(profiler)
+    >>> print profiler.to_text()
+
+    """
+
+    def __init__(self,slow_threshold=None,max_samples=1000):
+        self.slow_threshold = slow_threshold
+        self.max_samples = max_samples
+        # format: profiles[script name] = ScriptProfile
+        self.profiles = dict()
+        self.lock = threading.Lock()
+
+    def after_request(self,event):
+        operation = event.operation or ""
+        if operation != "gremlin" and not operation.startswith("gremlin:"):
+            return
+        name = operation.partition(":")[2] or "<inline>"
+        self.lock.acquire()
+        try:
+            profile = self.profiles.get(name)
+            if profile is None:
+                profile = ScriptProfile(name,self.max_samples)
+                self.profiles[name] = profile
+            profile.add(event)
+        finally:
+            self.lock.release()
+        if self.slow_threshold is not None and event.elapsed > self.slow_threshold:
+            log.warning("Slow Gremlin script %s: %.1f ms, %d bytes sent", 
+                        name, event.elapsed * 1000, event.request_bytes)
+
+    def stats(self):
+        """Returns a list of each script's stats dict, by total time."""
+        self.lock.acquire()
+        try:
+            rows = [profile.to_dict() for profile in self.profiles.values()]
+        finally:
+            self.lock.release()
+        rows.sort(key=lambda row: row['total_time'], reverse=True)
+        return rows
+
+    def to_json(self):
+        """Returns the stats as a JSON list."""
+        return default_codec.dumps(self.stats())
+
+    def to_text(self):
+        """Returns the stats as a text table, with latencies in ms."""
+        header = "%-32s %7s %6s %9s %9s %9s %11s %11s %9s" % ("script", "calls", 
+            "errors", "p50", "p95", "p99", "sent", "received", "results")
+        lines = [header, "-" * len(header)]
+        for row in self.stats():
+            lines.append("%-32s %7d %6d %9.2f %9.2f %9.2f %11d %11d %9d" % (
+                    row['name'], row['calls'], row['errors'], row['p50'] * 1000,
+                    row['p95'] * 1000, row['p99'] * 1000, row['request_bytes'], 
+                    row['response_bytes'], row['results']))
+        return "\n".join(lines)
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.profiles.clear()
+        finally:
+            self.lock.release()
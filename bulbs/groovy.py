@@ -1,118 +1,107 @@
 import os
 import re
-import sre_parse
-import sre_compile
-from sre_constants import BRANCH, SUBPATTERN
 import hashlib
+import stat
+import tempfile
+import threading
 import utils
+from codec import default_codec
 
-# GroovyScripts is the only public class
+import logging
+log = logging.getLogger(__name__)
+
+# GroovyScripts and ServerScripts are the public classes
+
+
+class ParseError(ValueError):
+    """Raised when a Groovy file can't be parsed. Includes the line number."""
+
+    def __init__(self,message,file_name,line_number):
+        ValueError.__init__(self,"%s, line %d: %s" % (file_name,line_number,message))
+        self.file_name = file_name
+        self.line_number = line_number
+
+
+class Script(str):
+    """
+    A Gremlin script body, which also knows the name, params, and sha1 
+    of the Groovy method it was parsed from.
+
+    """
+
+    def __new__(cls,body,name,params,sha1):
+        script = str.__new__(cls,body)
+        script.name = name
+        script.params = params
+        script.sha1 = sha1
+        return script
 
-#
-# The scanner code came from the TED project.
-#
 
-# TODO: Simply this. You don't need group pattern detection.
-
-
-class Scanner:
-    def __init__(self, lexicon, flags=0):
-        self.lexicon = lexicon
-        self.group_pattern = self._get_group_pattern(flags)
-
-    def _get_group_pattern(self,flags):
-        # combine phrases into a compound pattern
-	patterns = []
-        sub_pattern = sre_parse.Pattern()
-        sub_pattern.flags = flags
-        for phrase, action in self.lexicon:
-            patterns.append(sre_parse.SubPattern(sub_pattern, [
-                (SUBPATTERN, (len(patterns) + 1, sre_parse.parse(phrase, flags))),
-                ]))
-        sub_pattern.groups = len(patterns) + 1
-        group_pattern = sre_parse.SubPattern(sub_pattern, [(BRANCH, (None, patterns))])
-        return sre_compile.compile(group_pattern)
-
-    def get_multiline(self,f,m):
-        content = []
-        next_line = ''
-        while not re.search("^}",next_line):
-            content.append(next_line)
-            try:
-                next_line = f.next()    
-            except StopIteration:
-                # This will happen at end of file
-                next_line = None
-                break
-        content = "".join(content)       
-        return content, next_line
-
-    def get_item(self,f,line):
-        # IMPORTANT: Each item needs to be added sequentially 
-        # to make sure the record data is grouped properly
-        # so make sure you add content by calling callback()
-        # before doing any recursive calls
-        match = self.group_pattern.scanner(line).match() 
-        if not match:
-            return
-        callback = self.lexicon[match.lastindex-1][1]
-        if "def" in match.group():
-            # this is a multi-line get
-            first_line = match.group()
-            body, current_line = self.get_multiline(f,match)
-            sections = [first_line, body, current_line]
-            content = "\n".join(sections).strip()
-            callback(self,content)
-            if current_line:
-                self.get_item(f,current_line)
-        else:
-            callback(self,match.group(1))
-
-    def scan(self,file_name):
-        fin = open(file_name, 'r')    
-        for line in fin:
-            self.get_item(fin,line)
-
-    
 class Parser(object):
+    """
+    Single-pass parser for Groovy script files.
+
+    A method starts with a "def name(params) {" line at the start of a line 
+    and ends at the next line that starts with "}". Lines outside of methods, 
+    e.g. comments, are skipped, and a method definition inside of a method
+    is an error.
+
+    """
+
+    definition_pattern = re.compile(r"^def\s+([^\s(]+)\s*\(([^)]*)\)\s*\{")
 
     def __init__(self, groovy_file):
+        self.file_name = groovy_file
         self.methods = {}
-        # handler format: (pattern, callback)
-        handlers = [ ("^def( .*)", self.add_method), ]
-        Scanner(handlers).scan(groovy_file)
+        fin = open(groovy_file, 'r')
+        try:
+            self.parse(fin)
+        finally:
+            fin.close()
 
     def get_methods(self):
         return self.methods
 
-    # Scanner Callback
-    def add_method(self,scanner,token):
-        method_definition = token
-        method_signature = self._get_method_signature(method_definition)
-        method_name = self._get_method_name(method_signature)
-        method_body = self._get_method_body(method_definition)
-        # NOTE: Not using sha1, signature, or the full method right now
-        # because of the way the GSE works. It's easier to handle version
-        # control by just using the method_body, which the GSE compiles,
-        # creates a class out of, and stores in a classMap for reuse.
-        #sha1 = self._get_sha1(method_definition)
-        #self.methods[method_name] = (method_signature, method_definition, sha1)
-        self.methods[method_name] = method_body
-
-    def _get_method_signature(self,method_definition):
-        pattern = '^def(.*){'
-        return re.search(pattern,method_definition).group(1).strip()
-            
-    def _get_method_name(self,method_signature):
-        pattern = '^(.*)\('
-        return re.search(pattern,method_signature).group(1).strip()
-
-    def _get_method_body(self,method_definition):
-        # remove the first and last lines, and return just the method body
-        lines = method_definition.split('\n')
-        body_lines = lines[+1:-1]
-        method_body = "\n".join(body_lines).strip()
-        return method_body
+    def parse(self,lines):
+        first_line = None
+        body_lines = []
+        line_number = 0
+        for line in lines:
+            line_number += 1
+            if first_line is None:
+                if line.startswith("def "):
+                    first_line = line.rstrip("\r\n")
+                    start = line_number
+            elif line.startswith("}"):
+                self.add_method(first_line, body_lines, line, start)
+                first_line = None
+                body_lines = []
+            elif self.definition_pattern.match(line):
+                # other def lines, e.g. "def x = 1", are local variables
+                message = "def inside of method started on line %d" % start
+                raise ParseError(message, self.file_name, line_number)
+            else:
+                body_lines.append(line)
+        if first_line is not None:
+            message = "method isn't closed by a } line"
+            raise ParseError(message, self.file_name, start)
+
+    def add_method(self,first_line,body_lines,last_line,line_number):
+        match = self.definition_pattern.match(first_line)
+        if match is None:
+            message = "invalid method definition: %s" % first_line
+            raise ParseError(message, self.file_name, line_number)
+        method_name, params = match.groups()
+        method_body = "".join(body_lines)
+        method_definition = "\n".join([first_line, method_body, last_line]).strip()
+        method_params = tuple(param.strip() for param in params.split(',') 
+                              if param.strip())
+        # The GSE compiles the method_body, creates a class out of it, and
+        # stores it in a classMap for reuse. The name, params, and sha1 are
+        # only used when the scripts are registered on the server.
+        sha1 = self._get_sha1(method_definition)
+        self.methods[method_name] = Script(method_body.strip(),method_name,
+                                           method_params,sha1)
 
     def _get_sha1(self,method_definition):
         # this is used to detect version changes
@@ -121,29 +110,187 @@ class Parser(object):
         return sha1.hexdigest()
 
 
+#
+# Script catalogs
+#
+# Parsing a Groovy file is slow relative to creating a resource, so each
+# parsed file is cached in memory for the process and saved to disk as 
+# JSON. Both caches are keyed by the file's path and (mtime, size), and the 
+# disk cache falls back to the content's sha1 so touching a file doesn't 
+# invalidate it. The disk cache is only used if its directory is private to
+# the current user, and anything unexpected in it means the file is reparsed.
+#
+
+#: Version of the on-disk catalog format. Bump it when Script or Parser changes.
+CATALOG_VERSION = 3
+
+def get_cache_dir():
+    """Returns the current user's cache directory for bulbs."""
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        home = os.path.expanduser("~")
+        if home == "~":
+            # no home directory, so use a per-user dir in the temp dir
+            user = getattr(os,"getuid",lambda: "user")()
+            return os.path.join(tempfile.gettempdir(),"bulbs-%s" % user)
+        cache_home = os.path.join(home,".cache")
+    return os.path.join(cache_home,"bulbs")
+
+#: Directory for the on-disk catalogs. Set to None to only cache in memory.
+CATALOG_DIR = os.path.join(get_cache_dir(), "scripts")
+
+# format: catalogs[file_name] = (stamp, methods)
+catalogs = {}
+catalog_lock = threading.Lock()
+
+def get_catalog(file_name):
+    """
+    Returns a dict of the Scripts in the Groovy file. The dict is shared 
+    so don't modify it.
+    """
+    file_name = os.path.abspath(file_name)
+    stamp = get_stamp(file_name)
+    cached = catalogs.get(file_name)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    methods = load_catalog(file_name,stamp)
+    if methods is None:
+        methods = Parser(file_name).get_methods()
+        save_catalog(file_name,stamp,methods)
+    catalog_lock.acquire()
+    try:
+        catalogs[file_name] = (stamp, methods)
+    finally:
+        catalog_lock.release()
+    return methods
+
+def clear_catalogs():
+    """Clears the in-memory catalogs; the on-disk catalogs are kept."""
+    catalog_lock.acquire()
+    try:
+        catalogs.clear()
+    finally:
+        catalog_lock.release()
+
+def get_stamp(file_name):
+    stat = os.stat(file_name)
+    return (stat.st_mtime, stat.st_size)
+
+def get_catalog_path(file_name):
+    key = hashlib.sha1(file_name).hexdigest()[:16]
+    return os.path.join(CATALOG_DIR,"%s-v%d.json" % (key, CATALOG_VERSION))
+
+def is_private_dir(dir_name):
+    """
+    Returns True if the directory is owned by the current user and other 
+    users can't write to it.
+    """
+    info = os.stat(dir_name)
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if hasattr(os,"getuid") and info.st_uid != os.getuid():
+        return False
+    return info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) == 0
+
+def get_stamp_key(stamp):
+    # repr keeps the mtime's full precision through JSON
+    return "%r:%d" % stamp
+
+def get_content_sha1(file_name):
+    fin = open(file_name,'rb')
+    try:
+        return hashlib.sha1(fin.read()).hexdigest()
+    finally:
+        fin.close()
+
+def load_catalog(file_name,stamp):
+    if CATALOG_DIR is None:
+        return None
+    try:
+        if not is_private_dir(CATALOG_DIR):
+            log.debug("Not using script catalogs in %s; it isn't private", CATALOG_DIR)
+            return None
+        fin = open(get_catalog_path(file_name),'rb')
+        try:
+            catalog = default_codec.loads(fin.read())
+        finally:
+            fin.close()
+        if catalog['version'] != CATALOG_VERSION:
+            return None
+        if catalog['stamp'] != get_stamp_key(stamp) and \
+                catalog['sha1'] != get_content_sha1(file_name):
+            return None
+        return dict((str(name), build_script(*args)) for name, args in catalog['methods'])
+    except Exception:
+        # missing, unreadable, corrupt, or from an incompatible version
+        return None
+
+def build_script(body,name,params,sha1):
+    # JSON strings are decoded to unicode and tuples to lists
+    return Script(body.encode('utf-8'),str(name),tuple(str(param) for param in params),
+                  str(sha1))
+
+def save_catalog(file_name,stamp,methods):
+    if CATALOG_DIR is None:
+        return
+    methods = [(name, (str(script), script.name, script.params, script.sha1)) \
+                   for name, script in methods.items()]
+    catalog = dict(version=CATALOG_VERSION, stamp=get_stamp_key(stamp), 
+                   methods=methods, sha1=get_content_sha1(file_name))
+    path = get_catalog_path(file_name)
+    try:
+        content = default_codec.dumps(catalog)
+        if not os.path.isdir(CATALOG_DIR):
+            os.makedirs(CATALOG_DIR,0700)
+        if not is_private_dir(CATALOG_DIR):
+            return
+        # write to a temp file and rename it so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=CATALOG_DIR)
+        fout = os.fdopen(fd,'wb')
+        try:
+            fout.write(content)
+        finally:
+            fout.close()
+        os.rename(temp_path,path)
+    except (IOError, OSError, ValueError, TypeError), e:
+        log.debug("Couldn't save script catalog %s: %s", path, e)
+
+
 class GroovyScripts(object):
-    """Load Gremlin scripts from a Groovy source file."""
+    """
+    Load Gremlin scripts from a Groovy source file.
+
+    Files are parsed lazily, the first time a script is needed, and the 
+    parsed catalogs are shared by every GroovyScripts in the process.
+
+    """
 
     default_file = "gremlin.groovy"
 
     def __init__(self,file_name=None):
         self.file_name = self._get_file_name(file_name)
-        # methods format: methods[name] = (method_definition, method_signature)
-        self.methods = self._get_methods(self.file_name)
+        # files are loaded in order so later files override earlier ones
+        self.file_names = [self.file_name]
+        self._methods = None
+
+    @property
+    def methods(self):
+        # methods format: methods[name] = Script(method_body)
+        if self._methods is None:
+            self._methods = self._get_methods(self.file_names)
+        return self._methods
 
     def get(self,name):
-        """Return a Gremlin script, generated from the params."""
+        """Return the Gremlin Script for the method name."""
         return self.methods[name]
-        #script = self._build_script(method_definition, method_signature)
-        #return script
 
     def refresh(self):
-        """Refresh the stored templates from the YAML source."""
-        self.methods = self._get_methods(self.file_name)
+        """Refresh the stored scripts if the source files have changed."""
+        self._methods = None
 
     def override(self,file_name):
-        new_methods = self._get_methods(file_name)
-        self.methods.update(new_methods)
+        self.file_names.append(file_name)
+        self._methods = None
 
     def _get_file_name(self,file_name):
         if file_name is None:
@@ -151,30 +298,159 @@ class GroovyScripts(object):
             file_name = utils.get_file_path(dir_name,self.default_file)
         return file_name
 
-    def _get_methods(self,file_name):
-        # methods format: methods[name] = (method_definition, method_signature)
-        return Parser(file_name).get_methods()
-
-    def _build_script(definition, signature): 
-        script = """
-        try {
-          current_sha1 = methods[name]
-        } catch(e) {
-          current_sha1 = null
-          methods = [:]
-          methods[name] = sha1
-        }
-        if (current_sha1 == sha1) 
-          %s
-
-        try { 
-          return %s
-        } catch(e) {
-
-          return %s 
-        }""" % (signature, definition, signature)
-        return script
+    def _get_methods(self,file_names):
+        methods = dict()
+        for file_name in file_names:
+            methods.update(get_catalog(file_name))
+        return methods
+
+
+class ServerScripts(object):
+    """
+    Defines each Script once on the server as a named Groovy closure, and 
+    then invokes it by name with bound params instead of resending its body.
+
+    Closures are added to the graph's metaClass and named by the script's 
+    name and sha1, so an edited script gets a new name. If the server has 
+    lost a closure (e.g. after a restart), it's registered again.
+
+    Variables that a script assigns without declaring them are declared at 
+    the top of its closure. Otherwise they'd be kept in the binding of the 
+    request that defined the closure, and shared by every later call.
+
+    """
+
+    prefix = "bulbs"
+
+    # a bare "name = value" at the start of a line, and a declared variable
+    assignment_pattern = re.compile(r"^\s*([A-Za-z_]\w*)\s*=(?!=)", re.MULTILINE)
+    declaration_pattern = re.compile(r"\bdef\s+([A-Za-z_]\w*)")
+
+    def __init__(self):
+        # names of the closures that have been defined on the server
+        self.defined = set()
+        self.lock = threading.Lock()
+
+        #: Number of scripts invoked by name.
+        self.calls = 0
+
+        #: Number of times a script body was sent to define its closure.
+        self.registrations = 0
+
+        #: Number of calls that found the closure missing on the server.
+        self.misses = 0
+
+        #: Bytes of script sent, and bytes saved by invoking closures 
+        #: instead of resending their bodies.
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+
+    def execute(self,post,script,params):
+        """
+        Runs the script with post(script_text,params), registering it 
+        first if it's not defined yet, and returns the Response.
+
+        """
+        name = self.get_function_name(script)
+        if name in self.defined:
+            call = self.build_call(script)
+            try:
+                resp = post(call,params)
+            except (ValueError, SystemError), e:
+                if not self.is_missing(e,name):
+                    raise
+                self._undefine(name)
+                self._count("misses",len(call),0)
+            else:
+                self._count("calls",len(call),len(script)-len(call))
+                return resp
+        definition = self.build_definition(script)
+        resp = post(definition,params)
+        self._define(name)
+        # only invocations save bytes; a definition is longer than the body
+        self._count("registrations",len(definition),0)
+        return resp
+
+    def is_missing(self,error,name):
+        """
+        Returns True if the error is the server's MissingMethodException for 
+        calling the named closure on the graph, and not an error raised 
+        while the closure ran.
+
+        """
+        # e.g. "No signature of method: ...Neo4jGraph.bulbs_outE_0123456789ab() 
+        # is applicable for argument types: ..."
+        pattern = r"No signature of method: [\w.$]+\.%s\(\) is applicable" % re.escape(name)
+        return re.search(pattern,str(error)) is not None
+
+    def get_function_name(self,script):
+        return "%s_%s_%s" % (self.prefix, script.name, script.sha1[:12])
+
+    def build_call(self,script):
+        name = self.get_function_name(script)
+        return "g.%s(%s)" % (name, ",".join(script.params))
+
+    def build_definition(self,script):
+        # imports aren't allowed inside a closure so hoist them to the top
+        imports, lines = [], []
+        for line in script.split("\n"):
+            if line.strip().startswith("import "):
+                imports.append(line.strip())
+            else:
+                lines.append(line)
+        name = self.get_function_name(script)
+        params = ",".join(script.params)
+        body = "\n".join(lines)
+        sections = imports + [
+            "g.class.metaClass.%s = { %s ->" % (name, params),
+            "  def g = delegate"]
+        local_names = self.get_undeclared_names(body,script.params)
+        if local_names:
+            sections.append("  def %s" % ", ".join(local_names))
+        sections += [body, "}", self.build_call(script)]
+        return "\n".join(sections)
+
+    def get_undeclared_names(self,body,params):
+        """
+        Returns the names the body assigns without declaring, in the order
+        they're first assigned, leaving out the params and g.
+        """
+        declared = set(params) | set(["g"])
+        declared.update(self.declaration_pattern.findall(body))
+        names = []
+        for name in self.assignment_pattern.findall(body):
+            if name not in declared and name not in names:
+                names.append(name)
+        return names
+
+    def stats(self):
+        """Returns a dict of the call and request-size counters."""
+        return dict(calls=self.calls, registrations=self.registrations,
+                    misses=self.misses, bytes_sent=self.bytes_sent, 
+                    bytes_saved=self.bytes_saved)
+
+    def _define(self,name):
+        self.lock.acquire()
+        try:
+            self.defined.add(name)
+        finally:
+            self.lock.release()
+
+    def _undefine(self,name):
+        self.lock.acquire()
+        try:
+            self.defined.discard(name)
+        finally:
+            self.lock.release()
 
+    def _count(self,counter,sent,saved):
+        self.lock.acquire()
+        try:
+            setattr(self,counter,getattr(self,counter) + 1)
+            self.bytes_sent += sent
+            self.bytes_saved += saved
+        finally:
+            self.lock.release()
 
 
 #print Parser("gremlin.groovy").get_methods()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Lazy element handles that have the element's ID, type, and label, and
+fetch the element's properties when they're first needed.
+
+"""
+#: Gremlin that wraps a script so it returns a list of element handles,
+#: [id, "vertex", null, null, null] or [id, "edge", label, outV id, inV id],
+#: instead of the elements and their properties. If _fields isn't null,
+#: each handle also has a map of those properties.
+HANDLES_SCRIPT = """_results = { %s }.call()
+if (_results == null) _results = []
+else if (!(_results instanceof Iterable || _results instanceof Iterator)) _results = [_results]
+_results.findAll{ it != null }.collect{ _e ->
+  _row = _e instanceof Edge ? [_e.id, "edge", _e.label, _e.outVertex.id, _e.inVertex.id] : [_e.id, "vertex", null, null, null]
+  if (_fields != null) {
+    _data = [:]
+    _fields.each{ _value = _e.getProperty(it); if (_value != null) _data[it] = _value }
+    _row << _data
+  }
+  _row
+}"""
+
+
+def get_handles(resource,script,params=None,fields=None):
+    """
+    Runs the Gremlin script and returns a list of handles for the elements
+    it returns. The handles share a LazyBatch, so the first time any of
+    their properties are used, all the elements are fetched together.
+
+    If fields is a list of property names, only those properties are 
+    returned with the handles, and other properties are fetched when used.
+
+    Raises NotImplementedError if the resource can't return handles.
+
+    """
+    if fields is not None:
+        # the type var is needed to get the Model class
+        fields = list(fields)
+        if resource.config.type_var not in fields:
+            fields.append(resource.config.type_var)
+    resp = resource.gremlin_handles(script,params,fields)
+    batch = LazyBatch(resource,fields)
+    if resp.total_size > 0:
+        for result in resp.results:
+            batch.add(*result.raw)
+    return batch.handles
+
+def get_adjacent_handles(resource,direction,_id,label=None,fields=None):
+    """Returns handles for the elements adjacent to the vertex, e.g. outE."""
+    script = resource.scripts.get(direction)
+    return get_handles(resource,script,dict(_id=_id,label=label),fields)
+
+
+class LazyBatch(object):
+    """
+    A group of handles returned by the same query, which are loaded together.
+
+    :param resource: The Resource object for the database.
+    :param fields: Optional list of the property names returned with the 
+                   handles.
+
+    """
+
+    def __init__(self,resource,fields=None):
+        self.resource = resource
+        self.fields = fields
+        self.handles = []
+        self.loaded = False
+
+    def add(self,_id,_type,label=None,outV=None,inV=None,data=None):
+        """Adds a handle to the batch and returns it."""
+        if data is not None:
+            data = self._convert(_type,label,data)
+        handle = ElementHandle(self,_id,_type,label,outV,inV,data)
+        self.handles.append(handle)
+        return handle
+
+    def _convert(self,_type,label,data):
+        # convert the fields to their Property types if it's a Model
+        config = self.resource.config
+        element_key = label if _type == "edge" else data.get(config.type_var)
+        try:
+            element_class = self.resource.registry.get_class(element_key)
+        except KeyError:
+            return data
+        if hasattr(element_class,"_properties"):
+            plan = self.resource.type_system.get_plan(element_class)
+            plan.convert(data,self.fields)
+        return data
+
+    def load(self):
+        """Fetches the elements for all the handles in the batch, once."""
+        # imported here since element imports this module
+        from element import get_many
+        if self.loaded:
+            return
+        resource = self.resource
+        for base_type, multi_get in (("vertex", resource.multi_get_vertices),
+                                     ("edge", resource.multi_get_edges)):
+            handles = [handle for handle in self.handles if handle._type == base_type]
+            if handles:
+                ids = [handle._id for handle in handles]
+                elements = get_many(resource,base_type,multi_get,ids)
+                for handle, loaded in zip(handles,elements):
+                    handle._element = loaded
+        self.loaded = True
+
+
+class ElementHandle(object):
+    """
+    A stand-in for a Vertex or Edge that only has its ID, base type, and for
+    edges, its label and vertex IDs, plus the properties in its batch's 
+    fields, if any. Anything else loads the element, and the rest of the 
+    handles in its batch, and is passed on to the element.
+
+    """
+
+    __slots__ = ("_batch", "_id", "_type", "_label", "_outV", "_inV", 
+                 "_fields", "_element")
+
+    def __init__(self,batch,_id,_type,label=None,outV=None,inV=None,data=None):
+        self._batch = batch
+        self._id = _id
+        self._type = _type
+        self._label = label
+        self._outV = outV
+        self._inV = inV
+        # the projected properties, if any
+        self._fields = data
+        self._element = None
+
+    def load(self):
+        """
+        Returns the element, fetching it if it hasn't been yet. Raises
+        LookupError if the element was deleted after the query.
+        """
+        self._batch.load()
+        if self._element is None:
+            raise LookupError("%s %s no longer exists" % (self._type, self._id))
+        return self._element
+
+    def is_loaded(self,key=None):
+        """
+        Returns True if the element has been fetched, or if key is given, 
+        if that property can be used without fetching the element.
+        """
+        if self._batch.loaded:
+            return True
+        fields = self._batch.fields
+        return key is not None and fields is not None and key in fields
+
+    def __getattr__(self,name):
+        # only called for names that aren't slots
+        if not self._batch.loaded and self.is_loaded(name):
+            return self._fields.get(name)
+        return getattr(self.load(),name)
+
+    def __setattr__(self,name,value):
+        if name in ElementHandle.__slots__:
+            object.__setattr__(self,name,value)
+        else:
+            setattr(self.load(),name,value)
+
+    def __getitem__(self,key):
+        if not self._batch.loaded and self.is_loaded(key):
+            return self._fields.get(key)
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __contains__(self,item):
+        return item in self.load()
+
+    def __eq__(self,obj):
+        if isinstance(obj,ElementHandle):
+            return self._type == obj._type and self._id == obj._id
+        return self.load() == obj
+
+    def __ne__(self,obj):
+        return not self.__eq__(obj)
+
+    def __repr__(self):
+        if self._batch.loaded and self._element is not None:
+            return repr(self._element)
+        return "<%s handle: %s>" % (self._type, self._id)
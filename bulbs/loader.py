@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Bulk loader that streams vertex and edge records from CSV or JSON-lines
+files into the database in batched, concurrent transactions.
+
+"""
+import os
+import csv
+import time
+import shelve
+from Queue import Queue
+
+from executor import Executor
+from codec import get_codec
+
+
+def read_csv(file_name):
+    """Yields each row of a CSV file with a header row as a dict."""
+    fin = open(file_name, 'rb')
+    try:
+        for row in csv.DictReader(fin):
+            yield row
+    finally:
+        fin.close()
+
+def read_json_lines(file_name, codec=None):
+    """Yields each line of a JSON-lines file as a dict; blank lines are skipped."""
+    loads = get_codec(codec).loads
+    fin = open(file_name, 'r')
+    try:
+        for line in fin:
+            if line.strip():
+                yield loads(line)
+    finally:
+        fin.close()
+
+def read_records(file_name, codec=None):
+    """Yields the records in a .csv file, or else a JSON-lines file."""
+    if file_name.lower().endswith(".csv"):
+        return read_csv(file_name)
+    return read_json_lines(file_name, codec)
+
+
+class LoadStats(object):
+    """Progress and throughput counters for a Loader."""
+
+    def __init__(self):
+        self.started = time.time()
+
+        #: Number of records read, including skipped ones.
+        self.records = 0
+
+        #: Number of vertices and edges created.
+        self.vertices = 0
+        self.edges = 0
+
+        #: Number of records skipped because they were already loaded.
+        self.skipped = 0
+
+        #: Number of batches committed.
+        self.batches = 0
+
+        #: A list of (file_name, batch number, error) tuples for failed
+        #: batches, and (file_name, record, error) tuples for bad records.
+        self.errors = []
+
+    def elapsed(self):
+        """Returns the number of seconds since the loader started."""
+        return time.time() - self.started
+
+    def throughput(self):
+        """Returns the number of elements created per second."""
+        elapsed = self.elapsed()
+        if elapsed == 0:
+            return 0.0
+        return (self.vertices + self.edges) / elapsed
+
+    def __repr__(self):
+        return "<LoadStats: %d vertices, %d edges, %d skipped, %d errors, %.1f/s>" \
+            % (self.vertices, self.edges, self.skipped, len(self.errors),
+               self.throughput())
+
+
+class Loader(object):
+    """
+    Loads vertex and edge records into the database in batched transactions.
+
+    Vertex records are dicts with an external key and the vertex's
+    properties. Edge records are dicts with the external keys of the out and
+    in vertices, a label, and the edge's properties. The external keys are
+    mapped to the created element IDs in an on-disk map, which is also where
+    the checkpoints are kept, so a load that's interrupted can be run again
+    and it will skip the batches that were already committed.
+
+    Delivery is at-least-once: a batch's checkpoint and key mappings are
+    saved after its transaction commits, so if the process dies in between,
+    running the load again creates that batch's elements a second time.
+    Give the records a unique property if duplicates must be found and
+    removed after an interrupted load.
+
+    Several batches are run concurrently. The number of records per batch
+    defaults to config.batch_size, and the number of batches in flight
+    defaults to config.max_workers. Rexster doesn't return the IDs of the
+    elements it creates, so vertex records must include an _id property
+    when loading through Rexster.
+
+    :param resource: The Resource object for the database.
+    :param map_file: Path of the on-disk key map and checkpoints.
+    :param batch_size: Optional number of records per transaction.
+    :param max_in_flight: Optional number of concurrent transactions.
+    :param callback: Optional function called with the LoadStats after
+                     each batch.
+
+    Example::
+
+    >>> loader = Loader(g.resource,"import.db")
+    >>> loader.load_vertices("people.csv",key="id")
+    >>> loader.load_edges("knows.jsonl",outV="from",inV="to",label="type")
+    >>> loader.close()
+    >>> print loader.stats
+
+    """
+
+    def __init__(self,resource,map_file,batch_size=None,max_in_flight=None,
+                 callback=None):
+        self.resource = resource
+        self.batch_size = batch_size or resource.config.batch_size
+        self.max_in_flight = max_in_flight or resource.config.max_workers
+        self.callback = callback
+        self.map = shelve.open(map_file)
+        self.stats = LoadStats()
+        # keys of the vertices in batches that are in flight; a key is 
+        # released when it's mapped or its batch fails, so the key space 
+        # is only kept on disk
+        self.claimed = set()
+
+    def load_vertices(self,file_name,key="id"):
+        """
+        Creates a vertex for each record in the file and maps the record's
+        key to the vertex ID. Records whose key is already mapped, or is in
+        a batch that's still in flight, are skipped, so the first record 
+        with a key wins unless its batch fails.
+
+        :param file_name: Path of a .csv or JSON-lines file.
+        :param key: Name of the record field that has the external key.
+
+        """
+        claimed = self.claimed
+        def prepare(record):
+            record = dict(record)
+            external_key = str(record.pop(key))
+            if external_key in claimed or self.has_key(external_key):
+                return None
+            claimed.add(external_key)
+            return external_key, record
+        def add(tx,item):
+            external_key, data = item
+            tx.create_vertex(data)
+        def finish(items,results):
+            for (external_key, data), result in zip(items,results):
+                _id = result.get_id() if result is not None else None
+                if _id is None:
+                    raise ValueError("No ID was returned for %s" % external_key)
+                self.map[self._get_map_key(external_key)] = _id
+                claimed.discard(external_key)
+            self.stats.vertices += len(items)
+        def release(items):
+            for external_key, data in items:
+                claimed.discard(external_key)
+        try:
+            self._load("vertices",file_name,prepare,add,finish,release)
+        finally:
+            # batches still in flight after an error aren't mapped
+            claimed.clear()
+
+    def load_edges(self,file_name,outV="outV",inV="inV",label="label"):
+        """
+        Creates an edge for each record in the file between the vertices
+        mapped to the record's out and in keys.
+
+        :param file_name: Path of a .csv or JSON-lines file.
+        :param outV: Name of the record field with the out vertex's key.
+        :param inV: Name of the record field with the in vertex's key.
+        :param label: Name of the record field with the edge label.
+
+        """
+        def prepare(record):
+            data = dict(record)
+            out_key, in_key = str(data.pop(outV)), str(data.pop(inV))
+            return self.get_id(out_key), data.pop(label), self.get_id(in_key), data
+        def add(tx,item):
+            tx.create_edge(*item)
+        def finish(items,results):
+            self.stats.edges += len(items)
+        self._load("edges",file_name,prepare,add,finish)
+
+    def has_key(self,external_key):
+        """Returns True if the external key has been mapped to an element ID."""
+        return self._get_map_key(external_key) in self.map
+
+    def get_id(self,external_key):
+        """Returns the element ID mapped to the external key."""
+        try:
+            return self.map[self._get_map_key(external_key)]
+        except KeyError:
+            raise LookupError("Key %s hasn't been loaded" % external_key)
+
+    def close(self):
+        """Closes the on-disk map."""
+        self.map.close()
+
+    def _load(self,phase,file_name,prepare,add,finish,release=None):
+        checkpoint = self._get_checkpoint(phase,file_name)
+        executor = Executor(self.max_in_flight)
+        completed = Queue()
+        # format: pending[future] = (batch number, items)
+        pending = dict()
+        try:
+            for number, records in self._get_batches(file_name):
+                if self._is_done(checkpoint,number):
+                    self.stats.skipped += len(records)
+                    continue
+                items = self._prepare(file_name,records,prepare)
+                if not items:
+                    self._mark_done(checkpoint,number)
+                    continue
+                future = executor.submit(self._execute,items,add)
+                pending[future] = (number, items)
+                future.add_done_callback(completed.put)
+                if len(pending) >= self.max_in_flight:
+                    future = completed.get()
+                    self._finish(file_name,checkpoint,future,pending.pop(future),
+                                 finish,release)
+            while pending:
+                future = completed.get()
+                self._finish(file_name,checkpoint,future,pending.pop(future),
+                             finish,release)
+        finally:
+            executor.shutdown(wait=False)
+            self.map.sync()
+
+    def _get_batches(self,file_name):
+        # batch numbers depend on batch_size, which is checked by the checkpoint
+        batch = []
+        number = 0
+        for record in read_records(file_name,self.resource.config.codec):
+            self.stats.records += 1
+            batch.append(record)
+            if len(batch) == self.batch_size:
+                yield number, batch
+                batch = []
+                number += 1
+        if batch:
+            yield number, batch
+
+    def _prepare(self,file_name,records,prepare):
+        items = []
+        for record in records:
+            try:
+                item = prepare(record)
+            except LookupError, e:
+                self.stats.errors.append((file_name, record, e))
+                continue
+            if item is None:
+                self.stats.skipped += 1
+            else:
+                items.append(item)
+        return items
+
+    def _execute(self,items,add):
+        tx = self.resource.create_transaction()
+        for item in items:
+            add(tx,item)
+        resp = self.resource.execute_transaction(tx)
+        return resp.results
+
+    def _finish(self,file_name,checkpoint,future,batch,finish,release=None):
+        # release(items) is called when a batch fails
+        number, items = batch
+        error = future.exception()
+        if error is None:
+            try:
+                finish(items,future.result())
+            except ValueError, e:
+                error = e
+        if error is not None:
+            self.stats.errors.append((file_name, number, error))
+            if release is not None:
+                release(items)
+            return
+        self._mark_done(checkpoint,number)
+        self.stats.batches += 1
+        if self.callback is not None:
+            self.callback(self.stats)
+
+    def _get_checkpoint(self,phase,file_name):
+        key = "checkpoint:%s:%s" % (phase, os.path.abspath(file_name))
+        checkpoint = self.map.get(key)
+        if checkpoint is None:
+            # batches before done_through are done, plus the ones in done
+            checkpoint = dict(key=key, batch_size=self.batch_size, 
+                              done_through=0, done=set())
+        elif checkpoint['batch_size'] != self.batch_size:
+            raise ValueError("%s was started with a batch_size of %d" \
+                                 % (file_name, checkpoint['batch_size']))
+        return checkpoint
+
+    def _is_done(self,checkpoint,number):
+        return number < checkpoint['done_through'] or number in checkpoint['done']
+
+    def _mark_done(self,checkpoint,number):
+        done = checkpoint['done']
+        done.add(number)
+        while checkpoint['done_through'] in done:
+            done.remove(checkpoint['done_through'])
+            checkpoint['done_through'] += 1
+        self.map[checkpoint['key']] = checkpoint
+        self.map.sync()
+
+    def _get_map_key(self,external_key):
+        return "key:%s" % external_key
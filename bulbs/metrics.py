@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Request instrumentation: listeners that are notified before and after each
+HTTP request, an in-memory latency histogram, and a Prometheus exporter.
+
+"""
+import threading
+
+import logging
+log = logging.getLogger(__name__)
+
+#: Default histogram bucket upper bounds, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_gremlin_operation(script):
+    """Returns the operation name for a Gremlin script, e.g. gremlin:outE."""
+    name = getattr(script,"name",None)
+    if name:
+        return "gremlin:%s" % name
+    return "gremlin"
+
+def get_rest_operation(method,path):
+    """Returns the operation name for a REST request, e.g. GET node."""
+    resource = path.strip("/").split("/")[0]
+    return "%s %s" % (method, resource)
+
+
+class RequestEvent(object):
+    """The details of one request, passed to each listener."""
+
+    def __init__(self,method,path,operation,request_bytes):
+        #: The HTTP method and the path relative to the root URI.
+        self.method = method
+        self.path = path
+
+        #: Logical operation name, e.g. gremlin:create_indexed_vertex.
+        self.operation = operation
+
+        #: Size in bytes of the request body and the response content.
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+
+        #: The HTTP status, or None if no response was received.
+        self.status = None
+
+        #: Seconds the HTTP round trips took, including retries, and 
+        #: seconds spent decoding and handling the response.
+        self.elapsed = 0.0
+        self.decode_time = 0.0
+
+        #: Number of results in the response.
+        self.result_count = 0
+
+        #: Number of times the request was retried, and whether it was
+        #: refused without being sent because the circuit breaker was open.
+        self.retries = 0
+        self.rejected = False
+
+        #: The exception raised by the request, if any.
+        self.error = None
+
+    def __repr__(self):
+        return "<RequestEvent: %s %s %s %.1fms>" % (self.operation, self.method,
+                                                    self.status, self.elapsed * 1000)
+
+
+class Listener(object):
+    """
+    Base class for request listeners. Add listeners to config.listeners;
+    they're called from the thread that makes the request.
+
+    """
+
+    def before_request(self,event):
+        """Called with the RequestEvent before the request is sent."""
+        pass
+
+    def after_request(self,event):
+        """Called with the completed RequestEvent, even if the request failed."""
+        pass
+
+
+def notify(listeners,hook,event):
+    """Calls the hook on each listener; listener errors are logged, not raised."""
+    for listener in listeners:
+        try:
+            getattr(listener,hook)(event)
+        except Exception:
+            log.exception("Request listener %r failed", listener)
+
+
+class Histogram(object):
+    """Cumulative histogram with fixed bucket bounds, like Prometheus'."""
+
+    def __init__(self,buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self,value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max,value)
+
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.sum / self.count
+
+
+class OperationStats(object):
+    """Latency histogram and counters for one operation."""
+
+    def __init__(self,buckets=BUCKETS):
+        self.latency = Histogram(buckets)
+        self.decode_time = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.results = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+
+
+class MetricsCollector(Listener):
+    """
+    Listener that keeps per-operation latency histograms and counters in
+    memory. Use prometheus_text() to export them.
+
+    :param buckets: Optional histogram bucket upper bounds, in seconds.
+
+    Example::
+
+    >>> collector = MetricsCollector()
+    >>> config.listeners.append(collector)
+    >>> print collector.slowest(5)
+
+    """
+
+    def __init__(self,buckets=BUCKETS):
+        self.buckets = buckets
+        # format: operations[operation] = OperationStats
+        self.operations = dict()
+        self.lock = threading.Lock()
+
+    def after_request(self,event):
+        self.lock.acquire()
+        try:
+            stats = self.operations.get(event.operation)
+            if stats is None:
+                stats = OperationStats(self.buckets)
+                self.operations[event.operation] = stats
+            stats.latency.observe(event.elapsed)
+            stats.decode_time += event.decode_time
+            stats.request_bytes += event.request_bytes
+            stats.response_bytes += event.response_bytes
+            stats.results += event.result_count
+            stats.retries += event.retries
+            if event.rejected:
+                stats.rejected += 1
+            if event.error is not None:
+                stats.errors += 1
+        finally:
+            self.lock.release()
+
+    def slowest(self,count=10):
+        """Returns (operation, mean seconds, requests) tuples, slowest first."""
+        self.lock.acquire()
+        try:
+            rows = [(operation, stats.latency.mean(), stats.latency.count)
+                    for operation, stats in self.operations.items()]
+        finally:
+            self.lock.release()
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:count]
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.operations.clear()
+        finally:
+            self.lock.release()
+
+
+def prometheus_text(collector,prefix="bulbs"):
+    """Returns the collector's metrics in the Prometheus text format."""
+    collector.lock.acquire()
+    try:
+        operations = sorted(collector.operations.items())
+        lines = []
+        name = "%s_request_seconds" % prefix
+        lines.append("# HELP %s Time spent on database requests." % name)
+        lines.append("# TYPE %s histogram" % name)
+        for operation, stats in operations:
+            label = _format_label(operation)
+            latency = stats.latency
+            for bound, count in zip(latency.buckets,latency.counts):
+                lines.append('%s_bucket{operation=%s,le="%r"} %d' % (name, label, bound, count))
+            lines.append('%s_bucket{operation=%s,le="+Inf"} %d' % (name, label, latency.count))
+            lines.append('%s_sum{operation=%s} %s' % (name, label, _format_number(latency.sum)))
+            lines.append('%s_count{operation=%s} %d' % (name, label, latency.count))
+        counters = [("decode_seconds_total", "Time spent decoding responses.", "decode_time"),
+                    ("request_bytes_total", "Bytes sent in request bodies.", "request_bytes"),
+                    ("response_bytes_total", "Bytes received in responses.", "response_bytes"),
+                    ("results_total", "Results returned.", "results"),
+                    ("request_errors_total", "Requests that raised an error.", "errors"),
+                    ("request_retries_total", "Retries of failed requests.", "retries"),
+                    ("circuit_open_total", "Requests refused by an open circuit.", "rejected")]
+        for suffix, help_text, attribute in counters:
+            name = "%s_%s" % (prefix, suffix)
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s counter" % name)
+            for operation, stats in operations:
+                value = _format_number(getattr(stats,attribute))
+                lines.append('%s{operation=%s} %s' % (name, _format_label(operation), value))
+        return "\n".join(lines) + "\n"
+    finally:
+        collector.lock.release()
+
+def _format_number(value):
+    if isinstance(value,float):
+        return repr(value)
+    return str(value)
+
+def _format_label(value):
+    value = value.replace("\\","\\\\").replace('"','\\"').replace("\n","\\n")
+    return '"%s"' % value
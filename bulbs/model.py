@@ -7,8 +7,9 @@
 Base classes for modeling domain objects that wrap vertices and edges.
 
 """
+
 from bulbs.property import Property
-from bulbs.element import Vertex, VertexProxy, Edge, EdgeProxy
+from bulbs.element import Vertex, VertexProxy, Edge, EdgeProxy, invalidate, is_vertex
 from bulbs.utils import initialize_element, get_one_result
 
 import logging
@@ -129,14 +130,19 @@ class Model(object):
             log.error("Setting property '%s' with value '%s': %s", key, value, ex)
             setattr(self,key,None)        
 
-    def _get_property_data(self):
-        """Returns Property data ready to be saved in the DB."""
+    def _get_property_data(self,keys=None):
+        """
+        Returns Property data ready to be saved in the DB. If keys is given, 
+        only those keys are returned, and removed keys have a value of None.
+        """
         data = dict()
         type_var = self._resource.config.type_var
-        if hasattr(self,type_var):
-            data[type_var] = getattr(self,type_var)
-        for key in self:
-            value = self[key]
+        if keys is None:
+            keys = self
+            if hasattr(self,type_var):
+                data[type_var] = getattr(self,type_var)
+        for key in keys:
+            value = self._data.get(key)
             if key in self._properties:
                 property_instance = self._properties[key]
                 property_instance.validate(key,value)
@@ -144,6 +150,30 @@ class Model(object):
             data[key] = value
         return data
 
+    def _reset_changes(self):
+        """Marks the data as unchanged, e.g. after it's loaded or saved."""
+        # the set is created by __setitem__ when there's a change
+        self.__dict__.pop("_changed",None)
+        # lists and dicts are copied by __getitem__ and map() the first time 
+        # they're accessed, so elements that are only read aren't copied
+        self.__dict__["_mutables"] = {}
+
+    def _get_changes(self):
+        """Returns the set of property keys changed since the data was loaded."""
+        changes = set(self.__dict__.get("_changed",()))
+        for key, value in self.__dict__.get("_mutables",{}).items():
+            if self._data.get(key) != value:
+                changes.add(key)
+        return changes
+
+    def _reload(self,resp):
+        # Some updates, e.g. Neo4j Server's PUT properties, don't return the 
+        # element, so the local data is kept and marked as saved.
+        if resp.results is not None:
+            self._initialize(resp.results)
+        else:
+            self._reset_changes()
+
     def _get_index(self,index_name):
         try:
             index = self._resource.registry.get_index(index_name)
@@ -163,9 +193,10 @@ class Node(Vertex,Model):
         # putting it here to ensure method resolution order
         Vertex._initialize(self,result)
         element_type = self._get_element_type()
-        self._set_default_values()
-        self._set_property_data()
+        # same as _set_default_values() and _set_property_data(), but faster
+        self._resource.type_system.get_plan(self.__class__).convert(self._data)
         self._index = self._get_index(element_type)
+        self._reset_changes()
 
     def _get_element_type(self):
         element_type = getattr(self,self._resource.config.type_var)
@@ -185,12 +216,30 @@ class Node(Vertex,Model):
         # return self._resource.update_vertex(_id,data)
         return self._resource.update_indexed_vertex(_id,data,index.index_name)
 
+    def _update_properties(self,_id,data,index):
+        # Override this to use a custom script for partial updates.
+        # A value of None in data removes the property.
+        index_name = index.index_name if index is not None else None
+        return self._resource.update_indexed_vertex_properties(_id,data,index_name)
+
     def save(self):
-        """Saves/updates the element's data in the database."""
-        data = self._get_property_data()
-        resp = self._update(self._id,data,self._index)
-        # maybe called Vertex._initialize directly b/c Neo4j doesn't return data
-        self._initialize(resp.results)
+        """
+        Saves the properties that changed since the element was loaded. 
+        Nothing is sent if nothing changed.
+        """
+        changes = self._get_changes()
+        if not changes:
+            return
+        try:
+            data = self._get_property_data(changes)
+            resp = self._update_properties(self._id,data,self._index)
+        except NotImplementedError:
+            # the resource doesn't support partial updates
+            data = self._get_property_data()
+            resp = self._update(self._id,data,self._index)
+        finally:
+            invalidate(self._resource,"vertex",self._id)
+        self._reload(resp)
         
 
 class Relationship(Edge,Model):
@@ -204,9 +253,10 @@ class Relationship(Edge,Model):
         # putting it here to ensure method resolution order
         Edge._initialize(self,result)
         label = self._get_label()
-        self._set_default_values()
-        self._set_property_data()
+        # same as _set_default_values() and _set_property_data(), but faster
+        self._resource.type_system.get_plan(self.__class__).convert(self._data)
         self._index = self._get_index(label)
+        self._reset_changes()
 
     def _get_label(self):
         label = getattr(self,self._resource.config.label_var)
@@ -218,11 +268,30 @@ class Relationship(Edge,Model):
     def _update(self,_id,data):
         return self._resource.update_edge(_id,data)
 
+    def _update_properties(self,_id,data,index):
+        # Override this to use a custom script for partial updates.
+        # A value of None in data removes the property.
+        index_name = index.index_name if index is not None else None
+        return self._resource.update_indexed_edge_properties(_id,data,index_name)
+
     def save(self):
-        """Saves/updates the element's data in the database."""
-        data = self._get_property_data()      
-        resp = self._update(self._id,data)
-        #self.initialize(resp.results)
+        """
+        Saves the properties that changed since the element was loaded. 
+        Nothing is sent if nothing changed.
+        """
+        changes = self._get_changes()
+        if not changes:
+            return
+        try:
+            data = self._get_property_data(changes)
+            resp = self._update_properties(self._id,data,self._index)
+        except NotImplementedError:
+            # the resource doesn't support partial updates
+            data = self._get_property_data()
+            resp = self._update(self._id,data)
+        finally:
+            invalidate(self._resource,"edge",self._id)
+        self._reload(resp)
 
 class NodeProxy(VertexProxy):
 
@@ -239,7 +308,10 @@ class NodeProxy(VertexProxy):
     def update(self,_id,*args,**kwds):
         node = instantiate_model(self.element_class,self.resource,kwds)
         data = node._get_property_data()
-        resp = node._update(_id,data,self.index)
+        try:
+            resp = node._update(_id,data,self.index)
+        finally:
+            invalidate(self.resource,"vertex",_id)
         result = get_one_result(resp)
         # TODO: make this work for neo4j b/c neo4j doesn't return data
         return initialize_element(self.resource,result)
@@ -266,7 +338,10 @@ class RelationshipProxy(EdgeProxy):
     def update(self,_id,*args,**kwds):
         relationship = instantiate_model(self.element_class,self.resource,kwds)
         data = relationship._get_property_data()
-        resp = relationship._update(_id,data)
+        try:
+            resp = relationship._update(_id,data)
+        finally:
+            invalidate(self.resource,"edge",_id)
         result = get_one_result(resp)
         return initialize_element(self.resource,result)
 
@@ -281,7 +356,7 @@ class RelationshipProxy(EdgeProxy):
         # 1. generic relationship args: (outV, label, inV)
         # 2. subclassed relationship args: (outV, inV) 
         args = list(args)
-        if args and isinstance(args[1],Vertex):
+        if args and is_vertex(args[1]):
             # no label, so this is the subclassed format;
             # the label is defined on the relationship class
             outV = args.pop(0)
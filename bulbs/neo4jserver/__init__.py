@@ -8,4 +8,6 @@ from graph import Neo4jGraph
 from resource import Neo4jResource, NEO4J_URI
 from index import ExactIndex, FulltextIndex, AutomaticIndex, \
     VertexIndexProxy, EdgeIndexProxy
+from batch import Neo4jTransaction
 
+from asynchronous import AsyncNeo4jResource, AsyncGraph
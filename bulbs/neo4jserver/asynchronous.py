@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Concurrent interface to Neo4j Server. Calls run on a thread pool and 
+return Futures instead of blocking.
+
+"""
+from bulbs.config import Config
+from bulbs.gremlin import Gremlin
+from bulbs.element import Vertex, VertexProxy, Edge, EdgeProxy
+from bulbs.executor import Executor, AsyncProxy
+
+from resource import Neo4jResource, NEO4J_URI
+from index import ExactIndex, VertexIndexProxy, EdgeIndexProxy
+
+
+class AsyncNeo4jResource(AsyncProxy):
+    """
+    Neo4jResource whose methods return a Future of the usual Response.
+
+    :param config: Config object.
+    :param executor: Optional Executor; defaults to one sized by 
+                     config.max_workers.
+
+    """
+
+    def __init__(self,config,executor=None):
+        if executor is None:
+            executor = Executor(config.max_workers)
+        AsyncProxy.__init__(self,Neo4jResource(config),executor)
+
+
+class AsyncGraph(object):
+    """
+    Concurrent version of the Neo4j Server graph interface.
+
+    The proxies have the same methods as Neo4jGraph's, but each call returns
+    a :class:`~bulbs.executor.Future` that resolves to the same Vertex, Edge, 
+    or Response it would have returned. Calls share the resource's pool of 
+    keep-alive connections, and at most config.max_workers run at once.
+
+    :keyword root_uri: The URI to Neo4j Server. 
+    :keyword executor: Optional Executor shared with other graphs.
+
+    Example::
+
+    >>> from bulbs.neo4jserver.asynchronous import AsyncGraph
+    >>> g = AsyncGraph()
+    >>> futures = [g.vertices.get(_id) for _id in ids]
+    >>> vertices = [future.result() for future in futures]
+    >>> g.vertices.index.lookup(name="James").result()
+
+    """
+
+    def __init__(self,root_uri=NEO4J_URI,executor=None):
+        self.config = Config(root_uri)
+        self.resource = AsyncNeo4jResource(self.config,executor)
+        self.executor = self.resource.executor
+
+        # the proxies are built on the blocking resource and wrapped
+        resource = self.resource.target
+
+        self.gremlin = self._wrap(Gremlin(resource))
+
+        indicesV = VertexIndexProxy(ExactIndex,resource)
+        indicesE = EdgeIndexProxy(ExactIndex,resource)
+        self.indicesV = self._wrap(indicesV)
+        self.indicesE = self._wrap(indicesE)
+
+        vertices = VertexProxy(Vertex,resource)
+        vertices.index = indicesV.get_or_create("vertices")
+        self.vertices = self._wrap(vertices)
+        self.vertices.index = self._wrap(vertices.index)
+
+        edges = EdgeProxy(Edge,resource)
+        edges.index = indicesE.get_or_create("edges")
+        self.edges = self._wrap(edges)
+        self.edges.index = self._wrap(edges.index)
+
+    def clear(self):
+        """Deletes all the elements in the graph and returns a Future."""
+        return self.resource.clear()
+
+    def close(self):
+        """Waits for pending calls and stops the executor's workers."""
+        self.executor.shutdown(wait=True)
+
+    def _wrap(self,target):
+        return AsyncProxy(target,self.executor)
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Bulk operations sent to Neo4j Server's REST batch endpoint.
+
+"""
+import re
+
+from bulbs.utils import chunks
+
+# Matches a "{N}" back-reference to the job with the ID N
+REFERENCE = re.compile(r"\{(\d+)\}")
+
+
+def is_reference(_id):
+    """Returns True if the _id is a "{N}" back-reference to a queued job."""
+    return isinstance(_id, basestring) and REFERENCE.match(_id) is not None
+
+
+class Neo4jTransaction(object):
+    """
+    Queues create, update, delete, and index operations so they can be sent 
+    to Neo4j Server's batch endpoint in one request instead of one each.
+
+    The create methods return a "{N}" back-reference to the created element, 
+    which you can use in place of an element ID in operations queued after it.
+
+    :param resource: The Neo4jResource object for the database.
+
+    Example::
+
+    >>> tx = Neo4jTransaction(resource)
+    >>> james = tx.create_vertex({'name':'James'})
+    >>> julie = tx.create_vertex({'name':'Julie'})
+    >>> tx.create_edge(james,"knows",julie)
+    >>> resp = resource.execute_transaction(tx)
+    >>> vertices = initialize_elements(resource,resp)
+
+    """
+
+    def __init__(self,resource):
+        self.resource = resource
+        self.config = resource.config
+
+        #: The batch jobs, in the format Neo4j Server's batch endpoint expects.
+        self.actions = []
+
+        #: The job ID of the primary job for each queued operation.
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    # Vertices
+
+    def create_vertex(self,data):
+        """Queues a vertex create and returns a reference to the vertex."""
+        data = self._remove_null_values(data)
+        if self.config.autoindex is True:
+            index_name = self.config.vertex_autoindex
+            return self.create_indexed_vertex(data,index_name,keys=None)
+        return self._add_operation("POST","node",data)
+
+    def update_vertex(self,_id,data):
+        """Queues an update that replaces all the properties of the vertex."""
+        data = self._remove_null_values(data)
+        if self.config.autoindex is True:
+            index_name = self.config.vertex_autoindex
+            return self.update_indexed_vertex(_id,data,index_name,keys=None)
+        path = "%s/properties" % self._get_path("node",_id)
+        return self._add_operation("PUT",path,data)
+
+    def delete_vertex(self,_id):
+        """Queues a vertex delete, which also deletes its adjacent edges."""
+        # The node DELETE URI doesn't delete adjacent edges so use the same 
+        # Gremlin script as Neo4jResource.delete_vertex(). 
+        body = dict(script=self.resource.scripts.get("delete_vertex"),
+                    params=dict(_id=_id))
+        return self._add_operation("POST",self.resource.gremlin_path,body)
+
+    # Edges
+
+    def create_edge(self,outV,label,inV,data={}):
+        """Queues an edge create and returns a reference to the edge."""
+        data = self._remove_null_values(data)
+        if self.config.autoindex is True:
+            index_name = self.config.edge_autoindex
+            return self.create_indexed_edge(outV,label,inV,data,index_name,keys=None)
+        path = "%s/relationships" % self._get_path("node",outV)
+        body = {'to':self._get_uri("node",inV),'type':label,'data':data}
+        return self._add_operation("POST",path,body)
+
+    def update_edge(self,_id,data):
+        """Queues an update that replaces all the properties of the edge."""
+        data = self._remove_null_values(data)
+        if self.config.autoindex is True:
+            index_name = self.config.edge_autoindex
+            return self.update_indexed_edge(_id,data,index_name,keys=None)
+        path = "%s/properties" % self._get_path("relationship",_id)
+        return self._add_operation("PUT",path,data)
+
+    def delete_edge(self,_id):
+        """Queues an edge delete."""
+        path = self._get_path("relationship",_id)
+        return self._add_operation("DELETE",path)
+
+    # Indexed Vertices
+
+    def create_indexed_vertex(self,data,index_name,keys=None):
+        """Queues a vertex create and adds the vertex to the index."""
+        data = self._remove_null_values(data)
+        reference = self._add_operation("POST","node",data)
+        self._add_to_index("node",index_name,reference,data,keys)
+        return reference
+
+    def update_indexed_vertex(self,_id,data,index_name,keys=None):
+        """Queues a vertex update and re-indexes the vertex."""
+        data = self._remove_null_values(data)
+        self._remove_from_index("node",index_name,_id)
+        path = "%s/properties" % self._get_path("node",_id)
+        reference = self._add_operation("PUT",path,data)
+        self._add_to_index("node",index_name,_id,data,keys)
+        return reference
+
+    def update_indexed_vertex_properties(self,_id,data,index_name,keys=None):
+        """
+        Queues an update of only the properties in data, re-indexing them. 
+        A value of None removes the property. The vertex must already exist.
+        """
+        return self._add_script("update_indexed_vertex_properties",_id,data,index_name,keys)
+
+    def put_vertex(self,index_name,key,value,_id):
+        """Queues adding the vertex to the index at key/value."""
+        path = "index/node/%s" % index_name
+        body = dict(key=key,value=value,uri=self._get_uri("node",_id))
+        return self._add_operation("POST",path,body)
+
+    # Indexed Edges
+
+    def create_indexed_edge(self,outV,label,inV,data,index_name,keys=None):
+        """Queues an edge create and adds the edge to the index."""
+        data = self._remove_null_values(data)
+        path = "%s/relationships" % self._get_path("node",outV)
+        body = {'to':self._get_uri("node",inV),'type':label,'data':data}
+        reference = self._add_operation("POST",path,body)
+        self._add_to_index("relationship",index_name,reference,data,keys)
+        return reference
+
+    def update_indexed_edge(self,_id,data,index_name,keys=None):
+        """Queues an edge update and re-indexes the edge."""
+        data = self._remove_null_values(data)
+        self._remove_from_index("relationship",index_name,_id)
+        path = "%s/properties" % self._get_path("relationship",_id)
+        reference = self._add_operation("PUT",path,data)
+        self._add_to_index("relationship",index_name,_id,data,keys)
+        return reference
+
+    def update_indexed_edge_properties(self,_id,data,index_name,keys=None):
+        """
+        Queues an update of only the properties in data, re-indexing them. 
+        A value of None removes the property. The edge must already exist.
+        """
+        return self._add_script("update_indexed_edge_properties",_id,data,index_name,keys)
+
+    def put_edge(self,index_name,key,value,_id):
+        """Queues adding the edge to the index at key/value."""
+        path = "index/relationship/%s" % index_name
+        body = dict(key=key,value=value,uri=self._get_uri("relationship",_id))
+        return self._add_operation("POST",path,body)
+
+    # Batches
+
+    def get_batches(self,batch_size):
+        """
+        Yields the actions in batches of at most batch_size jobs. 
+
+        Call resolve() on each batch before you send it so references to jobs 
+        in previous batches are replaced with the URIs those jobs returned.
+
+        """
+        return chunks(self.actions,batch_size)
+
+    def resolve(self,actions,locations):
+        """
+        Returns a copy of the actions with references to jobs that aren't in 
+        the actions replaced by the job's location.
+
+        :param actions: A list of actions to be sent in the same batch.
+        :param locations: A dict mapping job IDs to the URIs they returned.
+
+        """
+        job_ids = set([action['id'] for action in actions])
+        def replace(match):
+            job_id = int(match.group(1))
+            if job_id in job_ids:
+                # Neo4j Server resolves references within a batch
+                return match.group(0)
+            try:
+                return locations[job_id]
+            except KeyError:
+                raise ValueError("Job %s references job %s, which hasn't run." \
+                                     % (action['id'], job_id))
+        resolved = []
+        for action in actions:
+            action = action.copy()
+            action['to'] = REFERENCE.sub(replace,action['to'])
+            body = action.get('body')
+            if isinstance(body,dict):
+                # only the URI fields generated by this class hold references
+                body = body.copy()
+                for key in ('to','uri'):
+                    if isinstance(body.get(key),basestring):
+                        body[key] = REFERENCE.sub(replace,body[key])
+                action['body'] = body
+            resolved.append(action)
+        return resolved
+
+    def build_action(self,method,to,body=None,request_id=None):
+        # method: GET, POST, PUT, DELETE
+        # to: relative path, e.g. /node, /node/0, /node/0/properties
+        # body: dict(age=34)
+        # request_id: a user-supplied ID for keeping track of responses
+        action = {'method':method,'to':to}
+        if body is not None:
+            action['body'] = body
+        if request_id is not None:
+            action['id'] = request_id
+        return action
+
+    def _add_operation(self,method,to,body=None):
+        job_id = self._add_job(method,to,body)
+        self.operations.append(job_id)
+        return "{%d}" % job_id
+
+    def _add_job(self,method,to,body=None):
+        job_id = len(self.actions)
+        action = self.build_action(method,to,body,request_id=job_id)
+        self.actions.append(action)
+        return job_id
+
+    def _add_script(self,name,_id,data,index_name,keys):
+        # null values aren't removed because they remove the property
+        params = dict(_id=_id,data=data,index_name=index_name,keys=keys)
+        body = dict(script=self.resource.scripts.get(name),params=params)
+        return self._add_operation("POST",self.resource.gremlin_path,body)
+
+    def _add_to_index(self,index_type,index_name,_id,data,keys):
+        path = "index/%s/%s" % (index_type, index_name)
+        uri = self._get_uri(index_type,_id)
+        for key, value in data.items():
+            if keys is None or key in keys:
+                body = dict(key=key,value=value,uri=uri)
+                self._add_job("POST",path,body)
+
+    def _remove_from_index(self,index_type,index_name,_id):
+        # elements created in this transaction aren't indexed yet
+        if not is_reference(_id):
+            path = "index/%s/%s/%s" % (index_type, index_name, _id)
+            self._add_job("DELETE",path)
+
+    def _get_path(self,element_type,_id):
+        # a reference is replaced by the element's URI, which works as a path
+        if is_reference(_id):
+            return _id
+        return "%s/%s" % (element_type, _id)
+
+    def _get_uri(self,element_type,_id):
+        if is_reference(_id):
+            return _id
+        return "%s/%s/%s" % (self.config.root_uri.rstrip("/"), element_type, _id)
+
+    def _remove_null_values(self,data):
+        clean_data = [(k, v) for k, v in data.items() if v is not None]
+        return dict(clean_data)
+
+
+class Neo4jBatchResponse(object):
+    """
+    The combined response for a transaction sent in one or more batches.
+
+    :param transaction: The Neo4jTransaction that was executed.
+    :param responses: The Neo4jResponse object returned for each batch.
+    :param result_class: The Result class used to wrap the returned elements.
+
+    """
+
+    def __init__(self,transaction,responses,result_class):
+        #: The Neo4jResponse object returned for each batch.
+        self.responses = responses
+
+        #: A list of Result objects, one for each queued operation in the 
+        #: order it was queued. Operations that don't return an element, 
+        #: such as deletes and updates, have a result of None.
+        self.results = self.get_results(transaction,result_class)
+
+        #: The number of queued operations.
+        self.total_size = len(self.results)
+
+    def get_results(self,transaction,result_class):
+        bodies = dict()
+        for response in self.responses:
+            for item in response.content or []:
+                bodies[item['id']] = item.get('body')
+        results = []
+        for job_id in transaction.operations:
+            body = bodies.get(job_id)
+            if isinstance(body,dict) and 'self' in body:
+                results.append(result_class(body))
+            else:
+                results.append(None)
+        return results
@@ -7,8 +7,9 @@
 Interface for interacting with a graph database through Neo4j Server.
 
 """
+from bulbs.config import Config
 from bulbs.gremlin import Gremlin
-from bulbs.element import Vertex, VertexProxy, Edge, EdgeProxy
+from bulbs.element import Vertex, VertexProxy, Edge, EdgeProxy, get_adjacent
 
 # Neo4j-specific imports
 from resource import Neo4jResource, NEO4J_URI
@@ -52,6 +53,26 @@ class Neo4jGraph(object):
         self.edges = EdgeProxy(Edge,self.resource)
         self.edges.index = self.indicesE.get_or_create("edges")
 
+    def parallel(self,requests,max_in_flight=None):
+        """
+        Runs many adjacency queries concurrently and returns a list of 
+        (elements, error) tuples in request order.
+
+        :param requests: (vertex, direction, label) tuples, where direction 
+                         is outE, inE, bothE, outV, inV, or bothV.
+        :param max_in_flight: Max number of concurrent requests. 
+                              Defaults to config.max_workers.
+
+        Example::
+
+        >>> requests = [(james,"outE","knows"), (julie,"bothV",None)]
+        >>> for elements, error in g.parallel(requests):
+        ...     print elements or error
+
+        """
+        max_in_flight = max_in_flight or self.config.max_workers
+        return get_adjacent(requests,max_in_flight)
+
     def load_graphml(self,uri):
         """Loads a GraphML file into the database and returns the response."""
         script = self.resource.scripts.get('load_graphml')
@@ -69,6 +69,37 @@ def update_indexed_vertex(_id, data, index_name, keys) {
   }
 }
 
+// Partial update: only the properties in data are changed, and a null value
+// removes the property. Other properties and index entries are left alone.
+
+def update_indexed_vertex_properties(_id, data, index_name, keys) {
+  vertex = g.getRawGraph().getNodeById(_id)
+  manager = g.getRawGraph().index()
+  g.setMaxBufferSize(0)
+  g.startTransaction()
+  try {
+    // index_name is null if the element isn't indexed
+    index = (index_name == null) ? null : manager.forNodes(index_name)
+    for (entry in data.entrySet()) {
+      if (index != null) 
+        index.remove(vertex,entry.key)
+      if (entry.value == null) {
+        if (vertex.hasProperty(entry.key))
+          vertex.removeProperty(entry.key)
+        continue;
+      }
+      vertex.setProperty(entry.key,entry.value)
+      if (index != null && (keys == null || keys.contains(entry.key)))
+	index.add(vertex,entry.key,String.valueOf(entry.value))
+    }
+    g.stopTransaction(TransactionalGraph.Conclusion.SUCCESS)
+    return vertex 
+  } catch (e) {
+    g.stopTransaction(TransactionalGraph.Conclusion.FAILURE)
+    return e
+  }
+}
+
 // Model Proxy - Edge
 
 def create_indexed_edge(outV,label,inV,data,index_name,keys) {
@@ -121,6 +152,35 @@ def update_indexed_edge(_id, data, index_name, keys) {
   }
 }
 
+def update_indexed_edge_properties(_id, data, index_name, keys) {
+  neo4j = g.getRawGraph()
+  manager = neo4j.index()
+  edge = neo4j.getRelationshipById(_id)
+  g.setMaxBufferSize(0)
+  g.startTransaction()
+  try {
+    // index_name is null if the element isn't indexed
+    index = (index_name == null) ? null : manager.forRelationships(index_name)
+    for (entry in data.entrySet()) {
+      if (index != null) 
+        index.remove(edge,entry.key)
+      if (entry.value == null) {
+        if (edge.hasProperty(entry.key))
+          edge.removeProperty(entry.key)
+        continue;
+      }
+      edge.setProperty(entry.key,entry.value)
+      if (index != null && (keys == null || keys.contains(entry.key)))
+	index.add(edge,entry.key,String.valueOf(entry.value))
+    }
+    g.stopTransaction(TransactionalGraph.Conclusion.SUCCESS)
+    return edge
+  } catch (e) { 
+    g.stopTransaction(TransactionalGraph.Conclusion.FAILURE)
+    return e
+  }
+}
+
 def index_count(index_name, key, value) {
   index = g.idx(index_name);
   return index.count(key,value);
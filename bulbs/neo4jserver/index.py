@@ -8,6 +8,7 @@ An interface for interacting with indices on Neo4j Server.
 
 """
 from bulbs.utils import initialize_element, initialize_elements, get_one_result
+from bulbs.lazy import get_handles
 
 
 class IndexProxy(object):
@@ -170,6 +171,28 @@ class ExactIndex(Index):
         resp = self.resource.lookup_vertex(self.index_name,key,value)
         return initialize_elements(self.resource,resp)
 
+    def lookup_lazy(self,key=None,value=None,**pair):
+        """
+        Returns a list of lazy element handles for the elements with key 
+        property equal to value in the index.
+        """
+        key, value = self._parse_args(key,value,pair)
+        return self._lookup_handles(key,value,None)
+
+    def lookup_fields(self,fields,key=None,value=None,**pair):
+        """
+        Returns a list of lazy element handles for the elements with key 
+        property equal to value in the index, with only the properties in 
+        the fields list.
+        """
+        key, value = self._parse_args(key,value,pair)
+        return self._lookup_handles(key,value,fields)
+
+    def _lookup_handles(self,key,value,fields):
+        script = "g.idx(index_name).get(key,value)"
+        params = dict(index_name=self.index_name,key=key,value=value)
+        return get_handles(self.resource,script,params,fields)
+
     def lookup_unique(self,key=None,value=None,**pair):
         """Returns a max of 1 elements matching the key/value pair in the index."""
         key, value = self._parse_args(key,value,pair)
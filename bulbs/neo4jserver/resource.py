@@ -8,7 +8,6 @@
 Bulbs supports pluggable backends. This is the Neo4j Server resource.
 
 """
-import ujson as json
 from urlparse import urlsplit
 
 from bulbs.utils import build_path, get_file_path
@@ -17,9 +16,14 @@ from bulbs.registry import Registry
 # specific to this resource
 from bulbs.resource import Resource, Response, Result
 from bulbs.rest import RESPONSE_HANDLERS, Request
-from bulbs.groovy import GroovyScripts as Scripts
+from bulbs.groovy import GroovyScripts as Scripts, Script, ServerScripts
+from bulbs.lazy import HANDLES_SCRIPT
+from bulbs.metrics import get_gremlin_operation
 from bulbs.typesystem import JSONTypeSystem
+from bulbs.cache import get_element_cache
+from bulbs.stream import JSONArrayStream, decode
 from index import ExactIndex
+from batch import Neo4jTransaction, Neo4jBatchResponse
 import os
 
 # The default URI
@@ -35,6 +39,12 @@ class Neo4jResult(Result):
 
     """
 
+    # the element ID is parsed from the URI on demand and cached in _id
+    __slots__ = ("_id",)
+
+    #: Neo4j type to base type mappings, shared by all results.
+    type_map = dict(node="vertex",relationship="edge")
+
     def __init__(self,result):
         #: The raw result.
         self.raw = result
@@ -44,12 +54,14 @@ class Neo4jResult(Result):
         #: The data in the result.
         self.data = self._get_data(result)
 
-        self.type_map = dict(node="vertex",relationship="edge")
-
     def get_id(self):
         """Returns the element ID."""
-        uri = self.raw.get('self')
-        return self._parse_id(uri)
+        try:
+            return self._id
+        except AttributeError:
+            uri = self.raw.get('self')
+            self._id = self._parse_id(uri)
+            return self._id
        
     def get_type(self):
         """Returns the element's base type, either vertex or edge."""
@@ -114,7 +126,8 @@ class Neo4jResponse(Response):
     
     result_class = Neo4jResult
 
-    def __init__(self, response):
+    def __init__(self, response, config=None):
+        self.config = config
         self.handle_response(response)
         self.headers = self.get_headers(response)
         self.content = self.get_content(response)
@@ -139,11 +152,14 @@ class Neo4jResponse(Response):
         headers, content = response
         # Neo4jServer returns empty content on update
         if content:
-            content = json.loads(content)
+            # Cypher results are in the data array
+            threshold = getattr(self.config,'stream_threshold',None)
+            codec = getattr(self.config,'codec',None)
+            content = decode(content,key='data',threshold=threshold,codec=codec)
             return content
 
     def get_results(self):
-        if type(self.content) == list:
+        if isinstance(self.content,(list,JSONArrayStream)):
             results = (self.result_class(result) for result in self.content)
             total_size = len(self.content)
         elif self.content and self.content != "null":
@@ -178,6 +194,7 @@ class Neo4jResource(Resource):
     index_path = "index"
     gremlin_path = "ext/GremlinPlugin/graphdb/execute_script"
     cypher_path = "ext/CypherPlugin/graphdb/execute_query"
+    batch_path = "batch"
     #cypher_path = "cypher"
 
     def __init__(self,config):
@@ -195,12 +212,28 @@ class Neo4jResource(Resource):
         self.registry.add_scripts("gremlin",self.scripts)
         self.type_system = self._get_type_system()
         self.request = Neo4jRequest(config,self.type_system.content_type)
+        self.cache = get_element_cache(config,Neo4jResult)
+        self.server_scripts = ServerScripts() if config.register_scripts else None
         
     # Gremlin
 
     def gremlin(self,script,params=None): 
+        operation = get_gremlin_operation(script)
+        if self.server_scripts is not None and isinstance(script,Script):
+            post = lambda text, params: self._post_gremlin(text,params,operation)
+            return self.server_scripts.execute(post,script,params)
+        return self._post_gremlin(script,params,operation)
+
+    def gremlin_handles(self,script,params=None,fields=None):
+        # the wrapped script is different for every script, so it's not
+        # registered as a server-side script
+        params = dict(params or {}, _fields=fields)
+        operation = "%s:handles" % get_gremlin_operation(script)
+        return self._post_gremlin(HANDLES_SCRIPT % script,params,operation)
+
+    def _post_gremlin(self,script,params,operation=None):
         params = dict(script=script,params=params)
-        return self.request.post(self.gremlin_path,params)
+        return self.request.post(self.gremlin_path,params,operation)
 
     # Cypher
 
@@ -266,6 +299,34 @@ class Neo4jResource(Resource):
         path = build_path("relationship",_id)
         return self.request.delete(path,params=None)
 
+    # Ranges
+
+    def get_vertices_range(self,start,end):
+        """Returns the vertices in the inclusive range start..end."""
+        script = self.scripts.get('get_vertices_range')
+        params = dict(start=start,end=end)
+        return self.gremlin(script,params)
+
+    def get_edges_range(self,start,end):
+        """Returns the edges in the inclusive range start..end."""
+        script = self.scripts.get('get_edges_range')
+        params = dict(start=start,end=end)
+        return self.gremlin(script,params)
+
+    # Multi-get
+
+    def multi_get_vertices(self,id_list):
+        """Returns the vertices with the IDs; missing IDs are skipped."""
+        script = self.scripts.get('multi_get_vertices')
+        params = dict(ids=id_list)
+        return self.gremlin(script,params)
+
+    def multi_get_edges(self,id_list):
+        """Returns the edges with the IDs; missing IDs are skipped."""
+        script = self.scripts.get('multi_get_edges')
+        params = dict(ids=id_list)
+        return self.gremlin(script,params)
+
     # Vertex Container
 
     def outE(self,_id,label=None):
@@ -374,6 +435,12 @@ class Neo4jResource(Resource):
         script = self.scripts.get("update_indexed_vertex")
         return self.gremlin(script,params)
 
+    def update_indexed_vertex_properties(self,_id,data,index_name,keys=None):
+        # null values aren't removed because they remove the property
+        params = dict(_id=_id,data=data,index_name=index_name,keys=keys)
+        script = self.scripts.get("update_indexed_vertex_properties")
+        return self.gremlin(script,params)
+
     # Model Proxy - Edge
 
     def create_indexed_edge(self,outV,label,inV,data,index_name,keys=None):
@@ -390,6 +457,38 @@ class Neo4jResource(Resource):
         script = self.scripts.get("update_indexed_edge")
         return self.gremlin(script,params)
 
+    def update_indexed_edge_properties(self,_id,data,index_name,keys=None):
+        # null values aren't removed because they remove the property
+        params = dict(_id=_id,data=data,index_name=index_name,keys=keys)
+        script = self.scripts.get("update_indexed_edge_properties")
+        return self.gremlin(script,params)
+
+    # Transactions
+
+    def create_transaction(self):
+        """Returns a new, empty Neo4jTransaction."""
+        return Neo4jTransaction(self)
+
+    def execute_transaction(self,transaction):
+        """
+        Sends a Neo4jTransaction to the batch endpoint and returns a
+        Neo4jBatchResponse. Transactions with more than config.batch_size
+        jobs are split into multiple batch requests, and each batch request
+        is executed in its own server-side transaction.
+        """
+        responses = []
+        locations = dict()
+        for actions in transaction.get_batches(self.config.batch_size):
+            actions = transaction.resolve(actions,locations)
+            resp = self.request.post(self.batch_path,actions)
+            for item in resp.content or []:
+                location = item.get('location')
+                if location is None and isinstance(item.get('body'),dict):
+                    location = item['body'].get('self')
+                locations[item['id']] = location
+            responses.append(resp)
+        return Neo4jBatchResponse(transaction,responses,Neo4jResult)
+
     # Utils
 
     def warm_cache(self):
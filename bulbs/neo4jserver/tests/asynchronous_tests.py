@@ -0,0 +1,58 @@
+import unittest
+from bulbs.config import Config
+from bulbs.rest import ConnectionPool
+from bulbs.element import Vertex, VertexProxy
+from bulbs.executor import Executor, Future, AsyncProxy
+from bulbs.neo4jserver import AsyncNeo4jResource, NEO4J_URI
+from bulbs.neo4jserver.resource import Neo4jResponse
+from bulbs.tests.metrics_tests import FakeHttp
+
+
+class AsyncNeo4jResourceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        config = Config(NEO4J_URI)
+        config.retries = 0
+        self.executor = Executor(max_workers=2)
+        self.resource = AsyncNeo4jResource(config,self.executor)
+        self.resource.target.request.pool = ConnectionPool(FakeHttp)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_returns_futures(self):
+        future = self.resource.get_vertex(1)
+        assert isinstance(future,Future)
+        resp = future.result(timeout=5)
+        assert isinstance(resp,Neo4jResponse)
+        assert resp.results.get_id() == 1
+
+    def test_concurrent_calls(self):
+        futures = [self.resource.get_vertex(1) for i in range(5)]
+        ids = [future.result(timeout=5).results.get_id() for future in futures]
+        assert ids == [1] * 5
+
+    def test_errors_are_propagated(self):
+        # node/2 is a 404 and relationship/3 is a connection error
+        future = self.resource.get_vertex(2)
+        self.assertRaises(LookupError,future.result,5)
+        assert isinstance(future.exception(),LookupError)
+        future = self.resource.get_edge(3)
+        self.assertRaises(IOError,future.result,5)
+
+    def test_wrapped_proxy(self):
+        # AsyncGraph wraps the proxies built on the blocking resource this way
+        vertices = AsyncProxy(VertexProxy(Vertex,self.resource.target),self.executor)
+        vertex = vertices.get(1).result(timeout=5)
+        assert isinstance(vertex,Vertex)
+        assert vertex._id == 1
+        assert vertices.get(2).result(timeout=5) is None
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(AsyncNeo4jResourceTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
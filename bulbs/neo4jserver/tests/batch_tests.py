@@ -0,0 +1,98 @@
+import unittest
+from bulbs.config import Config
+from bulbs.neo4jserver import Neo4jResource, Neo4jTransaction, NEO4J_URI
+
+
+class Neo4jTransactionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        config = Config(NEO4J_URI)
+        config.autoindex = False
+        self.resource = Neo4jResource(config)
+        self.tx = Neo4jTransaction(self.resource)
+
+    def test_create_returns_references(self):
+        james = self.tx.create_vertex({'name':'James'})
+        julie = self.tx.create_vertex({'name':'Julie'})
+        knows = self.tx.create_edge(james,"knows",julie)
+        assert (james, julie, knows) == ("{0}", "{1}", "{2}")
+        action = self.tx.actions[2]
+        assert action['to'] == "{0}/relationships"
+        assert action['body']['to'] == "{1}"
+
+    def test_indexed_vertex_queues_index_jobs(self):
+        james = self.tx.create_indexed_vertex({'name':'James','age':34},"people",keys=['name'])
+        assert len(self.tx) == 1
+        assert len(self.tx.actions) == 2
+        index_action = self.tx.actions[1]
+        assert index_action['to'] == "index/node/people"
+        assert index_action['body'] == dict(key='name',value='James',uri=james)
+
+    def test_partial_update_queues_script(self):
+        self.tx.update_indexed_vertex_properties(5,{'age':None},"people")
+        action = self.tx.actions[0]
+        assert action['to'] == self.resource.gremlin_path
+        assert action['body']['params'] == dict(_id=5,data={'age':None},
+                                                index_name="people",keys=None)
+        script = self.resource.scripts.get("update_indexed_vertex_properties")
+        assert action['body']['script'] == script
+
+    def test_resolve_references_to_previous_batches(self):
+        james = self.tx.create_vertex({'name':'James'})
+        julie = self.tx.create_vertex({'name':'Julie'})
+        self.tx.create_edge(james,"knows",julie)
+        batches = list(self.tx.get_batches(2))
+        assert len(batches) == 2
+        uri = "http://localhost:7474/db/data/node/%s"
+        locations = {0:uri % 1, 1:uri % 2}
+        actions = self.tx.resolve(batches[1],locations)
+        assert actions[0]['to'] == "%s/relationships" % (uri % 1)
+        assert actions[0]['body']['to'] == uri % 2
+        # the queued actions aren't modified
+        assert self.tx.actions[2]['to'] == "{0}/relationships"
+
+    def test_resolve_unexecuted_reference(self):
+        james = self.tx.create_vertex({'name':'James'})
+        self.tx.create_edge(james,"knows",5)
+        batches = list(self.tx.get_batches(1))
+        self.assertRaises(ValueError,self.tx.resolve,batches[1],{})
+
+
+class Neo4jBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        config = Config(NEO4J_URI)
+        self.resource = Neo4jResource(config)
+
+    def test_execute_transaction(self):
+        tx = Neo4jTransaction(self.resource)
+        james = tx.create_vertex({'name':'James'})
+        julie = tx.create_vertex({'name':'Julie'})
+        tx.create_edge(james,"knows",julie)
+        resp = self.resource.execute_transaction(tx)
+        assert resp.total_size == 3
+        vertex, edge = resp.results[0], resp.results[2]
+        assert vertex.get_type() == "vertex"
+        assert vertex.data.get('name') == "James"
+        assert edge.get_type() == "edge"
+        assert edge.get_outV() == vertex.get_id()
+        assert edge.get_inV() == resp.results[1].get_id()
+
+    def test_execute_chunked_transaction(self):
+        self.resource.config.batch_size = 3
+        tx = Neo4jTransaction(self.resource)
+        vertices = [tx.create_vertex({'number':i}) for i in range(5)]
+        tx.create_edge(vertices[0],"test",vertices[4])
+        resp = self.resource.execute_transaction(tx)
+        assert len(resp.responses) > 1
+        assert resp.results[5].get_outV() == resp.results[0].get_id()
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Neo4jTransactionTestCase))
+    suite.addTest(unittest.makeSuite(Neo4jBatchTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
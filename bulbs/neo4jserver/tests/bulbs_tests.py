@@ -4,6 +4,9 @@ from bulbs.config import Config
 from bulbs.neo4jserver import Neo4jResource, NEO4J_URI, \
     ExactIndex, VertexIndexProxy, EdgeIndexProxy 
 from index_tests import IndexTestCase
+from batch_tests import Neo4jTransactionTestCase, Neo4jBatchTestCase
+from resource_tests import Neo4jResultTestCase
+from asynchronous_tests import AsyncNeo4jResourceTestCase
 
 config = Config(NEO4J_URI)
 BulbsTestCase.resource = Neo4jResource(config)
@@ -15,4 +18,8 @@ BulbsTestCase.edge_index_proxy = EdgeIndexProxy
 if __name__ == '__main__':
     suite = suite()
     suite.addTest(unittest.makeSuite(IndexTestCase))
+    suite.addTest(unittest.makeSuite(Neo4jTransactionTestCase))
+    suite.addTest(unittest.makeSuite(Neo4jBatchTestCase))
+    suite.addTest(unittest.makeSuite(Neo4jResultTestCase))
+    suite.addTest(unittest.makeSuite(AsyncNeo4jResourceTestCase))
     unittest.main(defaultTest='suite')
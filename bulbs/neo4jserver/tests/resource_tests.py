@@ -1,9 +1,11 @@
 import unittest
 from bulbs.config import Config
 from bulbs.neo4jserver import Neo4jResource, NEO4J_URI
+from bulbs.neo4jserver.resource import Neo4jResult
 from bulbs.tests.resource_tests import ResourceTestCase
 
 import time
+import pickle
 import ujson as json
 
 class Neo4jResourceTestCase(ResourceTestCase):
@@ -12,6 +14,31 @@ class Neo4jResourceTestCase(ResourceTestCase):
         config = Config(NEO4J_URI)
         self.resource = Neo4jResource(config)
 
+class Neo4jResultTestCase(unittest.TestCase):
+
+    def setUp(self):
+        uri = "http://localhost:7474/db/data/relationship/5"
+        self.result = Neo4jResult(dict(self=uri,data=dict(name="James"),type="knows"))
+
+    def test_compact(self):
+        assert not hasattr(self.result,"__dict__")
+        assert self.result.type_map is Neo4jResult.type_map
+
+    def test_get_id(self):
+        assert self.result.get_id() == 5
+        assert self.result.get_type() == "edge"
+        # cached after it's parsed
+        self.result.raw['self'] = None
+        assert self.result.get_id() == 5
+
+    def test_pickle(self):
+        for protocol in (0, 2):
+            result = pickle.loads(pickle.dumps(self.result,protocol))
+            assert result.raw == self.result.raw
+            assert result.data == dict(name="James")
+            assert result.get_id() == 5
+
+
 class Neo4jIndexTestCase(unittest.TestCase):
     
     def setUp(self):
@@ -9,7 +9,6 @@ Bulbs supports pluggable backends. These are the abstract base classes that
 provides the server-resource interface. Implement these to create a new resource. 
 
 """
-import ujson as json
 
 from bulbs.utils import build_path, get_file_path
 from bulbs.registry import Registry
@@ -25,6 +24,10 @@ class Result(object):
 
     """
 
+    # Results are created for every element returned so they don't have 
+    # a __dict__; subclasses should define __slots__ too.
+    __slots__ = ("raw", "data")
+
     def __init__(self, result):
         #: The raw result.
         self.raw = result
@@ -32,6 +35,12 @@ class Result(object):
         #: The data in the result.
         self.data = None
 
+    def __getstate__(self):
+        return self.raw
+
+    def __setstate__(self, raw):
+        self.__init__(raw)
+
     def get_id(self):
         """Returns the element ID."""
         raise NotImplementedError
@@ -66,12 +75,16 @@ class Response(object):
     Abstract base class for the response returned by the request.
     
     :param response: The raw response; its type will depend on the Resource.
+    :param config: Config object containing instance-specific configuration. 
 
     """
 
     result_class = Result
 
-    def __init__(self,  response):
+    def __init__(self,  response, config=None):
+        #: Config object containing instance-specific configuration. 
+        self.config = config
+
         self.handle_response(response)
 
         #: A dict containing the content returned in the response.
@@ -114,11 +127,22 @@ class Resource(object):
         #: Registry object to hold classes, proxies, indices, and scripts.
         self.registery = Registry()
 
+        #: ElementCache object, or None if element caching is disabled.
+        self.cache = None
+
     # Gremlin
     def gremlin(self, script, params=None): 
         """Executes a Gremlin script and returns the Response."""
         raise NotImplementedError 
 
+    def gremlin_handles(self, script, params=None, fields=None):
+        """
+        Executes a Gremlin script that returns elements and returns the 
+        Response, which has the element handles instead of the elements,
+        with the properties in fields, if it's given.
+        """
+        raise NotImplementedError
+
     # Vertex Proxy
     def create_vertex(self, data):
         """Creates a vertex and returns the Response."""
@@ -153,6 +177,24 @@ class Resource(object):
         """Deletes a edge with the _id and returns the Response."""
         raise NotImplementedError 
 
+    # Ranges
+    def get_vertices_range(self, start, end):
+        """Returns the vertices in the inclusive range start..end."""
+        raise NotImplementedError 
+
+    def get_edges_range(self, start, end):
+        """Returns the edges in the inclusive range start..end."""
+        raise NotImplementedError 
+
+    # Multi-get
+    def multi_get_vertices(self, id_list):
+        """Gets the vertices with the IDs in id_list and returns the Response."""
+        raise NotImplementedError 
+
+    def multi_get_edges(self, id_list):
+        """Gets the edges with the IDs in id_list and returns the Response."""
+        raise NotImplementedError 
+
     # Vertex Container
     def outE(self, _id, label=None):
         """Returns the outgoing edges of the vertex."""
@@ -247,6 +289,13 @@ class Resource(object):
         """Updates an indexed vertex and returns the Response."""
         raise NotImplementedError 
 
+    def update_indexed_vertex_properties(self, _id, data, index_name, keys=None):
+        """
+        Updates only the vertex properties in data, re-indexes them, and 
+        returns the Response. A value of None removes the property.
+        """
+        raise NotImplementedError 
+
     def delete_indexed_vertex(self, _id, index_name):
         """Deletes an indexed vertex and returns the Response."""
         raise NotImplementedError 
@@ -260,6 +309,22 @@ class Resource(object):
         """Updates an indexed edge and returns the Response."""
         raise NotImplementedError 
     
+    def update_indexed_edge_properties(self, _id, data, index_name, keys=None):
+        """
+        Updates only the edge properties in data, re-indexes them, and 
+        returns the Response. A value of None removes the property.
+        """
+        raise NotImplementedError 
+
     def delete_indexed_edge(self, _id, index_name):
         """Deletes an indexed edge and returns the Response."""
+        raise NotImplementedError
+
+    # Transactions
+    def create_transaction(self):
+        """Returns a new, empty transaction for execute_transaction()."""
+        raise NotImplementedError 
+
+    def execute_transaction(self, transaction):
+        """Sends the transaction's queued operations and returns the Response."""
         raise NotImplementedError 
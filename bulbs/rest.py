@@ -12,17 +12,24 @@ returning a Response object.
 import logging
 log = logging.getLogger(__name__)
 
+import time
+import zlib
+import random
 import urllib
+import httplib
+import threading
+from urlparse import urlsplit
 import httplib2
-import ujson as json
 from pprint import pprint
 
 from resource import Response
+from codec import get_codec
+from metrics import RequestEvent, notify, get_rest_operation
 
-def get_error(http_resp):
+def get_error(http_resp, codec=None):
     """Returns the HTTP status, message, and error."""
     header, content = http_resp
-    content = json.loads(content)
+    content = get_codec(codec).loads(content)
     status = header.get('status')
     message = content.get('message')
     error = content.get('error')
@@ -56,13 +63,291 @@ def conflict(http_resp):
 def server_error(http_resp):
     raise SystemError(http_resp)
 
+def unavailable(http_resp):
+    # the server or a proxy in front of it is overloaded or restarting
+    raise IOError(http_resp)
+
 RESPONSE_HANDLERS = {200:ok,
                      201:created,
                      204:no_content,
                      400:bad_request,
                      404:not_found,
                      409:conflict,
-                     500:server_error}
+                     500:server_error,
+                     502:unavailable,
+                     503:unavailable,
+                     504:unavailable}
+
+# Errors that may be transient, so requests that are safe to repeat are 
+# retried. socket.error and socket.timeout are IOErrors.
+RETRY_ERRORS = (IOError, httplib.HTTPException)
+
+
+def gzip_compress(data, level=6):
+    """Returns the data compressed in the gzip format."""
+    # a wbits of 16 + MAX_WBITS writes a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class CircuitOpenError(IOError):
+    """Raised instead of sending a request while a server's circuit is open."""
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection to a host is available within the pool's timeout."""
+
+
+class ConnectionPool(object):
+    """
+    A thread-safe pool of keep-alive HTTP connections, grouped by host.
+
+    Each pooled connection is an httplib2.Http object, which keeps its socket
+    open between requests. An Http object isn't thread-safe so it's checked 
+    out by one thread at a time and returned to the pool when it's done.
+
+    At most max_size connections to a host are open at once. When they're
+    all checked out, checkout() waits for one to be checked in or discarded.
+
+    :param factory: Callable that returns a new httplib2.Http object.
+    :param max_size: The maximum number of connections per host.
+    :param idle_timeout: Seconds an idle connection is kept before it's closed.
+    :param timeout: Optional seconds checkout() waits for a connection before
+                    it raises PoolTimeoutError. None waits until one is free.
+
+    """
+
+    def __init__(self, factory, max_size=10, idle_timeout=60, timeout=None):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        #: Number of checkouts that reused an idle connection.
+        self.hits = 0
+
+        #: Number of checkouts that had to create a new connection.
+        self.misses = 0
+
+        # format: idle[host] = [(http, last_used), ...], most recent last
+        self.idle = dict()
+
+        # format: active[host] = number of connections checked out
+        self.active = dict()
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+
+    def checkout(self, host):
+        """
+        Returns an idle connection to the host, or a new one if none are idle.
+        Waits if max_size connections to the host are already checked out.
+        """
+        stale = []
+        self.lock.acquire()
+        try:
+            self._wait_for_slot(host)
+            self.active[host] = self.active.get(host, 0) + 1
+            connections = self.idle.get(host, [])
+            cutoff = time.time() - self.idle_timeout
+            while connections:
+                http, last_used = connections.pop()
+                if last_used >= cutoff:
+                    self.hits += 1
+                    return http
+                stale.append(http)
+            self.misses += 1
+        finally:
+            self.lock.release()
+            self._close_all(stale)
+        try:
+            return self.factory()
+        except:
+            self.lock.acquire()
+            try:
+                self._release(host)
+            finally:
+                self.lock.release()
+            raise
+
+    def checkin(self, host, http):
+        """Returns a connection to the pool so it can be reused."""
+        stale = []
+        self.lock.acquire()
+        try:
+            self._release(host)
+            connections = self.idle.setdefault(host, [])
+            cutoff = time.time() - self.idle_timeout
+            # the oldest connections are at the front of the list
+            while connections and connections[0][1] < cutoff:
+                stale.append(connections.pop(0)[0])
+            if len(connections) < self.max_size:
+                connections.append((http, time.time()))
+            else:
+                stale.append(http)
+        finally:
+            self.lock.release()
+            self._close_all(stale)
+
+    def discard(self, host, http):
+        """Closes a connection that shouldn't be reused, e.g. after an error."""
+        self.lock.acquire()
+        try:
+            self._release(host)
+        finally:
+            self.lock.release()
+        self._close(http)
+
+    def clear(self):
+        """Closes all the idle connections in the pool."""
+        self.lock.acquire()
+        try:
+            idle, self.idle = self.idle, dict()
+        finally:
+            self.lock.release()
+        for connections in idle.values():
+            self._close_all([http for http, last_used in connections])
+
+    def stats(self):
+        """Returns a dict of the pool's hit/miss counters and idle count."""
+        self.lock.acquire()
+        try:
+            idle = sum([len(connections) for connections in self.idle.values()])
+            active = sum(self.active.values())
+            return dict(hits=self.hits, misses=self.misses, idle=idle, active=active)
+        finally:
+            self.lock.release()
+
+    def _wait_for_slot(self, host):
+        # called with the lock held
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        while self.active.get(host, 0) >= self.max_size:
+            if deadline is None:
+                self.available.wait()
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise PoolTimeoutError("No connection to %s was free after %s seconds" 
+                                       % (host, self.timeout))
+            self.available.wait(remaining)
+
+    def _release(self, host):
+        # called with the lock held
+        self.active[host] = self.active.get(host, 0) - 1
+        self.available.notify()
+
+    def _close_all(self, connections):
+        for http in connections:
+            self._close(http)
+
+    def _close(self, http):
+        for connection in http.connections.values():
+            try:
+                connection.close()
+            except Exception:
+                pass
+        http.connections.clear()
+
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests to a server after it fails several times in a row.
+
+    After threshold consecutive failures the circuit opens and requests 
+    raise CircuitOpenError without being sent. After reset_timeout seconds 
+    one trial request is let through: if the server responds the circuit 
+    closes, and if it fails the circuit opens again. Failures are 
+    connection errors, timeouts, and 502/503/504 responses.
+
+    :param threshold: Number of consecutive failures that open the circuit.
+    :param reset_timeout: Seconds the circuit stays open before a trial.
+
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        # time the circuit opened, or None if it's closed
+        self.opened = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Returns True if a request may be sent now."""
+        self.lock.acquire()
+        try:
+            if self.opened is None:
+                return True
+            if not self.trial and time.time() - self.opened >= self.reset_timeout:
+                self.trial = True
+                return True
+            return False
+        finally:
+            self.lock.release()
+
+    def success(self):
+        self.lock.acquire()
+        try:
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+        finally:
+            self.lock.release()
+
+    def failure(self):
+        self.lock.acquire()
+        try:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened = time.time()
+            self.trial = False
+        finally:
+            self.lock.release()
+
+    def state(self):
+        """Returns closed, open, or half-open."""
+        if self.opened is None:
+            return "closed"
+        if self.trial or time.time() - self.opened >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+
+# Circuit breakers are shared by all the Request objects in a process that 
+# use the same root URI, format: breakers[root_uri] = CircuitBreaker
+_breakers = dict()
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(key, threshold, reset_timeout):
+    """Returns the process-wide CircuitBreaker for the key, creating it if need be."""
+    _breakers_lock.acquire()
+    try:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(threshold, reset_timeout)
+            _breakers[key] = breaker
+        return breaker
+    finally:
+        _breakers_lock.release()
+
+
+# Pools are shared by all the Request objects in a process that use the same
+# credentials and pool settings, format: pools[pool_key] = ConnectionPool
+_pools = dict()
+_pools_lock = threading.Lock()
+
+def get_connection_pool(key, factory, max_size, idle_timeout, timeout=None):
+    """Returns the process-wide ConnectionPool for the key, creating it if need be."""
+    _pools_lock.acquire()
+    try:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(factory, max_size, idle_timeout, timeout)
+            _pools[key] = pool
+        return pool
+    finally:
+        _pools_lock.release()
+
 
 class Request(object):
     """Used for connecting to the Rexster REST server."""
@@ -78,26 +363,27 @@ class Request(object):
         """
         self.config = config
         self.content_type = content_type
-        self.http = httplib2.Http()    
-        self._add_credentials(config.username, config.password)
+        self.codec = get_codec(config.codec)
+        self.pool = self._get_pool()
+        self.breaker = self._get_breaker()
     
-    def get(self, path, params=None):
+    def get(self, path, params=None, operation=None):
         """Convenience method that sends GET requests to the resource.""" 
-        return self.request("GET", path, params)
+        return self.request("GET", path, params, operation)
 
-    def put(self, path, params=None):
+    def put(self, path, params=None, operation=None):
         """Convenience method that sends PUT requests to the resource."""
-        return self.request("PUT", path, params)
+        return self.request("PUT", path, params, operation)
 
-    def post(self, path, params=None):
+    def post(self, path, params=None, operation=None):
         """Convenience method that sends POST requests to the resource."""
-        return self.request("POST", path, params)
+        return self.request("POST", path, params, operation)
 
-    def delete(self, path, params=None):
+    def delete(self, path, params=None, operation=None):
         """Convenience method that sends DELETE requests to the resource."""
-        return self.request("DELETE", path, params)
+        return self.request("DELETE", path, params, operation)
     
-    def request(self, method, path, params):
+    def request(self, method, path, params, operation=None):
         """
         Sends a request to the resource.
 
@@ -106,17 +392,96 @@ class Request(object):
                        in either config.py or that you passed in as an argument
                        when you instantiated the resource.
         :param params: a dict of query-string parameters to include in the URL 
+        :param operation: Optional logical operation name passed to the 
+                          config's listeners, e.g. gremlin:outE.
         """
 
         uri, method, body, headers = self._build_request_args(path,method,params)
 
         self._display_debug(uri,method,body,headers)
-       
-         # "retry code" moved to _retry_request method for now. - James  
-        http_resp = self.http.request(uri, method, body, headers)
+
+        listeners = getattr(self.config,"listeners",None)
+        if not listeners:
+            return self._retry_request(uri,method,body,headers)
+
+        operation = operation or get_rest_operation(method,path)
+        event = RequestEvent(method,path,operation,len(body or ""))
+        notify(listeners,"before_request",event)
+        try:
+            return self._retry_request(uri,method,body,headers,event)
+        except Exception, e:
+            event.error = e
+            raise
+        finally:
+            notify(listeners,"after_request",event)
+
+    def _retry_request(self, uri, method, body, headers, event=None):
+        # Only methods in config.retry_methods are retried since the others 
+        # may have been applied even though the request failed.
+        config = self.config
+        retries = config.retries if method in config.retry_methods else 0
+        attempt = 0
+        while True:
+            if self.breaker is not None and not self.breaker.allow():
+                if event is not None:
+                    event.rejected = True
+                raise CircuitOpenError("Circuit is open for %s" % config.root_uri)
+            failed = False
+            try:
+                resp = self._send(uri,method,body,headers,event)
+            except RETRY_ERRORS, e:
+                failed = True
+                if attempt >= retries:
+                    raise
+                log.warning("Retrying %s %s after error: %s", method, uri, e)
+            else:
+                return resp
+            finally:
+                # Any response other than 502/503/504 means the server is up, 
+                # even if it's an error like a 404, and it ends a trial.
+                if self.breaker is not None:
+                    if failed:
+                        self.breaker.failure()
+                    else:
+                        self.breaker.success()
+            attempt += 1
+            if event is not None:
+                event.retries = attempt
+            time.sleep(self._get_backoff(attempt))
+
+    def _get_backoff(self, attempt):
+        # exponential backoff with full jitter
+        config = self.config
+        ceiling = min(config.retry_backoff_max, config.retry_backoff * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def _send(self, uri, method, body, headers, event=None):
+        host = self._get_host(uri)
+        http = self.pool.checkout(host)
+        start = time.time()
+        try:
+            http_resp = http.request(uri, method, body, headers)
+        except:
+            # the connection may be in a bad state so don't reuse it
+            self.pool.discard(host, http)
+            if event is not None:
+                event.elapsed += time.time() - start
+            raise
+        self.pool.checkin(host, http)
 
         #print http_resp
-        return self.response_class(http_resp)
+        if event is None:
+            return self.response_class(http_resp, self.config)
+        received = time.time()
+        event.elapsed += received - start
+        event.status = http_resp[0].status
+        event.response_bytes = len(http_resp[1] or "")
+        try:
+            resp = self.response_class(http_resp, self.config)
+        finally:
+            event.decode_time = time.time() - received
+        event.result_count = getattr(resp,"total_size",0)
+        return resp
 
     def _display_debug(self,uri,method,body,headers):
         log.debug("%s url:  %s", method, uri)
@@ -132,13 +497,48 @@ class Request(object):
             uri = "%s?%s" % (uri, urllib.urlencode(params))
         
         if params and (method in ["PUT", "POST", "DELETE"]):
-            body = json.dumps(params)
+            body = self.codec.dumps(params)
             post_headers = {'Content-Type': self.content_type}
             headers.update(post_headers)
+            body = self._compress_body(body, headers)
+
+        if not self.config.compress_responses:
+            # httplib2 asks for gzip and deflate, and decodes them, by default
+            headers['Accept-Encoding'] = 'identity'
         
         return uri, method, body, headers 
 
-    def _add_credentials(self, username, password):
+    def _compress_body(self, body, headers):
+        threshold = self.config.compress_threshold
+        if threshold is None or len(body) <= threshold:
+            return body
+        headers['Content-Encoding'] = 'gzip'
+        return gzip_compress(body, self.config.compress_level)
+
+    def _get_pool(self):
+        config = self.config
+        key = (config.username, config.password, config.timeout,
+               config.pool_size, config.pool_idle_timeout, config.pool_timeout)
+        return get_connection_pool(key, self._create_http, config.pool_size, 
+                                   config.pool_idle_timeout, config.pool_timeout)
+
+    def _get_breaker(self):
+        config = self.config
+        if not config.breaker_threshold:
+            return None
+        return get_circuit_breaker(config.root_uri, config.breaker_threshold,
+                                   config.breaker_reset_timeout)
+
+    def _create_http(self):
+        http = httplib2.Http(timeout=self.config.timeout)
+        self._add_credentials(http, self.config.username, self.config.password)
+        return http
+
+    def _get_host(self, uri):
+        parts = urlsplit(uri)
+        return "%s://%s" % (parts.scheme, parts.netloc)
+
+    def _add_credentials(self, http, username, password):
         if username and password:
-            self.http.add_credentials(username, password)
+            http.add_credentials(username, password)
 
@@ -1,3 +1,4 @@
 from resource import RexsterResource, REXSTER_URI, SAIL_URI
+from batch import RexsterTransaction
 from index import ManualIndex, AutomaticIndex
 
@@ -1,36 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Bulk operations sent to Rexster's batch transaction endpoint.
+
+"""
+from bulbs.utils import chunks
+
 
 class RexsterTransaction(object):
+    """
+    Queues create, update, and delete operations so they can be sent to 
+    Rexster's batch transaction endpoint in one request instead of one each.
+
+    Rexster doesn't return the elements it creates, so include an _id in the 
+    data if you need to reference a created element later; graphs that 
+    support user-supplied IDs, such as TinkerGraph, will use it.
+
+    Example::
+
+    >>> tx = RexsterTransaction()
+    >>> tx.create_vertex({'_id':1,'name':'James'})
+    >>> tx.create_vertex({'_id':2,'name':'Julie'})
+    >>> tx.create_edge(1,"knows",2)
+    >>> resp = resource.execute_transaction(tx)
+
+    """
 
     def __init__(self):
+        #: The actions, in the format Rexster's batch endpoint expects.
         self.actions = []
 
+    def __len__(self):
+        return len(self.actions)
+
+    # Vertices
+
+    def create_vertex(self,data):
+        """Queues a vertex create and returns its _id, if the data has one."""
+        return self._add_action("create","vertex",data)
+
+    def update_vertex(self,_id,data):
+        """Queues an update of the vertex's properties."""
+        self._add_action("update","vertex",data,_id=_id)
+
+    def delete_vertex(self,_id):
+        """Queues a vertex delete."""
+        self._add_action("delete","vertex",_id=_id)
+
+    # Edges
+
     def create_edge(self,outV,label,inV,data={}):
+        """Queues an edge create and returns its _id, if the data has one."""
         edge_data = dict(_outV=outV,_label=label,_inV=inV)
-        data.update(edge_data)
-        action = build_action("create","edge",data)
-        self.actions.append(action)
+        return self._add_action("create","edge",data,**edge_data)
+
+    def update_edge(self,_id,data):
+        """Queues an update of the edge's properties."""
+        self._add_action("update","edge",data,_id=_id)
+
+    def delete_edge(self,_id):
+        """Queues an edge delete."""
+        self._add_action("delete","edge",_id=_id)
+
+    # Batches
+
+    def get_batches(self,batch_size):
+        """Yields the actions in batches of at most batch_size actions."""
+        return chunks(self.actions,batch_size)
 
     def build_action(self,_action,_type,data={}):
         action = {'_action':_action,'_type':_type}
         for key, value in data.items():
             action.update({key:value})
-        return action              
-          
-class Neo4jTransaction(object):
-    
-    def __init__(self):
-        self.actions = []
+        return action
 
-    
-    def build_action(self,method,to,body={},request_id=None):
-        # method: GET, POST, PUT, DELETE
-        # to: relative path, e.g. /node, /node/0, /node/0/properties
-        # body: dict(age=34)
-        # request_id: a user-supplied ID for keeping track of responses
-        action = {'method':method,'to':to,'body':body}
-        if request_id is not None:
-            action.update({'id':request_id})
-        
-        for key, value in data.items():
-            action.update({key:value})
-        return action              
+    def _add_action(self,_action,_type,data={},**element_data):
+        # copy the data so the caller's dict isn't modified
+        data = dict(data)
+        data.update(element_data)
+        action = self.build_action(_action,_type,data)
+        self.actions.append(action)
+        return action.get('_id')
+
+
+class RexsterBatchResponse(object):
+    """
+    The combined response for a transaction sent in one or more batches.
+
+    :param transaction: The RexsterTransaction that was executed.
+    :param responses: The RexsterResponse object returned for each batch.
+    :param result_class: The Result class used to wrap the element data.
+
+    """
+
+    def __init__(self,transaction,responses,result_class):
+        #: The RexsterResponse object returned for each batch.
+        self.responses = responses
+
+        #: The number of actions Rexster reported as processed.
+        self.processed = self.get_processed()
+
+        #: A list of Result objects, one for each queued action in the order 
+        #: it was queued. Rexster doesn't return element data so the results 
+        #: are built from the data that was sent; deletes have a result of None.
+        self.results = self.get_results(transaction,result_class)
+
+        #: The number of queued actions.
+        self.total_size = len(self.results)
+
+    def get_processed(self):
+        processed = 0
+        for response in self.responses:
+            content = response.content or {}
+            processed += content.get('txProcessed',0)
+        return processed
+
+    def get_results(self,transaction,result_class):
+        results = []
+        for action in transaction.actions:
+            if action['_action'] == "delete":
+                results.append(None)
+            else:
+                data = dict(action)
+                del data['_action']
+                results.append(result_class(data))
+        return results
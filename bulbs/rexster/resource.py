@@ -1,18 +1,21 @@
 import os
-import ujson as json
 
 #from bulbs import config
-from bulbs.utils import build_path, get_file_path
+from bulbs.utils import build_path, get_file_path, coerce_id
 from bulbs.element import Vertex, VertexProxy, Edge, EdgeProxy
 from bulbs.index import IndexProxy
 from bulbs.gremlin import Gremlin
-from bulbs.yaml import Yaml as Scripts
+from bulbs.groovy import GroovyScripts as Scripts
+from bulbs.metrics import get_gremlin_operation
 from bulbs.typesystem import JSONTypeSystem
+from bulbs.cache import get_element_cache
+from bulbs.stream import JSONArrayStream, decode
 
 # specific to this resource
 from bulbs.resource import Resource, Registry, Response, Result 
 from bulbs.rest import RESPONSE_HANDLERS, Request
 from index import ManualIndex
+from batch import RexsterTransaction, RexsterBatchResponse
 
 # The default URIs
 REXSTER_URI = "http://localhost:8182/graphs/tinkergraph"
@@ -30,8 +33,7 @@ def build_url_list(items):
 
 def get_type_system(config):
     
-    type_system_map = dict(json=(JSONTypeSystem,"application/json"),
-                           rexster=(RexsterTypeSystem,"application/vnd.rexster-typed+json"))
+    type_system_map = dict(json=(JSONTypeSystem,"application/json"))
 
     type_system, content_type = type_system_map[config.type_system]
     return type_system(), content_type
@@ -39,13 +41,16 @@ def get_type_system(config):
 
 class RexsterResult(Result):
 
+    __slots__ = ()
+
     def __init__(self,result):
         self.raw = result
         self.data = result
 
     def get_id(self):
-        _id = self.data['_id']
-        return int(_id)
+        # using coerce_id to support graphs with string IDs, e.g. TinkerGraph
+        _id = self.data.get('_id')
+        return coerce_id(_id)
                
     def get_type(self):
         return self.data['_type']
@@ -56,11 +61,11 @@ class RexsterResult(Result):
                  
     def get_outV(self):
         _outV = self.data.get('_outV')
-        return int(_outV)
+        return coerce_id(_outV)
         
     def get_inV(self):
         _inV = self.data.get('_inV')
-        return int(_inV)
+        return coerce_id(_inV)
 
     def get_label(self):
         return self.data.get('_label')
@@ -74,16 +79,17 @@ class RexsterResponse(Response):
     
     result_class = RexsterResult
 
-    def __init__(self, response, config):
+    def __init__(self, response, config=None):
+        self.config = config
         self.handle_response(response)
         self.headers = self.get_headers(response)
         self.content = self.get_content(response)
         self.results, self.total_size = self.get_results()
-        self.raw = self.response
+        self.raw = response
 
     def handle_response(self,http_resp):
         headers, content = http_resp
-        response_handler = response_handlers.get(headers.status)
+        response_handler = RESPONSE_HANDLERS.get(headers.status)
         response_handler(http_resp)
 
     def get_headers(self,response):
@@ -98,11 +104,17 @@ class RexsterResponse(Response):
         """
         headers, content = response
         if content:
-            content = json.loads(content)
+            threshold = getattr(self.config,'stream_threshold',None)
+            codec = getattr(self.config,'codec',None)
+            content = decode(content,key='results',threshold=threshold,codec=codec)
             return content
 
     def get_results(self):
-        if type(self.content.get('results')) == list:
+        if not self.content:
+            # Rexster returns empty content for some deletes
+            results = None
+            total_size = 0
+        elif isinstance(self.content.get('results'),(list,JSONArrayStream)):
             results = (self.result_class(result) for result in self.content['results'])
             total_size = len(self.content['results'])
         elif self.content.get('results'):
@@ -142,6 +154,7 @@ class RexsterResource(Resource):
         self.registry.add_scripts("gremlin",self.scripts)
         self.type_system, content_type = get_type_system(config)
         self.request = RexsterRequest(config,content_type=content_type)
+        self.cache = get_element_cache(config,RexsterResult)
         #self.index_class = ManualIndex
 
 
@@ -156,7 +169,20 @@ class RexsterResource(Resource):
     #
     def gremlin(self,script): 
         params = dict(script=script)
-        return self.request.post(self.gremlin_path,params)
+        operation = get_gremlin_operation(script)
+        return self.request.post(self.gremlin_path,params,operation)
+
+    #
+    # Ranges
+    #
+    def get_vertices_range(self,start,end):
+        # the gremlin endpoint takes a bare script, so inline the range
+        script = "g.V[%d..%d]" % (start, end)
+        return self.gremlin(script)
+
+    def get_edges_range(self,start,end):
+        script = "g.E[%d..%d]" % (start, end)
+        return self.gremlin(script)
 
     #
     # Vertices
@@ -205,13 +231,13 @@ class RexsterResource(Resource):
     #
 
     def create_automatic_vertex_index(self,index_name,element_class,keys=None):
-        keys = json.dumps(keys) if keys else "null"
+        keys = self.request.codec.dumps(keys) if keys else "null"
         params = dict(index_name=index_name,element_class=element_class,keys=keys)
         script = self.scripts.get('create_automatic_vertex_index',params)
         return self.gremlin(script)
         
     def create_indexed_vertex_automatic(self,data,index_name):
-        data = json.dumps(data)
+        data = self.request.codec.dumps(data)
         params = dict(data=data,index_name=index_name)
         script = self.scripts.get('create_automatic_indexed_vertex',params)
         return self.gremlin(script)
@@ -362,9 +388,23 @@ class RexsterResource(Resource):
         params = dict(idList=idList)
         return self.request.get(path,params)
 
+    def create_transaction(self):
+        """Returns a new, empty RexsterTransaction."""
+        return RexsterTransaction()
+
     def execute_transaction(self,transaction):
-        params = dict(tx=transaction.actions)
-        return self.request.post(self.transction_path,params)
+        """
+        Sends a RexsterTransaction to the batch transaction endpoint and
+        returns a RexsterBatchResponse. Transactions with more than
+        config.batch_size actions are split into multiple requests, and each
+        request is executed in its own server-side transaction.
+        """
+        responses = []
+        for actions in transaction.get_batches(self.config.batch_size):
+            params = dict(tx=actions)
+            resp = self.request.post(self.transaction_path,params)
+            responses.append(resp)
+        return RexsterBatchResponse(transaction,responses,RexsterResult)
 
 
 
@@ -0,0 +1,61 @@
+import unittest
+from bulbs.config import Config
+from bulbs.rexster import RexsterResource, RexsterTransaction, REXSTER_URI
+
+
+class RexsterTransactionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tx = RexsterTransaction()
+
+    def test_create_edge(self):
+        data = dict(weight=1)
+        self.tx.create_edge(1,"knows",2,data)
+        action = self.tx.actions[0]
+        assert action['_action'] == "create"
+        assert action['_type'] == "edge"
+        assert (action['_outV'], action['_label'], action['_inV']) == (1,"knows",2)
+        assert action['weight'] == 1
+        # the caller's data isn't modified
+        assert data == dict(weight=1)
+
+    def test_update_and_delete(self):
+        self.tx.update_vertex(1,dict(name="James"))
+        self.tx.delete_edge(2)
+        assert self.tx.actions[0] == dict(_action="update",_type="vertex",_id=1,name="James")
+        assert self.tx.actions[1] == dict(_action="delete",_type="edge",_id=2)
+
+    def test_get_batches(self):
+        for i in range(5):
+            self.tx.create_vertex(dict(_id=i))
+        batches = list(self.tx.get_batches(2))
+        assert [len(batch) for batch in batches] == [2,2,1]
+
+
+class RexsterBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        config = Config(REXSTER_URI)
+        config.batch_size = 2
+        self.resource = RexsterResource(config)
+
+    def test_execute_transaction(self):
+        tx = RexsterTransaction()
+        tx.create_vertex({'_id':'batch-james','name':'James'})
+        tx.create_vertex({'_id':'batch-julie','name':'Julie'})
+        tx.create_edge('batch-james',"knows",'batch-julie')
+        resp = self.resource.execute_transaction(tx)
+        assert len(resp.responses) == 2
+        assert resp.processed == 3
+        assert resp.results[0].get_id() == 'batch-james'
+        assert resp.results[2].get_type() == "edge"
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(RexsterTransactionTestCase))
+    suite.addTest(unittest.makeSuite(RexsterBatchTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -1,11 +1,15 @@
 import unittest
 from bulbs.tests import BulbsTestCase, suite
-from bulbs.config import Config, REXSTER_URI
-from bulbs.rexster import RexsterResource, RexsterIndex
+from bulbs.config import Config
+from bulbs.rexster import RexsterResource, REXSTER_URI, ManualIndex
+from batch_tests import RexsterTransactionTestCase, RexsterBatchTestCase
 
 config = Config(REXSTER_URI)
 BulbsTestCase.resource = RexsterResource(config)
-BulbsTestCase.index_class = RexsterIndex
+BulbsTestCase.index_class = ManualIndex
 
 if __name__ == '__main__':
+    suite = suite()
+    suite.addTest(unittest.makeSuite(RexsterTransactionTestCase))
+    suite.addTest(unittest.makeSuite(RexsterBatchTestCase))
     unittest.main(defaultTest='suite')
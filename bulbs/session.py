@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Unit of work that saves Model changes in batched requests.
+
+"""
+from element import Vertex, invalidate, get_edge_ids, is_vertex
+from model import Node, Relationship, instantiate_model
+
+
+class Session(object):
+    """
+    Tracks new, changed, and deleted Model instances and saves them all in
+    one transaction when the session is flushed.
+
+    Loaded models use their own change tracking (Model._get_changes), so a
+    model that's assigned to many times is updated once, a model that didn't
+    change isn't updated, and only the changed properties are sent if the
+    transaction supports partial updates. New nodes are created before
+    new relationships so the relationships can reference them, and
+    relationships are deleted before nodes.
+
+    :param resource: The Resource object for the database.
+
+    Example::
+
+    >>> session = Session(g.resource)
+    >>> james = session.create(Person,name="James")
+    >>> julie = session.add(g.people.get(5))
+    >>> julie.age = 34
+    >>> session.create(Knows,james,julie)
+    >>> session.flush()
+
+    """
+
+    def __init__(self,resource):
+        self.resource = resource
+        # each list holds models in the order they were added
+        self.new = []
+        self.loaded = []
+        self.deleted = []
+        # format: set of id(model) for the loaded models
+        self.tracked = set()
+        # format: endpoints[id(relationship)] = (outV, label, inV)
+        self.endpoints = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        if exc_type is None:
+            self.flush()
+
+    def create(self,element_class,*args,**kwds):
+        """
+        Returns a new, unsaved model that's created when the session is
+        flushed. Relationships take (outV, inV) or (outV, label, inV) args,
+        where each vertex can be a new model from this session.
+
+        """
+        model = instantiate_model(element_class,self.resource,kwds)
+        if isinstance(model,Relationship):
+            self.endpoints[id(model)] = self._parse_endpoints(model,args)
+        self.new.append(model)
+        return model
+
+    def add(self,model):
+        """Tracks a loaded model so it's updated on flush if it changes."""
+        if id(model) not in self.tracked:
+            self.tracked.add(id(model))
+            self.loaded.append(model)
+        return model
+
+    def delete(self,model):
+        """Deletes the model when the session is flushed."""
+        if model in self.new:
+            self.new.remove(model)
+            return
+        self.deleted.append(model)
+
+    def is_dirty(self,model):
+        """Returns True if a loaded model changed since it was loaded or saved."""
+        return bool(model._get_changes())
+
+    def flush(self):
+        """
+        Saves all the pending changes in one transaction and returns the
+        batch response, or None if nothing changed.
+
+        """
+        deleted = set(id(model) for model in self.deleted)
+        updated = [model for model in self.loaded
+                   if id(model) not in deleted and self.is_dirty(model)]
+        if not (self.new or updated or self.deleted):
+            return None
+        tx = self.resource.create_transaction()
+        # format: references[id(model)] = reference to the created element
+        references = dict()
+        created = []
+        for model in self._get_create_order():
+            references[id(model)] = self._create(tx,model,references)
+            created.append((len(tx) - 1, model))
+        for model in updated:
+            self._update(tx,model)
+        edge_ids = []
+        for model in self._get_delete_order():
+            if isinstance(model,Vertex):
+                edge_ids.extend(get_edge_ids(self.resource,model._id))
+            self._delete(tx,model)
+        try:
+            resp = self.resource.execute_transaction(tx)
+        finally:
+            # after the write so concurrent gets can't recache old elements
+            self._invalidate(updated + self.deleted,edge_ids)
+        for position, model in created:
+            result = resp.results[position]
+            if result is not None:
+                model._initialize(result)
+        for model in updated:
+            model._reset_changes()
+        self._reset()
+        return resp
+
+    def _get_create_order(self):
+        # nodes first so relationships can reference them
+        nodes = [model for model in self.new if isinstance(model,Vertex)]
+        others = [model for model in self.new if not isinstance(model,Vertex)]
+        return nodes + others
+
+    def _get_delete_order(self):
+        # relationships first since some databases won't delete a node
+        # that still has relationships
+        others = [model for model in self.deleted if not isinstance(model,Vertex)]
+        nodes = [model for model in self.deleted if isinstance(model,Vertex)]
+        return others + nodes
+
+    def _create(self,tx,model,references):
+        data = model._get_property_data()
+        if isinstance(model,Node):
+            index_name = self._get_index_name(model)
+            if index_name is not None and hasattr(tx,"create_indexed_vertex"):
+                return tx.create_indexed_vertex(data,index_name)
+            return tx.create_vertex(data)
+        outV, label, inV = self.endpoints[id(model)]
+        outV = self._get_vertex_id(outV,references)
+        inV = self._get_vertex_id(inV,references)
+        return tx.create_edge(outV,label,inV,data)
+
+    def _update(self,tx,model):
+        index = getattr(model,"_index",None)
+        index_name = index.index_name if index is not None else None
+        base_type = "vertex" if isinstance(model,Vertex) else "edge"
+        update_properties = getattr(tx,"update_indexed_%s_properties" % base_type,None)
+        if update_properties is not None:
+            # a value of None removes the property
+            data = model._get_property_data(model._get_changes())
+            return update_properties(model._id,data,index_name)
+        data = model._get_property_data()
+        update_indexed = getattr(tx,"update_indexed_%s" % base_type,None)
+        if index_name is not None and update_indexed is not None:
+            return update_indexed(model._id,data,index_name)
+        return getattr(tx,"update_%s" % base_type)(model._id,data)
+
+    def _delete(self,tx,model):
+        if isinstance(model,Vertex):
+            return tx.delete_vertex(model._id)
+        return tx.delete_edge(model._id)
+
+    def _invalidate(self,models,edge_ids):
+        for model in models:
+            base_type = "vertex" if isinstance(model,Vertex) else "edge"
+            invalidate(self.resource,base_type,model._id)
+        for edge_id in edge_ids:
+            invalidate(self.resource,"edge",edge_id)
+
+    def _get_index_name(self,model):
+        element_type = getattr(model,self.resource.config.type_var,None)
+        index = model._get_index(element_type)
+        if index is not None:
+            return index.index_name
+
+    def _get_vertex_id(self,vertex,references):
+        if id(vertex) in references:
+            return references[id(vertex)]
+        if is_vertex(vertex):
+            return vertex._id
+        return vertex
+
+    def _parse_endpoints(self,relationship,args):
+        if len(args) == 2:
+            # the label is defined on the relationship class
+            outV, inV = args
+            return outV, getattr(relationship,self.resource.config.label_var), inV
+        return tuple(args)
+
+    def _reset(self):
+        loaded = [model for model in self.loaded + self.new
+                  if model not in self.deleted]
+        self.new, self.loaded, self.deleted = [], [], []
+        self.tracked.clear()
+        self.endpoints.clear()
+        for model in loaded:
+            self.add(model)
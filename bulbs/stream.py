@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+"""
+Incremental decoding of large JSON arrays in response bodies.
+
+Instead of decoding the entire body into one list, the array items are
+located with a regex scan and decoded one at a time as they're iterated, so 
+only one decoded item needs to be in memory at a time.
+
+"""
+import re
+
+from codec import get_codec
+
+# A JSON string or one of the structural characters that change the depth.
+# Numbers, literals, colons, and whitespace are skipped by the scan.
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},]')
+WHITESPACE = re.compile(r'\s*')
+
+
+def first_char(content, start=0):
+    """Returns the first non-whitespace character at or after start."""
+    position = WHITESPACE.match(content, start).end()
+    return content[position:position+1]
+
+
+def iter_array(content, start=0, codec=None):
+    """
+    Yields the decoded items of the JSON array that begins at or after start. 
+    """
+    loads = get_codec(codec).loads
+    depth = 0
+    begin = None
+    for match in TOKEN.finditer(content, start):
+        char = match.group()[0]
+        if char == '"':
+            continue
+        if char == '[' or char == '{':
+            depth += 1
+            if depth == 1:
+                begin = match.end()
+        elif char == ']' or char == '}':
+            depth -= 1
+            if depth == 0:
+                item = content[begin:match.start()]
+                if item.strip():
+                    yield loads(item)
+                return
+        elif depth == 1:
+            yield loads(content[begin:match.start()])
+            begin = match.end()
+
+
+def scan_array(content, start=0):
+    """
+    Returns the item count and end position of the JSON array that begins at
+    or after start, without decoding it.
+    """
+    start = WHITESPACE.match(content, start).end()
+    empty = first_char(content, start + 1) == "]"
+    depth = 0
+    commas = 0
+    for match in TOKEN.finditer(content, start):
+        char = match.group()[0]
+        if char == '"':
+            continue
+        if char == '[' or char == '{':
+            depth += 1
+        elif char == ']' or char == '}':
+            depth -= 1
+            if depth == 0:
+                count = 0 if empty else commas + 1
+                return count, match.end()
+        elif depth == 1:
+            commas += 1
+    raise ValueError("Unterminated JSON array at position %d" % start)
+
+
+def find_key(content, key, codec=None):
+    """
+    Returns the position of the value of the key in the top-level JSON 
+    object, or None if the object doesn't contain the key.
+    """
+    quoted_key = get_codec(codec).dumps(key)
+    depth = 0
+    for match in TOKEN.finditer(content):
+        token = match.group()
+        char = token[0]
+        if char == '"':
+            if depth == 1 and token == quoted_key:
+                # it's a key if it's followed by a colon
+                position = WHITESPACE.match(content, match.end()).end()
+                if content[position:position+1] == ":":
+                    return position + 1
+        elif char == '[' or char == '{':
+            depth += 1
+        elif char == ']' or char == '}':
+            depth -= 1
+            if depth == 0:
+                return None
+    return None
+
+
+class JSONArrayStream(object):
+    """
+    A lazily decoded JSON array in a response body.
+
+    Iterating it decodes one item at a time; len() scans the array without 
+    decoding it and caches the count.
+
+    :param content: The response body.
+    :param start: The position of the array in the body.
+    :param codec: Optional Codec, or backend name, used to decode the items.
+
+    """
+
+    def __init__(self, content, start=0, codec=None):
+        self.content = content
+        self.start = start
+        self.codec = codec
+        self._size = None
+        self._end = None
+
+    def __iter__(self):
+        return iter_array(self.content, self.start, self.codec)
+
+    def __len__(self):
+        if self._size is None:
+            self._size, self._end = scan_array(self.content, self.start)
+        return self._size
+
+    def end(self):
+        """Returns the position in the body just after the array."""
+        len(self)
+        return self._end
+
+
+def decode_array(content, codec=None):
+    """Returns a JSONArrayStream for a body that contains a JSON array."""
+    return JSONArrayStream(content, WHITESPACE.match(content).end(), codec)
+
+
+def decode_object(content, key, codec=None):
+    """
+    Decodes a body that contains a JSON object, but returns the array value 
+    of the key as a JSONArrayStream instead of decoding it. 
+    """
+    codec = get_codec(codec)
+    start = find_key(content, key, codec)
+    if start is None or first_char(content, start) != "[":
+        return codec.loads(content)
+    stream = JSONArrayStream(content, start, codec)
+    # decode the rest of the object with an empty placeholder for the array
+    rest = "%s[]%s" % (content[:start], content[stream.end():])
+    decoded = codec.loads(rest)
+    decoded[key] = stream
+    return decoded
+
+
+def decode(content, key=None, threshold=None, codec=None):
+    """
+    Decodes a JSON response body with the codec. If threshold is set and the 
+    body is larger than threshold bytes, a top-level array, or the array 
+    value of key in a top-level object, is returned as a JSONArrayStream.
+    """
+    codec = get_codec(codec)
+    if threshold is None or len(content) <= threshold:
+        return codec.loads(content)
+    char = first_char(content)
+    if char == "[":
+        return decode_array(content, codec)
+    if char == "{" and key is not None:
+        return decode_object(content, key, codec)
+    return codec.loads(content)
@@ -1,3 +1,101 @@
+import threading
+
+from utils import initialize_element
+
+
+class Prefetch(threading.Thread):
+    """Fetches a page in a background thread."""
+
+    def __init__(self,fetch,start,size):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.fetch = fetch
+        self.args = (start, size)
+        self.page = None
+        self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            self.page = self.fetch(*self.args)
+        except Exception, e:
+            self.error = e
+
+    def result(self):
+        self.join()
+        if self.error is not None:
+            raise self.error
+        return self.page
+
+
+class ElementSequence(object):
+    """
+    Lazy, paged sequence of all the vertices or edges in the graph.
+
+    Elements are fetched page_size at a time with a ranged Gremlin query, 
+    so only one page (two when prefetching) is held in memory.
+
+    :param resource: The Resource object for the database.
+    :param get_range: Resource method that takes an inclusive start/end 
+                      range and returns the Response.
+    :param page_size: Default number of elements fetched per request.
+
+    """
+
+    def __init__(self,resource,get_range,page_size=1000):
+        self.resource = resource
+        self.get_range = get_range
+        self.page_size = page_size
+
+    def __iter__(self):
+        return self.iter()
+
+    def iter(self,page_size=None,prefetch=False):
+        """
+        Returns a generator over the elements, fetched a page at a time.
+
+        :param page_size: Number of elements fetched per request. 
+                          Defaults to config.page_size.
+        :param prefetch: Boolean. If True, fetch the next page in a 
+                         background thread while the current one is yielded.
+
+        :rtype: Generator of :class:`~bulbs.element.Element` objects.
+
+        """
+        for result in self.iter_results(page_size,prefetch):
+            yield initialize_element(self.resource,result)
+
+    def iter_results(self,page_size=None,prefetch=False):
+        """
+        Returns a generator over the raw Result objects, fetched a page at 
+        a time. Takes the same arguments as iter().
+
+        """
+        size = page_size or self.page_size
+        assert size > 0, "page_size must be positive"
+        start = 0
+        pending = Prefetch(self.get_page,start,size) if prefetch else None
+        while True:
+            if pending is not None:
+                page = pending.result()
+                pending = None
+            else:
+                page = self.get_page(start,size)
+            start += size
+            if prefetch and len(page) == size:
+                pending = Prefetch(self.get_page,start,size)
+            for result in page:
+                yield result
+            if len(page) < size:
+                return
+
+    def get_page(self,start,size):
+        resp = self.get_range(start,start+size-1)
+        if resp.total_size > 0:
+            return list(resp.results)
+        return []
+
+
 
 class Sugar(object):
     """Graph mixin containing some syntactic sugar."""
@@ -16,11 +114,16 @@ class Sugar(object):
         >>> g = Graph()
         >>> vertices = g.V
 
-        :rtype: List of :class:`~bulbs.element.Vertex` objects. 
+        You can page through them explicitly::
+
+        >>> for vertex in g.V.iter(page_size=100,prefetch=True):
+        ...     print vertex
+
+        :rtype: ElementSequence of :class:`~bulbs.element.Vertex` objects. 
 
         """
-        resp = self.resource.gremlin("g.V")
-        return list(resp.results)
+        return ElementSequence(self.resource,self.resource.get_vertices_range,
+                               self.resource.config.page_size)
     
     @property
     def E(self):
@@ -32,11 +135,16 @@ class Sugar(object):
         >>> g = Graph()
         >>> edges = g.E
 
-        :rtype: List of :class:`~bulbs.element.Edge` objects.
+        You can page through them explicitly::
+
+        >>> for edge in g.E.iter(page_size=100,prefetch=True):
+        ...     print edge
+
+        :rtype: ElementSequence of :class:`~bulbs.element.Edge` objects.
 
         """
-        resp = self.resource.gremlin("g.E")
-        return list(resp.results)
+        return ElementSequence(self.resource,self.resource.get_edges_range,
+                               self.resource.config.page_size)
 
     def idxV(self,**kwds):
         """
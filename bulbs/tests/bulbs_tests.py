@@ -1,22 +1,58 @@
 import unittest
 
-from rest_tests import RestTestCase
+from rest_tests import RestTestCase, ConnectionPoolTestCase, RetryTestCase, \
+    CompressionTestCase
 from element_tests import VertexTestCase, VertexProxyTestCase, EdgeProxyTestCase
 #from graph_tests import GraphTestCase
 #from index_tests import IndexTestCase
 from model_tests import NodeTestCase, RelationshipTestCase
+from cache_tests import LocalStoreTestCase, ElementCacheTestCase, InvalidationTestCase
+from stream_tests import StreamTestCase
+from codec_tests import CodecTestCase
+from executor_tests import ExecutorTestCase
+from loader_tests import LoaderTestCase
+from exporter_tests import ExporterTestCase
+from session_tests import SessionTestCase, ChangeTrackingTestCase
+from groovy_tests import GroovyScriptsTestCase, ParserTestCase, \
+    CatalogTestCase, ServerScriptsTestCase
+from typesystem_tests import ConverterPlanTestCase
+from lazy_tests import LazyTestCase
+from sugar_tests import ElementSequenceTestCase
+from metrics_tests import MetricsTestCase, ProfilerTestCase
 
 
 def suite():
 
     suite = unittest.TestSuite()
     #suite.addTest(unittest.makeSuite(RestTestCase))
+    suite.addTest(unittest.makeSuite(ConnectionPoolTestCase))
+    suite.addTest(unittest.makeSuite(RetryTestCase))
+    suite.addTest(unittest.makeSuite(CompressionTestCase))
     suite.addTest(unittest.makeSuite(VertexTestCase))
     suite.addTest(unittest.makeSuite(VertexProxyTestCase))
     suite.addTest(unittest.makeSuite(EdgeProxyTestCase))
     #suite.addTest(unittest.makeSuite(IndexTestCase))
     suite.addTest(unittest.makeSuite(NodeTestCase))
     suite.addTest(unittest.makeSuite(RelationshipTestCase))
+    suite.addTest(unittest.makeSuite(LocalStoreTestCase))
+    suite.addTest(unittest.makeSuite(ElementCacheTestCase))
+    suite.addTest(unittest.makeSuite(InvalidationTestCase))
+    suite.addTest(unittest.makeSuite(StreamTestCase))
+    suite.addTest(unittest.makeSuite(CodecTestCase))
+    suite.addTest(unittest.makeSuite(ExecutorTestCase))
+    suite.addTest(unittest.makeSuite(GroovyScriptsTestCase))
+    suite.addTest(unittest.makeSuite(ParserTestCase))
+    suite.addTest(unittest.makeSuite(CatalogTestCase))
+    suite.addTest(unittest.makeSuite(ServerScriptsTestCase))
+    suite.addTest(unittest.makeSuite(LoaderTestCase))
+    suite.addTest(unittest.makeSuite(ExporterTestCase))
+    suite.addTest(unittest.makeSuite(SessionTestCase))
+    suite.addTest(unittest.makeSuite(ChangeTrackingTestCase))
+    suite.addTest(unittest.makeSuite(ConverterPlanTestCase))
+    suite.addTest(unittest.makeSuite(LazyTestCase))
+    suite.addTest(unittest.makeSuite(ElementSequenceTestCase))
+    suite.addTest(unittest.makeSuite(MetricsTestCase))
+    suite.addTest(unittest.makeSuite(ProfilerTestCase))
 
     return suite
 
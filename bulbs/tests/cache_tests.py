@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import time
+import unittest
+
+from bulbs.cache import LocalStore, ElementCache
+from bulbs.resource import Result
+from bulbs.element import Vertex, VertexProxy
+from bulbs.session import Session
+from bulbs.neo4jserver.resource import Neo4jResult
+from session_tests import FakeResource, FakeResponse
+
+
+class FakeResult(Result):
+
+    def __init__(self,result):
+        self.raw = result
+        self.data = result.get('data')
+
+    def get_id(self):
+        return self.raw['id']
+
+
+class LocalStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = LocalStore(max_size=2)
+
+    def test_set_and_get(self):
+        self.store.set("a",1)
+        assert self.store.get("a") == 1
+        assert self.store.get("b") is None
+
+    def test_lru_eviction(self):
+        self.store.set("a",1)
+        self.store.set("b",2)
+        self.store.get("a")
+        self.store.set("c",3)
+        assert self.store.get("b") is None
+        assert self.store.get("a") == 1
+        assert self.store.get("c") == 3
+        assert self.store.evictions == 1
+
+    def test_ttl_expiry(self):
+        self.store.set("a",1,time=0.01)
+        time.sleep(0.02)
+        assert self.store.get("a") is None
+        assert self.store.expirations == 1
+        assert len(self.store) == 0
+
+    def test_delete(self):
+        self.store.set("a",1)
+        self.store.delete("a")
+        self.store.delete("missing")
+        assert self.store.get("a") is None
+
+
+class ElementCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ElementCache(LocalStore(),FakeResult,ttl=60)
+
+    def test_hit_and_miss(self):
+        assert self.cache.get("vertex",1) is None
+        self.cache.set("vertex",FakeResult(dict(id=1,data=dict(name="James"))))
+        result = self.cache.get("vertex",1)
+        assert result.data == dict(name="James")
+        assert self.cache.get("edge",1) is None
+        stats = self.cache.stats()
+        assert (stats['hits'], stats['misses']) == (1, 2)
+
+    def test_cached_data_is_copied(self):
+        self.cache.set("vertex",FakeResult(dict(id=1,data=dict(name="James"))))
+        result = self.cache.get("vertex",1)
+        result.data['name'] = "Julie"
+        assert self.cache.get("vertex",1).data['name'] == "James"
+
+    def test_delete(self):
+        self.cache.set("vertex",FakeResult(dict(id=1,data={})))
+        self.cache.delete("vertex",1)
+        assert self.cache.get("vertex",1) is None
+
+
+class CachingResource(FakeResource):
+
+    def __init__(self):
+        FakeResource.__init__(self)
+        self.cache = ElementCache(LocalStore(),Neo4jResult)
+
+    def get_result(self,base_type,_id):
+        path = "node" if base_type == "vertex" else "relationship"
+        return Neo4jResult(dict(self="http://localhost/db/data/%s/%d" % (path, _id),data={}))
+
+    def concurrent_get(self,base_type,_id):
+        # another thread reads the old element while the write is in progress
+        self.cache.set(base_type,self.get_result(base_type,_id))
+
+    def update_vertex(self,_id,data):
+        self.concurrent_get("vertex",_id)
+        return FakeResponse(None)
+
+    def delete_vertex(self,_id):
+        self.concurrent_get("vertex",_id)
+        return FakeResponse(None)
+
+    def bothE(self,_id,label=None):
+        resp = FakeResponse([self.get_result("edge",7), self.get_result("edge",8)])
+        resp.total_size = 2
+        return resp
+
+    def execute_transaction(self,tx):
+        for operation in tx.operations:
+            self.concurrent_get(operation[0].split("_")[1],operation[1])
+        return FakeResource.execute_transaction(self,tx)
+
+
+class InvalidationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = CachingResource()
+        self.vertices = VertexProxy(Vertex,self.resource)
+
+    def test_update(self):
+        self.vertices.update(1,dict(name="James"))
+        assert self.resource.cache.get("vertex",1) is None
+
+    def test_delete_evicts_edges(self):
+        for _id in (7, 8):
+            self.resource.cache.set("edge",self.resource.get_result("edge",_id))
+        self.vertices.delete(1)
+        assert self.resource.cache.get("vertex",1) is None
+        assert self.resource.cache.get("edge",7) is None
+        assert self.resource.cache.get("edge",8) is None
+
+    def test_session(self):
+        session = Session(self.resource)
+        james = session.add(self.resource.get_person(1,"James"))
+        julie = session.add(self.resource.get_person(2,"Julie"))
+        james.age = 34
+        session.delete(julie)
+        self.resource.cache.set("edge",self.resource.get_result("edge",7))
+        session.flush()
+        for base_type, _id in (("vertex", 1), ("vertex", 2), ("edge", 7)):
+            assert self.resource.cache.get(base_type,_id) is None
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(LocalStoreTestCase))
+    suite.addTest(unittest.makeSuite(ElementCacheTestCase))
+    suite.addTest(unittest.makeSuite(InvalidationTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
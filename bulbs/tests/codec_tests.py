@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import os
+import sys
+import unittest
+import subprocess
+
+import httplib2
+
+import bulbs
+from bulbs.config import Config
+from bulbs.codec import Codec, get_codec, load_codec, default_codec
+from bulbs.stream import JSONArrayStream
+from bulbs.neo4jserver.resource import Neo4jRequest, Neo4jResponse
+
+
+NODE = {"self": "http://localhost:7474/db/data/node/1",
+        "data": {"name": "Jos\xc3\xa9".decode("utf-8"), "age": 34, "score": 0.5,
+                 "tags": ["a", "b"], "active": True, "email": None}}
+
+
+class RecordingCodec(Codec):
+
+    def __init__(self):
+        codec = load_codec("json")
+        self.calls = []
+        def loads(content):
+            self.calls.append(("loads", content))
+            return codec.loads(content)
+        def dumps(obj):
+            self.calls.append(("dumps", obj))
+            return codec.dumps(obj)
+        Codec.__init__(self,"recording",loads,dumps)
+
+
+class CodecTestCase(unittest.TestCase):
+
+    def test_default_codec(self):
+        # ujson is a requirement, so it's the fastest one installed
+        assert default_codec.name == "ujson"
+        assert get_codec() is default_codec
+        assert get_codec("ujson") is default_codec
+
+    def test_backends(self):
+        for name in ("ujson", "json"):
+            codec = get_codec(name)
+            # decodes the UTF-8 bytes returned by httplib2
+            content = codec.dumps(NODE)
+            assert isinstance(content,str)
+            assert codec.loads(content) == NODE
+            assert get_codec(codec) is codec
+
+    def test_without_ujson(self):
+        # blocking the import makes the package fall back to another backend
+        code = "import sys; sys.modules['ujson'] = None; " \
+            "import bulbs.neo4jserver, bulbs.rexster, bulbs.loader, bulbs.exporter; " \
+            "from bulbs.codec import default_codec; print default_codec.name"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(bulbs.__file__)))
+        output = subprocess.check_output([sys.executable,"-c",code],cwd=root)
+        assert output.strip() in ("simplejson", "json")
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError,get_codec,"yajl")
+
+    def test_config_codec(self):
+        codec = RecordingCodec()
+        config = Config("http://localhost:7474/db/data/")
+        config.codec = codec
+        request = Neo4jRequest(config,"application/json")
+        uri, method, body, headers = request._build_request_args("node","POST",dict(name="James"))
+        assert codec.calls == [("dumps", dict(name="James"))]
+        content = '[%s, %s]' % (body, body)
+        resp = Neo4jResponse((httplib2.Response(dict(status=200)),content),config)
+        assert codec.calls[-1] == ("loads", content)
+        assert resp.total_size == 2
+
+    def test_streamed_with_codec(self):
+        codec = RecordingCodec()
+        config = Config("http://localhost:7474/db/data/")
+        config.codec = codec
+        config.stream_threshold = 10
+        content = '[{"self":"http://localhost/node/1"},{"self":"http://localhost/node/2"}]'
+        resp = Neo4jResponse((httplib2.Response(dict(status=200)),content),config)
+        assert isinstance(resp.content,JSONArrayStream)
+        assert [result.get_id() for result in resp.results] == [1, 2]
+        assert len(codec.calls) == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -48,6 +48,16 @@ class VertexProxyTestCase(BulbsTestCase):
         j2 = self.vertices.get(james._id)
         assert j2 == None
 
+    def test_get_many(self):
+        james = self.vertices.create({'name':'James'})
+        julie = self.vertices.create({'name':'Julie'})
+        self.vertices.delete(julie._id)
+        vertices = self.vertices.get_many([james._id,julie._id,str(james._id)])
+        assert len(vertices) == 3
+        assert vertices[0]._id == james._id
+        assert vertices[1] is None
+        assert vertices[2]._id == james._id
+
 
 class VertexTestCase(BulbsTestCase):
     
@@ -128,6 +138,12 @@ class EdgeProxyTestCase(BulbsTestCase):
         resp = self.edges.delete(e1._id)
         e2 = self.edges.get(e1._id)
         assert e2 == None
+
+    def test_get_many(self):
+        e1 = self.edges.create(self.james,"test",self.julie)
+        e2 = self.edges.create(self.julie,"test",self.james)
+        edges = self.edges.get_many([e2._id,e1._id])
+        assert [edge._id for edge in edges] == [e2._id,e1._id]
         
 def suite():
     suite = unittest.TestSuite()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import time
+import threading
+import unittest
+
+from bulbs.executor import Executor, AsyncProxy
+from bulbs.element import get_adjacent
+
+
+class Counter(object):
+
+    size = 3
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def add(self,a,b):
+        self.lock.acquire()
+        self.running += 1
+        self.peak = max(self.peak,self.running)
+        self.lock.release()
+        time.sleep(0.01)
+        self.lock.acquire()
+        self.running -= 1
+        self.lock.release()
+        return a + b
+
+    def fail(self):
+        raise LookupError("missing")
+
+
+class FakeVertex(object):
+
+    def __init__(self,_id):
+        self._id = _id
+
+    def outE(self,label=None):
+        if self._id < 0:
+            raise LookupError(self._id)
+        return iter([(self._id, label)])
+
+    def inV(self,label=None):
+        # initialize_elements returns None when there are no results
+        return None
+
+
+class ExecutorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = Executor(max_workers=2)
+        self.counter = Counter()
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_submit(self):
+        future = self.executor.submit(self.counter.add,1,2)
+        assert future.result(timeout=5) == 3
+        assert future.done()
+        assert future.exception() is None
+
+    def test_exception(self):
+        future = self.executor.submit(self.counter.fail)
+        self.assertRaises(LookupError,future.result,5)
+        assert isinstance(future.exception(),LookupError)
+
+    def test_map_limits_workers(self):
+        futures = self.executor.map(self.counter.add,range(10),range(10))
+        results = [future.result(timeout=5) for future in futures]
+        assert results == [i * 2 for i in range(10)]
+        assert self.counter.peak <= 2
+        assert len(self.executor.workers) == 2
+
+    def test_done_callback(self):
+        done = []
+        future = self.executor.submit(self.counter.add,1,1)
+        future.add_done_callback(done.append)
+        future.result(timeout=5)
+        future.add_done_callback(done.append)
+        time.sleep(0.01)
+        assert done == [future, future]
+
+    def test_async_proxy(self):
+        proxy = AsyncProxy(self.counter,self.executor)
+        assert proxy.size == 3
+        assert proxy.add(2,3).result(timeout=5) == 5
+
+    def test_get_adjacent(self):
+        requests = [(FakeVertex(1),"outE","knows"),
+                    (FakeVertex(-1),"outE",None),
+                    (FakeVertex(2),"inV",None)]
+        outcomes = get_adjacent(requests,max_in_flight=2)
+        assert outcomes[0] == ([(1, "knows")], None)
+        assert outcomes[1][0] is None
+        assert isinstance(outcomes[1][1],LookupError)
+        assert outcomes[2] == ([], None)
+
+    def test_get_adjacent_direction(self):
+        requests = [(FakeVertex(1),"sideways",None)]
+        self.assertRaises(ValueError,get_adjacent,requests)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(ExecutorTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import gzip
+import unittest
+from StringIO import StringIO
+from xml.dom import minidom
+import ujson as json
+
+from bulbs.config import Config
+from bulbs.exporter import Exporter
+
+
+class FakeResult(object):
+
+    def __init__(self,_id,data,outV=None,label=None,inV=None):
+        self._id = _id
+        self.data = data
+        self.outV, self.label, self.inV = outV, label, inV
+
+    def get_id(self):
+        return self._id
+
+    def get_outV(self):
+        return self.outV
+
+    def get_inV(self):
+        return self.inV
+
+    def get_label(self):
+        return self.label
+
+
+class FakeResponse(object):
+
+    def __init__(self,results):
+        self.results = iter(results)
+        self.total_size = len(results)
+
+
+class FakeResource(object):
+
+    def __init__(self):
+        self.config = Config("http://localhost/")
+        self.vertices = [FakeResult(1,{'name':u'James & Co','age':34}),
+                         FakeResult(2,{'name':'Julie','age':'unknown'}),
+                         FakeResult(3,{'tags':['a','b'],'score':0.5})]
+        self.edges = [FakeResult(4,{'weight':1.5},1,"knows",2),
+                      FakeResult(5,{},2,"knows",3)]
+        self.requests = 0
+
+    def get_vertices_range(self,start,end):
+        self.requests += 1
+        return FakeResponse(self.vertices[start:end+1])
+
+    def get_edges_range(self,start,end):
+        self.requests += 1
+        return FakeResponse(self.edges[start:end+1])
+
+
+class ExporterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = FakeResource()
+        self.exporter = Exporter(self.resource,page_size=2)
+
+    def test_graphml(self):
+        fout = StringIO()
+        stats = self.exporter.write_graphml(fout)
+        assert stats.vertices == 3
+        assert stats.edges == 2
+        assert stats.bytes == len(fout.getvalue())
+        assert self.resource.requests == 4
+        dom = minidom.parseString(fout.getvalue())
+        keys = dict((key.getAttribute("attr.name"), key.getAttribute("attr.type"))
+                    for key in dom.getElementsByTagName("key"))
+        # age has mixed types, so it's a string
+        assert keys == dict(name="string", age="string", tags="string",
+                            score="double", weight="double")
+        nodes = dom.getElementsByTagName("node")
+        assert [node.getAttribute("id") for node in nodes] == ["1", "2", "3"]
+        data = dict((item.getAttribute("key"), item.firstChild.data) 
+                    for item in nodes[0].getElementsByTagName("data"))
+        assert data == dict(v_name=u"James & Co", v_age=u"34")
+        edge = dom.getElementsByTagName("edge")[0]
+        assert edge.getAttribute("source") == "1"
+        assert edge.getAttribute("target") == "2"
+        assert edge.getAttribute("label") == "knows"
+
+    def test_json_lines(self):
+        fout = StringIO()
+        stats = self.exporter.write_json_lines(fout)
+        lines = [json.loads(line) for line in fout.getvalue().splitlines()]
+        assert len(lines) == 5
+        assert lines[0] == dict(_id=1,_type="vertex",name="James & Co",age=34)
+        assert lines[3] == dict(_id=4,_type="edge",_outV=1,_label="knows",
+                                _inV=2,weight=1.5)
+        assert stats.throughput() > 0
+
+    def test_compress(self):
+        fout = StringIO()
+        stats = self.exporter.write_json_lines(fout,compress=True)
+        content = gzip.GzipFile(fileobj=StringIO(fout.getvalue())).read()
+        assert len(content) == stats.bytes
+        assert len(content.splitlines()) == 5
+
+
+if __name__ == '__main__':
+    unittest.main()
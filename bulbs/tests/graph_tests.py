@@ -20,6 +20,11 @@ class GraphTestCase(unittest.TestCase):
         edges = list(edges)
         assert len(edges) > 0
 
+    def test_V_iter(self):
+        vertices = self.graph.V.iter(page_size=2,prefetch=True)
+        vertices = list(vertices)
+        assert len(vertices) == len(list(self.graph.V))
+
     def test_idxV(self):
         self.graph.vertices.create({'name':'james'})
         vertices = self.graph.idxV(name="james")
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from bulbs import groovy
+from bulbs.groovy import GroovyScripts, Script, ServerScripts, Parser, ParseError
+
+
+class FakeServer(object):
+
+    def __init__(self):
+        self.functions = set()
+        self.scripts = []
+        self.error = None
+
+    def post(self,script,params):
+        self.scripts.append(script)
+        for line in script.split("\n"):
+            if line.startswith("g.class.metaClass."):
+                self.functions.add(line.split()[0].split(".")[-1])
+        call = script.split("\n")[-1]
+        name = call[2:call.index("(")]
+        if name not in self.functions:
+            raise ValueError("groovy.lang.MissingMethodException: No signature of method: "
+                             "com.tinkerpop.blueprints.pgm.impls.neo4j.Neo4jGraph.%s() "
+                             "is applicable for argument types: (java.lang.Integer)" % name)
+        if self.error is not None:
+            raise self.error
+        return params
+
+
+class GroovyScriptsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.scripts = GroovyScripts()
+
+    def test_get(self):
+        script = self.scripts.get("outE")
+        assert isinstance(script,Script)
+        assert script.name == "outE"
+        assert script.params == ("_id", "label")
+        assert len(script.sha1) == 40
+        assert script.startswith("if (label == null)")
+
+    def test_no_params(self):
+        script = self.scripts.get("get_vertices")
+        assert script.params == ()
+        assert script == "g.getVertices()"
+
+
+class ParserTestCase(unittest.TestCase):
+
+    def parse(self,content):
+        fd, file_name = tempfile.mkstemp(suffix=".groovy")
+        fout = os.fdopen(fd,'w')
+        fout.write(content)
+        fout.close()
+        try:
+            return Parser(file_name).get_methods()
+        finally:
+            os.remove(file_name)
+
+    def test_parse(self):
+        methods = self.parse("// comment\ndef one(a, b) {\n  a + b\n}\n\n"
+                             "def two() {\n  if (true) {\n    2\n  }\n}\n}\n")
+        assert methods["one"] == "a + b"
+        assert methods["one"].params == ("a", "b")
+        assert methods["two"] == "if (true) {\n    2\n  }"
+        assert methods["two"].params == ()
+
+    def test_unclosed_method(self):
+        try:
+            self.parse("\ndef one() {\n  1\n")
+        except ParseError, e:
+            assert e.line_number == 2
+        else:
+            assert False, "ParseError not raised"
+
+    def test_nested_def(self):
+        try:
+            self.parse("def one() {\n  1\ndef two() {\n  2\n}\n")
+        except ParseError, e:
+            assert e.line_number == 3
+            assert "line 3" in str(e)
+        else:
+            assert False, "ParseError not raised"
+
+    def test_local_def(self):
+        methods = self.parse("def one(a) {\ndef x = a + 1\ndef (y, z) = [x, 2]\n"
+                             "def m = [key: 'value']\nx\n}\n")
+        assert methods["one"] == "def x = a + 1\ndef (y, z) = [x, 2]\n" \
+            "def m = [key: 'value']\nx"
+
+    def test_invalid_definition(self):
+        self.assertRaises(ParseError,self.parse,"def one {\n  1\n}\n")
+
+
+class CatalogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_name = tempfile.mkdtemp()
+        self.catalog_dir = groovy.CATALOG_DIR
+        groovy.CATALOG_DIR = os.path.join(self.dir_name,"catalogs")
+        self.file_name = os.path.join(self.dir_name,"test.groovy")
+        self.write("def one(a) {\n  a + 1\n}\n")
+
+    def tearDown(self):
+        groovy.CATALOG_DIR = self.catalog_dir
+        groovy.clear_catalogs()
+        shutil.rmtree(self.dir_name)
+
+    def write(self,content):
+        fout = open(self.file_name,'w')
+        fout.write(content)
+        fout.close()
+
+    def test_shared_in_process(self):
+        catalog = groovy.get_catalog(self.file_name)
+        assert catalog["one"] == "a + 1"
+        assert groovy.get_catalog(self.file_name) is catalog
+
+    def test_loaded_from_disk(self):
+        catalog = groovy.get_catalog(self.file_name)
+        groovy.clear_catalogs()
+        parser = groovy.Parser
+        groovy.Parser = None
+        try:
+            loaded = groovy.get_catalog(self.file_name)
+        finally:
+            groovy.Parser = parser
+        assert loaded == catalog
+        assert loaded["one"].params == ("a",)
+        assert loaded["one"].sha1 == catalog["one"].sha1
+
+    def test_corrupt_catalog_is_reparsed(self):
+        groovy.get_catalog(self.file_name)
+        groovy.clear_catalogs()
+        fout = open(groovy.get_catalog_path(os.path.abspath(self.file_name)),'w')
+        fout.write('{"version": 3, "methods": [["one"')
+        fout.close()
+        assert groovy.get_catalog(self.file_name)["one"] == "a + 1"
+
+    def test_shared_dir_is_not_used(self):
+        groovy.get_catalog(self.file_name)
+        assert stat.S_IMODE(os.stat(groovy.CATALOG_DIR).st_mode) == 0700
+        groovy.clear_catalogs()
+        os.chmod(groovy.CATALOG_DIR,0777)
+        assert groovy.load_catalog(os.path.abspath(self.file_name),
+                                   groovy.get_stamp(self.file_name)) is None
+
+    def test_reparsed_when_changed(self):
+        groovy.get_catalog(self.file_name)
+        self.write("def one(a) {\n  a + 2\n}\n\ndef two() {\n  2\n}\n")
+        catalog = groovy.get_catalog(self.file_name)
+        assert catalog["one"] == "a + 2"
+        assert catalog["two"] == "2"
+
+    def test_override_is_lazy(self):
+        scripts = GroovyScripts()
+        scripts.override(self.file_name)
+        assert scripts._methods is None
+        assert scripts.get("one") == "a + 1"
+        assert "outE" in scripts.methods
+        # overriding doesn't change the shared catalog
+        assert "one" not in groovy.get_catalog(scripts.file_name)
+
+
+class ServerScriptsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeServer()
+        self.server_scripts = ServerScripts()
+        body = "import org.example.Thing\nThing.get(_id,label)"
+        self.script = Script(body,"thing",("_id", "label"),"a" * 40)
+
+    def test_build_definition(self):
+        definition = self.server_scripts.build_definition(self.script)
+        lines = definition.split("\n")
+        assert lines[0] == "import org.example.Thing"
+        assert lines[1] == "g.class.metaClass.bulbs_thing_aaaaaaaaaaaa = { _id,label ->"
+        assert lines[-1] == "g.bulbs_thing_aaaaaaaaaaaa(_id,label)"
+
+    def test_bundled_script_variables_are_local(self):
+        dir_name = os.path.dirname(groovy.__file__)
+        scripts = GroovyScripts(os.path.join(dir_name,"neo4jserver","gremlin.groovy"))
+        expected = dict(create_indexed_vertex="  def neo4j, manager, index, vertex",
+                        update_indexed_vertex="  def vertex, manager, index")
+        for name, declaration in expected.items():
+            definition = self.server_scripts.build_definition(scripts.get(name))
+            lines = definition.split("\n")
+            assert lines[2] == declaration
+            # every other assignment comes after the declarations
+            for line in lines[3:]:
+                assert not line.strip().startswith("def ")
+
+    def test_declared_variables_are_kept(self):
+        body = "def x = 1\nx = x + _id\ny = x\nif (y == 2) y"
+        script = Script(body,"thing",("_id",),"b" * 40)
+        lines = self.server_scripts.build_definition(script).split("\n")
+        assert lines[2] == "  def y"
+        assert lines[3] == "def x = 1"
+
+    def test_execute(self):
+        params = dict(_id=1,label=None)
+        execute = self.server_scripts.execute
+        assert execute(self.server.post,self.script,params) == params
+        assert execute(self.server.post,self.script,params) == params
+        assert self.server.scripts[1] == "g.bulbs_thing_aaaaaaaaaaaa(_id,label)"
+        stats = self.server_scripts.stats()
+        assert stats['registrations'] == 1
+        assert stats['calls'] == 1
+        assert stats['bytes_sent'] == sum(len(s) for s in self.server.scripts)
+        call = self.server.scripts[1]
+        assert stats['bytes_saved'] == len(self.script) - len(call)
+
+    def test_registration_saves_nothing(self):
+        self.server_scripts.execute(self.server.post,self.script,dict(_id=1,label=None))
+        assert self.server_scripts.stats()['bytes_saved'] == 0
+
+    def test_reregister_on_miss(self):
+        params = dict(_id=1,label=None)
+        self.server_scripts.execute(self.server.post,self.script,params)
+        # the server restarts and loses its functions
+        self.server.functions.clear()
+        self.server_scripts.execute(self.server.post,self.script,params)
+        stats = self.server_scripts.stats()
+        assert stats['misses'] == 1
+        assert stats['registrations'] == 2
+        assert len(self.server.scripts) == 3
+
+    def test_error_in_closure_is_raised(self):
+        params = dict(_id=1,label=None)
+        self.server_scripts.execute(self.server.post,self.script,params)
+        # an error from inside the closure names the closure in its stack trace
+        name = self.server_scripts.get_function_name(self.script)
+        self.server.error = SystemError("java.lang.NullPointerException\n\tat "
+                                        "Script1$_run_closure1.%s(Script1.groovy)" % name)
+        self.assertRaises(SystemError,self.server_scripts.execute,
+                          self.server.post,self.script,params)
+        stats = self.server_scripts.stats()
+        assert stats['misses'] == 0
+        assert stats['registrations'] == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import unittest
+
+from bulbs.element import Vertex, EdgeProxy
+from bulbs.model import RelationshipProxy
+from bulbs.neo4jserver.index import ExactIndex
+from bulbs.gremlin import Gremlin
+from bulbs.lazy import get_handles, ElementHandle, HANDLES_SCRIPT
+from bulbs.neo4jserver.resource import Neo4jResult
+from bulbs.groovy import GroovyScripts
+from session_tests import FakeResource
+from model_tests import Person, Knows
+
+
+class FakeResponse(object):
+
+    def __init__(self,results):
+        self.results = results
+        self.total_size = len(results)
+
+
+class LazyResource(FakeResource):
+
+    def __init__(self):
+        FakeResource.__init__(self)
+        self.registry.add_class(Person)
+        self.scripts = GroovyScripts()
+        self.requests = []
+        self.people = dict()
+        for _id, name in ((1, "James"), (2, "Julie"), (3, "Jo")):
+            self.people[_id] = dict(element_type="person",name=name,age="3%d" % _id)
+
+    def gremlin_handles(self,script,params=None,fields=None):
+        self.requests.append(("gremlin_handles", script, params))
+        rows = [[1, "vertex", None, None, None], [3, "vertex", None, None, None],
+                [9, "edge", "knows", 1, 3]]
+        if fields is not None:
+            self.fields = fields
+            for row in rows:
+                data = self.people.get(row[0],{})
+                row.append(dict((key, data[key]) for key in fields if key in data))
+        return FakeResponse([Neo4jResult(row) for row in rows])
+
+    def multi_get_vertices(self,id_list):
+        self.requests.append(("multi_get_vertices", id_list))
+        return FakeResponse([self._get_result(_id) for _id in id_list])
+
+    def lookup_vertex(self,index_name,key,value):
+        self.requests.append(("lookup_vertex", index_name, key, value))
+        return FakeResponse([])
+
+    def create_edge(self,outV,label,inV,data={}):
+        self.requests.append(("create_edge", outV, label, inV))
+        uri = "http://localhost/db/data/relationship/9"
+        resp = FakeResponse([])
+        resp.results = Neo4jResult(dict(self=uri,type=label,data=data))
+        return resp
+
+    def multi_get_edges(self,id_list):
+        self.requests.append(("multi_get_edges", id_list))
+        # the edge was deleted after the query
+        return FakeResponse([])
+
+
+class LazyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = LazyResource()
+
+    def test_handles(self):
+        james, jo, knows = Gremlin(self.resource).query("g.v(1).out", {}, lazy=True)
+        assert isinstance(james,ElementHandle)
+        assert (james._id, james._type) == (1, "vertex")
+        assert (knows._label, knows._outV, knows._inV) == ("knows", 1, 3)
+        # nothing is fetched until a property is used
+        assert len(self.resource.requests) == 1
+        assert not james.is_loaded()
+
+    def test_batched_load(self):
+        james, jo, knows = get_handles(self.resource,"g.v(1).out")
+        assert jo.name == "Jo"
+        assert james['name'] == "James"
+        assert isinstance(james.load(),Person)
+        assert self.resource.requests[1:] == [("multi_get_vertices", [1, 3]),
+                                              ("multi_get_edges", [9])]
+        self.assertRaises(LookupError,knows.load)
+
+    def test_set_property(self):
+        james = get_handles(self.resource,"g.v(1)")[0]
+        james.age = 34
+        assert james.load()._data['age'] == 34
+
+    def test_adjacency(self):
+        vertex = Vertex(self.resource)
+        vertex._initialize(self.resource._get_result(1))
+        handles = vertex.outV("knows",lazy=True)
+        method, script, params = self.resource.requests[-1]
+        assert script == self.resource.scripts.get("outV")
+        assert params == dict(_id=1,label="knows")
+        assert len(handles) == 3
+
+    def test_projection(self):
+        james, jo, knows = Gremlin(self.resource).query("g.v(1).out",{},fields=["age"])
+        assert self.resource.fields == ["age", "element_type"]
+        # converted to the Person's property types
+        assert james.age == 31
+        assert jo['age'] == 33
+        assert james.is_loaded("age")
+        assert not james.is_loaded("name")
+        assert len(self.resource.requests) == 1
+        # other fields load the batch
+        assert james.name == "James"
+        assert james.is_loaded()
+        assert len(self.resource.requests) == 3
+
+    def test_adjacency_projection(self):
+        vertex = Vertex(self.resource)
+        vertex._initialize(self.resource._get_result(1))
+        handles = vertex.outV(fields=["name"])
+        assert [handle.name for handle in handles[:2]] == ["James", "Jo"]
+        assert len(self.resource.requests) == 1
+
+    def test_index_lookup(self):
+        index = ExactIndex(self.resource,dict(name="people"))
+        james, jo, knows = index.lookup_lazy(name="James")
+        method, script, params = self.resource.requests[-1]
+        assert params == dict(index_name="people",key="name",value="James")
+        index.lookup_fields(["age"],name="James")
+        assert self.resource.fields == ["age", "element_type"]
+        # properties named lazy or fields are still looked up eagerly
+        index.lookup(fields="x")
+        index.lookup(lazy=True)
+        assert self.resource.requests[-2:] == [("lookup_vertex", "people", "fields", "x"),
+                                               ("lookup_vertex", "people", "lazy", True)]
+
+    def test_handles_as_vertices(self):
+        james, jo, knows = get_handles(self.resource,"g.v(1).out")
+        edges = EdgeProxy(Knows,self.resource)
+        edges.create(james,"knows",jo)
+        relationships = RelationshipProxy(Knows,self.resource)
+        # the handles' IDs are used without loading them
+        assert self.resource.requests[-1] == ("create_edge", 1, "knows", 3)
+        assert relationships._parse_args(Knows(self.resource),(james,jo)) == (1, "knows", 3)
+        assert not james.is_loaded()
+
+    def test_handles_script(self):
+        script = HANDLES_SCRIPT % "g.v(_id).outE(label)"
+        assert script.startswith("_results = { g.v(_id).outE(label) }.call()")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from bulbs.config import Config
+from bulbs.loader import Loader
+
+
+class FakeResult(object):
+
+    def __init__(self,_id):
+        self._id = _id
+
+    def get_id(self):
+        return self._id
+
+
+class FakeResponse(object):
+
+    def __init__(self,results):
+        self.results = results
+        self.total_size = len(results)
+
+
+class FakeTransaction(object):
+
+    def __init__(self):
+        self.operations = []
+
+    def create_vertex(self,data):
+        self.operations.append(("vertex", data))
+
+    def create_edge(self,outV,label,inV,data={}):
+        self.operations.append(("edge", (outV, label, inV, data)))
+
+
+class FakeResource(object):
+
+    def __init__(self):
+        self.config = Config("http://localhost/")
+        self.vertices = dict()
+        self.edges = []
+        self.fail = []
+        self.lock = threading.Lock()
+
+    def create_transaction(self):
+        return FakeTransaction()
+
+    def execute_transaction(self,tx):
+        self.lock.acquire()
+        try:
+            results = []
+            for kind, data in tx.operations:
+                if data in self.fail:
+                    raise SystemError("can't create %s" % kind)
+                if kind == "vertex":
+                    _id = len(self.vertices) + 1
+                    self.vertices[_id] = data
+                else:
+                    _id = len(self.edges)
+                    self.edges.append(data)
+                results.append(FakeResult(_id))
+            return FakeResponse(results)
+        finally:
+            self.lock.release()
+
+
+class LoaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_name = tempfile.mkdtemp()
+        self.map_file = os.path.join(self.dir_name,"map.db")
+        self.resource = FakeResource()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_name)
+
+    def write(self,file_name,content):
+        file_name = os.path.join(self.dir_name,file_name)
+        fout = open(file_name,'w')
+        fout.write(content)
+        fout.close()
+        return file_name
+
+    def get_loader(self):
+        return Loader(self.resource,self.map_file,batch_size=2,max_in_flight=2)
+
+    def test_load(self):
+        people = self.write("people.csv","id,name\n1,James\n2,Julie\n3,Jo\n")
+        knows = self.write("knows.jsonl",'{"outV":1,"inV":2,"label":"knows"}\n\n'
+                                         '{"outV":2,"inV":3,"label":"knows","w":1}\n')
+        loader = self.get_loader()
+        loader.load_vertices(people)
+        loader.load_edges(knows)
+        assert sorted(v['name'] for v in self.resource.vertices.values()) == \
+            ["James", "Jo", "Julie"]
+        james, julie = loader.get_id("1"), loader.get_id("2")
+        assert self.resource.vertices[james] == dict(name="James")
+        assert (james, "knows", julie, {}) in self.resource.edges
+        assert loader.stats.vertices == 3
+        assert loader.stats.edges == 2
+        assert loader.stats.batches == 3
+        assert loader.stats.errors == []
+        loader.close()
+
+    def test_missing_vertex(self):
+        knows = self.write("knows.jsonl",'{"outV":1,"inV":2,"label":"knows"}\n')
+        loader = self.get_loader()
+        loader.load_edges(knows)
+        assert self.resource.edges == []
+        assert isinstance(loader.stats.errors[0][2],LookupError)
+        loader.close()
+
+    def test_resume(self):
+        people = self.write("people.jsonl",'{"id":1,"name":"James"}\n'
+                                           '{"id":2,"name":"Julie"}\n'
+                                           '{"id":3,"name":"Jo"}\n')
+        self.resource.fail.append(dict(name="Jo"))
+        loader = self.get_loader()
+        loader.load_vertices(people)
+        assert len(loader.stats.errors) == 1
+        assert len(self.resource.vertices) == 2
+        loader.close()
+
+        # the second run skips the committed batch and retries the failed one
+        del self.resource.fail[:]
+        loader = self.get_loader()
+        loader.load_vertices(people)
+        assert len(self.resource.vertices) == 3
+        assert loader.stats.skipped == 2
+        assert loader.stats.vertices == 1
+        loader.close()
+
+    def test_duplicate_keys(self):
+        # duplicates in the same batch and in another batch in flight
+        people = self.write("people.csv","id,name\n1,James\n1,Jim\n2,Julie\n1,J\n")
+        loader = self.get_loader()
+        loader.load_vertices(people)
+        assert sorted(v['name'] for v in self.resource.vertices.values()) == \
+            ["James", "Julie"]
+        assert self.resource.vertices[loader.get_id("1")] == dict(name="James")
+        assert loader.stats.skipped == 2
+        assert loader.stats.vertices == 2
+        loader.close()
+
+    def test_claimed_keys_are_released(self):
+        people = self.write("people.csv","id,name\n1,James\n2,Julie\n3,Jo\n"
+                                         "4,Jen\n5,Jay\n5,Joe\n")
+        self.resource.fail.append(dict(name="Jay"))
+        sizes = []
+        loader = self.get_loader()
+        loader.callback = lambda stats: sizes.append(len(loader.claimed))
+        loader.load_vertices(people)
+        # only the keys in batches still in flight are kept in memory
+        assert max(sizes) <= 2
+        assert loader.claimed == set()
+        # the failed batch released its keys, so they load on the next run
+        del self.resource.fail[:]
+        loader.load_vertices(people)
+        assert self.resource.vertices[loader.get_id("5")] == dict(name="Jay")
+        loader.close()
+
+    def test_batch_size_changed(self):
+        people = self.write("people.csv","id,name\n1,James\n")
+        loader = self.get_loader()
+        loader.load_vertices(people)
+        loader.close()
+        loader = Loader(self.resource,self.map_file,batch_size=3)
+        self.assertRaises(ValueError,loader.load_vertices,people)
+        loader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import os
+import unittest
+import tempfile
+
+import httplib2
+import ujson as json
+
+from bulbs.config import Config
+from bulbs.rest import ConnectionPool
+from bulbs.groovy import Script
+from bulbs.metrics import Listener, MetricsCollector, Histogram, prometheus_text
+from bulbs.metrics import RequestEvent
+from bulbs.gremlin import Profiler
+from bulbs.neo4jserver.resource import Neo4jRequest, Neo4jResource
+
+
+class FakeHttp(object):
+
+    # format: responses[uri suffix] = (status, content)
+    responses = {"node/1": (200, '{"self": "http://localhost/node/1", "data": {}}'),
+                 "node/2": (404, '{"message": "not found"}'),
+                 "execute_script": (200, '[{"self": "a"}, {"self": "b"}]')}
+
+    def __init__(self):
+        self.connections = {}
+
+    def request(self,uri,method,body,headers):
+        for suffix, (status, content) in self.responses.items():
+            if uri.endswith(suffix):
+                return httplib2.Response(dict(status=status)), content
+        raise IOError("connection refused")
+
+
+class RecordingListener(Listener):
+
+    def __init__(self):
+        self.events = []
+
+    def before_request(self,event):
+        self.events.append(("before", event.operation))
+
+    def after_request(self,event):
+        self.events.append(("after", event))
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = Config("http://localhost:7474/db/data/")
+        self.listener = RecordingListener()
+        self.collector = MetricsCollector()
+        self.config.listeners.extend([self.listener, self.collector])
+        self.request = Neo4jRequest(self.config,"application/json")
+        self.request.pool = ConnectionPool(FakeHttp)
+
+    def test_event(self):
+        resp = self.request.get("node/1")
+        assert self.listener.events[0] == ("before", "GET node")
+        kind, event = self.listener.events[1]
+        assert (event.method, event.path, event.status) == ("GET", "node/1", 200)
+        assert event.response_bytes == len(FakeHttp.responses["node/1"][1])
+        assert event.result_count == 1
+        assert event.elapsed >= 0 and event.decode_time >= 0
+        assert event.error is None
+
+    def test_errors(self):
+        self.assertRaises(LookupError,self.request.get,"node/2")
+        self.assertRaises(IOError,self.request.get,"relationship/3")
+        statuses = [event.status for kind, event in self.listener.events if kind == "after"]
+        assert statuses == [404, None]
+        assert self.collector.operations["GET node"].errors == 1
+
+    def test_gremlin_operation(self):
+        resource = Neo4jResource(self.config)
+        resource.request = self.request
+        script = Script("g.v(_id).outE()","outE",["_id"],"0" * 40)
+        resp = resource.gremlin(script,dict(_id=1))
+        kind, event = self.listener.events[-1]
+        assert event.operation == "gremlin:outE"
+        assert event.request_bytes > 0
+        assert event.result_count == 2
+        resource.gremlin("g.V")
+        assert self.listener.events[-1][1].operation == "gremlin"
+
+    def test_listener_errors_are_logged(self):
+        self.config.listeners.insert(0,None)
+        resp = self.request.get("node/1")
+        assert resp.results.get_id() == 1
+        assert len(self.listener.events) == 2
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+        assert histogram.counts == [1, 2]
+        assert histogram.count == 3
+        assert histogram.max == 5.0
+
+    def test_prometheus_text(self):
+        self.request.get("node/1")
+        self.request.get("node/1")
+        text = prometheus_text(self.collector)
+        assert '# TYPE bulbs_request_seconds histogram' in text
+        assert 'bulbs_request_seconds_bucket{operation="GET node",le="+Inf"} 2' in text
+        assert 'bulbs_request_seconds_count{operation="GET node"} 2' in text
+        assert 'bulbs_results_total{operation="GET node"} 2' in text
+        assert self.collector.slowest(1)[0][0] == "GET node"
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        config = Config("http://localhost:7474/db/data/")
+        self.profiler = Profiler(slow_threshold=60)
+        config.listeners.append(self.profiler)
+        self.resource = Neo4jResource(config)
+        self.resource.request = Neo4jRequest(config,"application/json")
+        self.resource.request.pool = ConnectionPool(FakeHttp)
+
+    def test_override_scripts(self):
+        fd, file_name = tempfile.mkstemp(suffix=".groovy")
+        os.write(fd,"def my_friends(_id) {\n  g.v(_id).out('knows')\n}\n")
+        os.close(fd)
+        try:
+            self.resource.scripts.override(file_name)
+            script = self.resource.scripts.get("my_friends")
+            self.resource.gremlin(script,dict(_id=1))
+            self.resource.gremlin(script,dict(_id=2))
+            self.resource.gremlin("g.V")
+        finally:
+            os.remove(file_name)
+        stats = dict((row['name'], row) for row in self.profiler.stats())
+        assert stats['my_friends']['calls'] == 2
+        assert stats['my_friends']['results'] == 4
+        assert stats['<inline>']['calls'] == 1
+        assert "my_friends" in self.profiler.to_text()
+        assert len(json.loads(self.profiler.to_json())) == 2
+
+    def test_percentiles(self):
+        for i in range(1,101):
+            event = RequestEvent("POST","execute_script","gremlin:outE",10)
+            event.elapsed = i / 1000.0
+            self.profiler.after_request(event)
+        event = RequestEvent("GET","node/1","GET node",0)
+        self.profiler.after_request(event)
+        row = self.profiler.stats()[0]
+        assert len(self.profiler.stats()) == 1
+        assert (row['p50'], row['p95'], row['p99']) == (0.05, 0.095, 0.099)
+        assert row['request_bytes'] == 1000
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,15 @@ from bulbs.config import Config
 #from bulbs.rest import Request
 
 from bulbs.utils import build_path
+from bulbs.rest import ConnectionPool, CircuitBreaker, CircuitOpenError, \
+    PoolTimeoutError
+from bulbs.metrics import MetricsCollector
+from bulbs.neo4jserver.resource import Neo4jRequest
+import socket
+import threading
+import zlib
+import httplib2
+import ujson as json
 from bulbs.rexster.resource import RexsterRequest
 
 class RestTestCase(unittest.TestCase):
@@ -72,9 +81,224 @@ class RestTestCase(unittest.TestCase):
         assert resp2.results == None
 
 
+class FakeHttp(object):
+
+    def __init__(self):
+        self.connections = {}
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(FakeHttp, max_size=2, idle_timeout=60)
+        self.host = "http://localhost:7474"
+
+    def test_checkout_reuses_idle_connection(self):
+        http1 = self.pool.checkout(self.host)
+        self.pool.checkin(self.host, http1)
+        http2 = self.pool.checkout(self.host)
+        assert http1 is http2
+        assert self.pool.hits == 1
+        assert self.pool.misses == 1
+
+    def test_checkout_is_exclusive(self):
+        http1 = self.pool.checkout(self.host)
+        http2 = self.pool.checkout(self.host)
+        assert http1 is not http2
+        assert self.pool.misses == 2
+
+    def test_hosts_are_pooled_separately(self):
+        http1 = self.pool.checkout(self.host)
+        self.pool.checkin(self.host, http1)
+        http2 = self.pool.checkout("http://localhost:8182")
+        assert http1 is not http2
+
+    def test_max_size(self):
+        connections = [self.pool.checkout(self.host) for i in range(2)]
+        assert self.pool.stats()['active'] == 2
+        for http in connections:
+            self.pool.checkin(self.host, http)
+        stats = self.pool.stats()
+        assert stats['idle'] == 2
+        assert stats['active'] == 0
+
+    def test_checkout_waits_when_full(self):
+        connections = [self.pool.checkout(self.host) for i in range(2)]
+        checked_out = []
+        thread = threading.Thread(target=lambda: 
+                                  checked_out.append(self.pool.checkout(self.host)))
+        thread.start()
+        thread.join(0.1)
+        # the third checkout waits until a connection is returned
+        assert thread.is_alive()
+        assert checked_out == []
+        self.pool.checkin(self.host, connections[0])
+        thread.join(5)
+        assert checked_out == [connections[0]]
+        # other hosts aren't limited by this one
+        self.pool.checkout("http://localhost:8182")
+
+    def test_checkout_timeout(self):
+        self.pool.timeout = 0.05
+        http = self.pool.checkout(self.host)
+        self.pool.checkout(self.host)
+        self.assertRaises(PoolTimeoutError,self.pool.checkout,self.host)
+        # a discarded connection frees its slot
+        self.pool.discard(self.host, http)
+        assert self.pool.checkout(self.host) is not http
+
+    def test_idle_timeout(self):
+        self.pool.idle_timeout = -1
+        http1 = self.pool.checkout(self.host)
+        self.pool.checkin(self.host, http1)
+        http2 = self.pool.checkout(self.host)
+        assert http1 is not http2
+        assert self.pool.hits == 0
+
+
+class ScriptedHttp(FakeHttp):
+
+    # each request pops the next (status, content) or exception
+    script = []
+    requests = []
+
+    def request(self,uri,method,body,headers):
+        ScriptedHttp.requests.append(method)
+        outcome = ScriptedHttp.script.pop(0)
+        if isinstance(outcome,Exception):
+            raise outcome
+        status, content = outcome
+        return httplib2.Response(dict(status=status)), content
+
+
+class RetryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        ScriptedHttp.script = []
+        ScriptedHttp.requests = []
+        self.config = Config("http://localhost:7474/retry-tests/")
+        self.config.retry_backoff = 0.001
+        self.collector = MetricsCollector()
+        self.config.listeners.append(self.collector)
+        self.request = Neo4jRequest(self.config,"application/json")
+        self.request.pool = ConnectionPool(ScriptedHttp)
+        self.request.breaker = CircuitBreaker(threshold=3,reset_timeout=60)
+
+    def test_get_is_retried(self):
+        ScriptedHttp.script = [socket.timeout("timed out"), (503, ""), 
+                               (200, '{"self": "http://localhost/node/1"}')]
+        resp = self.request.get("node/1")
+        assert resp.results.get_id() == 1
+        assert ScriptedHttp.requests == ["GET", "GET", "GET"]
+        assert self.collector.operations["GET node"].retries == 2
+        assert self.request.breaker.failures == 0
+
+    def test_retries_run_out(self):
+        ScriptedHttp.script = [(503, "")] * 3
+        self.assertRaises(IOError,self.request.get,"node/1")
+        assert len(ScriptedHttp.requests) == 3
+
+    def test_post_is_not_retried(self):
+        ScriptedHttp.script = [socket.error("reset")]
+        self.assertRaises(socket.error,self.request.post,"node",dict(name="James"))
+        assert ScriptedHttp.requests == ["POST"]
+
+    def test_client_errors_are_not_retried(self):
+        ScriptedHttp.script = [(404, "")]
+        self.assertRaises(LookupError,self.request.get,"node/1")
+        assert len(ScriptedHttp.requests) == 1
+
+    def test_circuit_breaker(self):
+        self.config.retries = 0
+        ScriptedHttp.script = [(503, "")] * 3
+        for i in range(3):
+            self.assertRaises(IOError,self.request.get,"node/1")
+        assert self.request.breaker.state() == "open"
+        self.assertRaises(CircuitOpenError,self.request.get,"node/1")
+        assert len(ScriptedHttp.requests) == 3
+        assert self.collector.operations["GET node"].rejected == 1
+        # after the reset timeout a trial request closes it again
+        self.request.breaker.opened -= 60
+        ScriptedHttp.script = [(200, '{"self": "http://localhost/node/1"}')]
+        self.request.get("node/1")
+        assert self.request.breaker.state() == "closed"
+
+    def test_error_response_closes_trial(self):
+        self.config.retries = 0
+        ScriptedHttp.script = [(503, "")] * 3
+        for i in range(3):
+            self.assertRaises(IOError,self.request.get,"node/1")
+        self.request.breaker.opened -= 60
+        # the server is back, it just doesn't have the node
+        ScriptedHttp.script = [(404, ""), (200, '{"self": "http://localhost/node/1"}')]
+        self.assertRaises(LookupError,self.request.get,"node/1")
+        assert self.request.breaker.state() == "closed"
+        assert self.request.get("node/1").results.get_id() == 1
+
+    def test_breaker_is_opt_in(self):
+        config = Config("http://localhost:7474/retry-tests/")
+        assert Neo4jRequest(config,"application/json").breaker is None
+        config.breaker_threshold = 3
+        assert Neo4jRequest(config,"application/json").breaker is not None
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(threshold=1,reset_timeout=0)
+        breaker.failure()
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.failure()
+        breaker.reset_timeout = 60
+        assert breaker.state() == "open"
+
+    def test_timeout(self):
+        self.config.timeout = 5
+        http = self.request._create_http()
+        assert http.timeout == 5
+
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = Config("http://localhost:7474/db/data/")
+        self.request = Neo4jRequest(self.config,"application/json")
+        self.params = dict(data=dict(name="James" * 100))
+
+    def test_off_by_default(self):
+        uri, method, body, headers = \
+            self.request._build_request_args("node","POST",self.params)
+        assert 'Content-Encoding' not in headers
+        assert json.loads(body) == self.params
+        # httplib2 negotiates gzip/deflate responses unless told not to
+        assert 'Accept-Encoding' not in headers
+
+    def test_compressed_body(self):
+        self.config.compress_threshold = 100
+        uri, method, body, headers = \
+            self.request._build_request_args("node","POST",self.params)
+        assert headers['Content-Encoding'] == 'gzip'
+        assert len(body) < 100
+        # a wbits of 16 + MAX_WBITS reads a gzip header and trailer
+        assert json.loads(zlib.decompress(body, 16 + zlib.MAX_WBITS)) == self.params
+
+    def test_small_body(self):
+        self.config.compress_threshold = 1000
+        uri, method, body, headers = \
+            self.request._build_request_args("node","POST",dict(name="James"))
+        assert 'Content-Encoding' not in headers
+
+    def test_uncompressed_responses(self):
+        self.config.compress_responses = False
+        uri, method, body, headers = \
+            self.request._build_request_args("node/1","GET",None)
+        assert headers['Accept-Encoding'] == 'identity'
+
+
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(RestTestCase))
+    suite.addTest(unittest.makeSuite(ConnectionPoolTestCase))
+    suite.addTest(unittest.makeSuite(RetryTestCase))
+    suite.addTest(unittest.makeSuite(CompressionTestCase))
     return suite
 
 if __name__ == '__main__':
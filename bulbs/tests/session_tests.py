@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import unittest
+
+from bulbs.config import Config
+from bulbs.registry import Registry
+from bulbs.typesystem import JSONTypeSystem
+from bulbs.neo4jserver.resource import Neo4jResult
+from bulbs.session import Session
+from model_tests import Person, Knows
+
+
+class FakeIndex(object):
+
+    index_name = "people"
+
+
+class FakeRegistry(Registry):
+
+    def get_index(self,index_name):
+        if index_name == "person":
+            return FakeIndex()
+        raise KeyError(index_name)
+
+
+class FakeTransaction(object):
+
+    def __init__(self):
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def _add(self,*operation):
+        self.operations.append(operation)
+        return "{%d}" % (len(self.operations) - 1)
+
+    def create_vertex(self,data):
+        return self._add("create_vertex",data)
+
+    def create_indexed_vertex(self,data,index_name):
+        return self._add("create_indexed_vertex",data,index_name)
+
+    def create_edge(self,outV,label,inV,data={}):
+        return self._add("create_edge",outV,label,inV,data)
+
+    def update_vertex(self,_id,data):
+        return self._add("update_vertex",_id,data)
+
+    def update_edge(self,_id,data):
+        return self._add("update_edge",_id,data)
+
+    def update_indexed_vertex_properties(self,_id,data,index_name):
+        return self._add("update_indexed_vertex_properties",_id,data,index_name)
+
+    def delete_vertex(self,_id):
+        return self._add("delete_vertex",_id)
+
+    def delete_edge(self,_id):
+        return self._add("delete_edge",_id)
+
+
+class FakeResponse(object):
+
+    def __init__(self,results):
+        self.results = results
+
+
+class FakeResource(object):
+
+    def __init__(self):
+        self.config = Config("http://localhost/db/data/")
+        self.type_system = JSONTypeSystem()
+        self.registry = FakeRegistry(self.config)
+        self.cache = None
+        self.transactions = []
+        self.updates = []
+        self.people = dict()
+
+    def create_transaction(self):
+        return FakeTransaction()
+
+    def execute_transaction(self,tx):
+        self.transactions.append(tx)
+        results = []
+        for position, operation in enumerate(tx.operations):
+            if operation[0] == "create_indexed_vertex":
+                uri = "http://localhost/db/data/node/%d" % (position + 10)
+                results.append(Neo4jResult(dict(self=uri,data=operation[1])))
+            elif operation[0] == "create_edge":
+                uri = "http://localhost/db/data/relationship/%d" % (position + 10)
+                results.append(Neo4jResult(dict(self=uri,data=operation[4],type=operation[2])))
+            else:
+                results.append(None)
+        return FakeResponse(results)
+
+    def update_indexed_vertex_properties(self,_id,data,index_name,keys=None):
+        self.updates.append((_id, data, index_name))
+        stored = self.people[_id]
+        for key, value in data.items():
+            if value is None:
+                stored.pop(key,None)
+            else:
+                stored[key] = value
+        return FakeResponse(self._get_result(_id))
+
+    def update_indexed_edge_properties(self,_id,data,index_name,keys=None):
+        self.updates.append((_id, data, index_name))
+        uri = "http://localhost/db/data/relationship/%d" % _id
+        # the server's copy also has a property set by another client
+        data = dict(data,since=2011)
+        return FakeResponse(Neo4jResult(dict(self=uri,type="knows",data=data)))
+
+    def get_person(self,_id,name):
+        self.people[_id] = dict(element_type="person",name=name,tags=["a"])
+        person = Person(self)
+        person._initialize(self._get_result(_id))
+        return person
+
+    def _get_result(self,_id):
+        uri = "http://localhost/db/data/node/%d" % _id
+        return Neo4jResult(dict(self=uri,data=dict(self.people[_id])))
+
+
+class SessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = FakeResource()
+        self.session = Session(self.resource)
+
+    def test_create(self):
+        james = self.session.create(Person,name="James",age=34)
+        julie = self.session.create(Person,name="Julie")
+        self.session.create(Knows,james,julie)
+        self.session.flush()
+        tx = self.resource.transactions[0]
+        # nodes are created first and the edge references them
+        assert [operation[0] for operation in tx.operations] == \
+            ["create_indexed_vertex", "create_indexed_vertex", "create_edge"]
+        assert tx.operations[0][2] == "people"
+        assert tx.operations[2][1:4] == ("{0}", "knows", "{1}")
+        assert james._id == 10
+        assert julie._id == 11
+
+    def test_coalesced_update(self):
+        james = self.session.add(self.resource.get_person(1,"James"))
+        julie = self.session.add(self.resource.get_person(2,"Julie"))
+        james.age = 33
+        james.age = 34
+        self.session.flush()
+        operations = self.resource.transactions[0].operations
+        # only the changed property is sent
+        assert operations == [("update_indexed_vertex_properties", 1, dict(age=34), "people")]
+        assert not self.session.is_dirty(james)
+
+    def test_uses_model_change_tracking(self):
+        james = self.resource.get_person(1,"James")
+        james['tags'].append("b")
+        james['nickname'] = "Jim"
+        self.session.add(james)
+        self.session.flush()
+        operations = self.resource.transactions[0].operations
+        assert operations[0][2] == dict(tags=["a", "b"],nickname="Jim")
+        # saving the model afterwards has nothing to send
+        james.save()
+        assert self.resource.updates == []
+
+    def test_no_changes(self):
+        self.session.add(self.resource.get_person(1,"James"))
+        assert self.session.flush() is None
+        assert self.resource.transactions == []
+
+    def test_delete(self):
+        james = self.session.add(self.resource.get_person(1,"James"))
+        james.age = 34
+        self.session.delete(james)
+        new = self.session.create(Person,name="Jo")
+        self.session.delete(new)
+        self.session.flush()
+        operations = self.resource.transactions[0].operations
+        assert operations == [("delete_vertex", 1)]
+
+    def test_context_manager(self):
+        session = Session(self.resource)
+        session.__enter__()
+        session.create(Person,name="James")
+        session.__exit__(None,None,None)
+        assert len(self.resource.transactions) == 1
+
+
+class ChangeTrackingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = FakeResource()
+        self.james = self.resource.get_person(1,"James")
+
+    def test_no_changes(self):
+        self.james.name = "James"
+        assert self.james._get_changes() == set()
+        self.james.save()
+        assert self.resource.updates == []
+
+    def test_partial_update(self):
+        self.james.age = 34
+        self.james['nickname'] = "Jim"
+        assert self.james._get_changes() == set(["age", "nickname"])
+        self.james.save()
+        assert self.resource.updates == [(1, dict(age=34,nickname="Jim"), "people")]
+        # the element is reloaded from the response and is clean again
+        assert self.james._get_changes() == set()
+
+    def test_removed_property(self):
+        self.james.age = 34
+        self.james.save()
+        self.james.age = None
+        self.james.save()
+        assert self.resource.updates[-1] == (1, dict(age=None), "people")
+
+    def test_relationship_save(self):
+        uri = "http://localhost/db/data/relationship/7"
+        knows = Knows(self.resource)
+        knows._initialize(Neo4jResult(dict(self=uri,type="knows",data=dict(weight=1))))
+        knows['weight'] = 2
+        knows.save()
+        # the relationship's index is used, like a node's
+        assert self.resource.updates == [(7, dict(weight=2), None)]
+        # and it's reloaded from the response
+        assert knows._data['since'] == 2011
+        assert knows._get_changes() == set()
+
+    def test_mutated_in_place(self):
+        self.james['tags'].append("b")
+        assert self.james._get_changes() == set(["tags"])
+
+    def test_copied_on_first_access(self):
+        # loading an element doesn't copy its lists and dicts
+        assert self.james._mutables == {}
+        tags = self.james['tags']
+        assert self.james._mutables == dict(tags=tags)
+        assert self.james._mutables['tags'] is not tags
+        assert self.james._get_changes() == set()
+
+    def test_mutated_through_map(self):
+        self.james.map()['tags'].append("b")
+        assert self.james._get_changes() == set(["tags"])
+
+
+if __name__ == '__main__':
+    unittest.main()
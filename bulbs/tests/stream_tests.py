@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import unittest
+import ujson as json
+
+from bulbs.stream import JSONArrayStream, decode, decode_array, decode_object
+
+
+class StreamTestCase(unittest.TestCase):
+
+    def test_decode_array(self):
+        items = [{'name':'James','tags':['a','b]']},"x,y",None,3.5,[],{}]
+        content = json.dumps(items)
+        stream = decode_array(content)
+        assert len(stream) == len(items)
+        assert list(stream) == items
+
+    def test_empty_array(self):
+        stream = decode_array(" [ ] ")
+        assert len(stream) == 0
+        assert list(stream) == []
+
+    def test_escaped_strings(self):
+        content = r'["quote \" and bracket ]", "backslash \\", {"k":"}"}]'
+        assert list(decode_array(content)) == json.loads(content)
+        assert len(decode_array(content)) == 3
+
+    def test_decode_object(self):
+        content = '{"version":"1.0","results":[{"_id":1},{"_id":2}],"totalSize":2}'
+        decoded = decode_object(content,'results')
+        assert isinstance(decoded['results'],JSONArrayStream)
+        assert list(decoded['results']) == [{'_id':1},{'_id':2}]
+        assert decoded['totalSize'] == 2
+        assert decoded['version'] == "1.0"
+
+    def test_decode_object_without_array(self):
+        content = '{"data":{"results":[1]},"self":"http://localhost/node/1"}'
+        assert decode_object(content,'results') == json.loads(content)
+
+    def test_decode_threshold(self):
+        content = '[1,2,3]'
+        assert decode(content,threshold=None) == [1,2,3]
+        assert decode(content,threshold=100) == [1,2,3]
+        assert isinstance(decode(content,threshold=0),JSONArrayStream)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(StreamTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
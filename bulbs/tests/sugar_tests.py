@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import time
+import threading
+import unittest
+
+from bulbs.element import Vertex
+from bulbs.sugar import ElementSequence
+from bulbs.neo4jserver.resource import Neo4jResult
+from session_tests import FakeResource
+
+
+class FakeRangeResponse(object):
+
+    def __init__(self,results):
+        self.results = iter(results)
+        self.total_size = len(results)
+
+
+class PagedResource(FakeResource):
+
+    def __init__(self,count):
+        FakeResource.__init__(self)
+        self.count = count
+        self.ranges = []
+        self.lock = threading.Lock()
+
+    def get_vertices_range(self,start,end):
+        self.lock.acquire()
+        try:
+            self.ranges.append((start, end))
+        finally:
+            self.lock.release()
+        results = [Neo4jResult(dict(self="http://localhost/db/data/node/%d" % _id,data={}))
+                   for _id in range(start,min(end+1,self.count))]
+        return FakeRangeResponse(results)
+
+
+class ElementSequenceTestCase(unittest.TestCase):
+
+    def get_sequence(self,count,page_size=3):
+        self.resource = PagedResource(count)
+        return ElementSequence(self.resource,self.resource.get_vertices_range,page_size)
+
+    def test_pages(self):
+        sequence = self.get_sequence(7)
+        ids = [result.get_id() for result in sequence.iter_results()]
+        assert ids == range(7)
+        assert self.resource.ranges == [(0, 2), (3, 5), (6, 8)]
+
+    def test_ends_on_empty_page(self):
+        # a full last page needs one more request to find the end
+        sequence = self.get_sequence(6)
+        assert len(list(sequence.iter_results())) == 6
+        assert self.resource.ranges == [(0, 2), (3, 5), (6, 8)]
+        sequence = self.get_sequence(0)
+        assert list(sequence.iter_results()) == []
+        assert self.resource.ranges == [(0, 2)]
+
+    def test_page_size_override(self):
+        sequence = self.get_sequence(5)
+        list(sequence.iter_results(page_size=10))
+        assert self.resource.ranges == [(0, 9)]
+
+    def test_prefetch(self):
+        sequence = self.get_sequence(8)
+        results = sequence.iter_results(prefetch=True)
+        assert results.next().get_id() == 0
+        # the next page is requested while the first one is being used
+        deadline = time.time() + 5
+        while len(self.resource.ranges) < 2 and time.time() < deadline:
+            time.sleep(0.001)
+        assert self.resource.ranges == [(0, 2), (3, 5)]
+        ids = [0] + [result.get_id() for result in results]
+        assert ids == range(8)
+        assert self.resource.ranges == [(0, 2), (3, 5), (6, 8)]
+
+    def test_prefetch_error(self):
+        sequence = self.get_sequence(8)
+        def get_range(start,end):
+            if start > 0:
+                raise IOError("connection reset")
+            return self.resource.get_vertices_range(start,end)
+        sequence.get_range = get_range
+        results = sequence.iter_results(prefetch=True)
+        assert [results.next() for i in range(3)]
+        self.assertRaises(IOError,results.next)
+
+    def test_elements(self):
+        sequence = self.get_sequence(4)
+        vertices = list(sequence)
+        assert [vertex._id for vertex in vertices] == range(4)
+        assert isinstance(vertices[0],Vertex)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(ElementSequenceTestCase))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 James Thornton (http://jamesthornton.com)
+# BSD License (see LICENSE for details)
+#
+import copy
+import unittest
+
+from bulbs.model import Node
+from bulbs.property import Property, String, Integer, Long, Float, List, Dictionary
+from bulbs.typesystem import JSONTypeSystem, ConverterPlan
+from session_tests import FakeResource
+
+
+class Thing(Node):
+
+    element_type = "thing"
+
+    name = Property(String)
+    count = Property(Integer, default=3)
+    total = Property(Long)
+    score = Property(Float, default="1.5")
+    tags = Property(List, default=["a"])
+    extra = Property(Dictionary)
+
+
+# data as it may come back from the database, including bad values
+RECORDS = [dict(),
+           dict(name="James", count=1, total=2, score=0.5, tags=["b"], extra={"a":1}),
+           dict(name=None, count=None, total=None, score=None, tags=None, extra=None),
+           dict(name=u"Julie", count="7", total="8", score="2", tags=("c",)),
+           dict(name=5, count="seven", total=[], score="x", tags=5, extra="y"),
+           dict(name=u"caf\xe9", other="kept")]
+
+
+class ConverterPlanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = FakeResource()
+
+    def test_same_as_property_data(self):
+        plan = self.resource.type_system.get_plan(Thing)
+        for record in RECORDS:
+            thing = Thing(self.resource)
+            thing._data = copy.deepcopy(record)
+            thing._set_default_values()
+            thing._set_property_data()
+            data = plan.convert(copy.deepcopy(record))
+            assert data == thing._data, (record, data, thing._data)
+            for key, value in data.items():
+                assert type(value) is type(thing._data[key])
+
+    def test_plan_is_cached(self):
+        type_system = self.resource.type_system
+        plan = type_system.get_plan(Thing)
+        assert isinstance(plan,ConverterPlan)
+        assert type_system.get_plan(Thing) is plan
+        assert JSONTypeSystem().get_plan(Thing) is not plan
+
+    def test_convert_all(self):
+        plan = self.resource.type_system.get_plan(Thing)
+        data_list = plan.convert_all([dict(count="1"), dict(count="2")])
+        assert [data['count'] for data in data_list] == [1, 2]
+        assert data_list[0]['tags'] == ["a"]
+        # mutable defaults aren't shared between elements
+        assert data_list[0]['tags'] is not data_list[1]['tags']
+
+
+if __name__ == '__main__':
+    unittest.main()
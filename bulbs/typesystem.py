@@ -7,7 +7,10 @@
 Bulbs supports plugabble type systems.
 
 """
-from bulbs.property import String, Integer, Float, List, Dictionary, Null
+from bulbs.property import String, Integer, Long, Float, List, Dictionary, Null
+
+import logging
+log = logging.getLogger(__name__)
 
 
 class TypeSystem(object):
@@ -36,6 +39,9 @@ class TypeSystem(object):
         # You don't need the DB-type to Class mappings because for to_python() 
         # we get the DataType class from the property_instance in Model.
 
+        # Converter plans for Model classes, format: Model class -> ConverterPlan
+        self.plans = dict()
+
     def to_db(self,value):
         """Returns a database-property value coerced to its database type."""
         python_type = type(value)
@@ -48,6 +54,81 @@ class TypeSystem(object):
         datatype_class = property_instance.datatype
         return datatype_class.to_python(self,value)
 
+    def get_plan(self,model_class):
+        """Returns the ConverterPlan for the Model class, compiling it once."""
+        plan = self.plans.get(model_class)
+        if plan is None:
+            plan = ConverterPlan(self,model_class._properties)
+            self.plans[model_class] = plan
+        return plan
+
+    def get_python_converter(self,datatype_class):
+        """Returns a function that converts a database value to the datatype."""
+        converters = {String:self.python.to_string, 
+                      Integer:self.python.to_integer,
+                      Long:self.python.to_long, 
+                      Float:self.python.to_float,
+                      List:self.python.to_list, 
+                      Dictionary:self.python.to_dictionary, 
+                      Null:self.python.to_null}
+        converter = converters.get(datatype_class)
+        if converter is None:
+            # a custom DataType, so go through its to_python()
+            converter = lambda value: datatype_class.to_python(self,value)
+        return converter
+
+
+class ConverterPlan(object):
+    """
+    Precompiled conversions from database values to a Model's Property types.
+
+    Applying the plan to an element's data dict has the same result as 
+    Model._set_default_values() followed by Model._set_property_data(), 
+    without going through getattr/setattr and the type system's dispatch 
+    for every property of every element.
+
+    :param type_system: The TypeSystem object.
+    :param properties: Dict of the Model class's Property instances.
+
+    """
+
+    def __init__(self,type_system,properties):
+        # format: steps = [(key, converter, python_type, default), ...]
+        self.steps = []
+        for key, property_instance in properties.items():
+            converter = type_system.get_python_converter(property_instance.datatype)
+            python_type = property_instance.datatype.python_type
+            default = property_instance.default or None
+            if default is not None:
+                default = property_instance.coerce_value(key,default)
+            self.steps.append((key, converter, python_type, default))
+
+    def convert(self,data,keys=None):
+        """
+        Converts the property values in the data dict in place. If keys is 
+        given, only those properties are converted, e.g. for a projection.
+        """
+        for key, converter, python_type, default in self.steps:
+            if keys is not None and key not in keys:
+                continue
+            value = data[key] if key in data else default
+            try:
+                value = converter(value)
+                if value is not None and type(value) is not python_type:
+                    value = python_type(value)
+            except Exception, e:
+                log.error("Setting property '%s' with value '%s': %s", key, value, e)
+                value = None
+            data[key] = value
+        return data
+
+    def convert_all(self,data_list):
+        """Converts the property values in each data dict in place."""
+        convert = self.convert
+        for data in data_list:
+            convert(data)
+        return data_list
+
 
 class Converter(object):
     """Abstract base class of conversion methods called by DataType classes."""
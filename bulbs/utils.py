@@ -91,6 +91,12 @@ def quote(value):
         value = ""
     return value
 
+def chunks(items,size):
+    # yield successive lists of at most size items
+    items = list(items)
+    for start in xrange(0,len(items),size):
+        yield items[start:start+size]
+
 def get_file_path(dir_name,file_name):
     return os.path.normpath(os.path.join(dir_name,file_name))
 
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    bench-codec
+    ~~~~~~~~~~~
+
+    Times encoding and decoding Neo4j Server node payloads with each 
+    installed JSON backend, whole and streamed a result at a time.
+
+    Usage: python scripts/bench-codec.py [nodes] [iterations]
+
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bulbs.codec import BACKENDS, load_codec
+from bulbs.stream import decode
+
+
+def get_node(i):
+    uri = "http://localhost:7474/db/data/node/%d" % i
+    data = dict(element_type="person", name=u"Jos\xe9 %d" % i, 
+                email="person%d@example.com" % i, age=20 + i % 60, 
+                score=i / 7.0, active=i % 2 == 0, tags=["friend", "beta"],
+                bio="Likes graphs, hiking, and coffee. " * 3)
+    return {"self": uri, "data": data, "properties": uri + "/properties",
+            "outgoing_relationships": uri + "/relationships/out",
+            "incoming_relationships": uri + "/relationships/in",
+            "all_relationships": uri + "/relationships/all",
+            "traverse": uri + "/traverse/{returnType}",
+            "extensions": {}}
+
+def get_codecs():
+    codecs = []
+    for name, loader in BACKENDS:
+        try:
+            codecs.append(load_codec(name))
+        except ImportError:
+            print "%-12s not installed" % name
+    return codecs
+
+def timed(function, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        function()
+    return (time.time() - start) / iterations * 1000
+
+def bench(codec, nodes, iterations):
+    content = codec.dumps(nodes)
+    dumps = timed(lambda: codec.dumps(nodes), iterations)
+    loads = timed(lambda: codec.loads(content), iterations)
+    streamed = timed(lambda: list(decode(content, threshold=0, codec=codec)), iterations)
+    print "%-12s %8d %10.2f %10.2f %10.2f" % (codec.name, len(content), dumps, 
+                                             loads, streamed)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    nodes = [get_node(i) for i in xrange(count)]
+    codecs = get_codecs()
+    print "%d nodes, ms per call" % count
+    print "%-12s %8s %10s %10s %10s" % ("backend", "bytes", "dumps", "loads", 
+                                       "streamed")
+    for codec in codecs:
+        bench(codec, nodes, iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    bench-compression
+    ~~~~~~~~~~~~~~~~~
+
+    Shows the bytes on the wire and the CPU time of gzipping typical request
+    bodies and responses at different compression levels.
+
+    Usage: python scripts/bench-compression.py [iterations]
+
+"""
+import os
+import sys
+import time
+import zlib
+import ujson as json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bulbs.rest import gzip_compress
+from bulbs.neo4jserver.resource import Neo4jResource
+from bulbs.config import Config
+
+
+def get_vertex_data(i):
+    return dict(element_type="person", name="Person %d" % i, 
+                email="person%d@example.com" % i, age=20 + i % 60,
+                city="Dallas", bio="Likes graphs, hiking, and coffee. " * 5,
+                tags=["friend", "customer", "beta"], score=i / 7.0)
+
+def get_payloads():
+    resource = Neo4jResource(Config("http://localhost:7474/db/data/"))
+    script = resource.scripts.get("create_indexed_vertex")
+    create = dict(script=str(script), params=dict(data=get_vertex_data(1),
+                  index_name="people", keys=None))
+    nodes = []
+    for i in xrange(1000):
+        uri = "http://localhost:7474/db/data/node/%d" % i
+        nodes.append(dict(self=uri, data=get_vertex_data(i),
+                          outgoing_relationships=uri + "/relationships/out",
+                          incoming_relationships=uri + "/relationships/in",
+                          properties=uri + "/properties"))
+    return [("create_indexed_vertex request", json.dumps(create)),
+            ("100 node response", json.dumps(nodes[:100])),
+            ("1000 node response", json.dumps(nodes))]
+
+def bench(name, data, level, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        compressed = gzip_compress(data, level)
+    compress_time = (time.time() - start) / iterations
+    start = time.time()
+    for i in xrange(iterations):
+        # what the client does to decode a gzip response
+        zlib.decompress(compressed, 16 + zlib.MAX_WBITS)
+    decompress_time = (time.time() - start) / iterations
+    print "%-30s %5d %9d %9d %7.1f%% %9.3f %9.3f" % (name, level, len(data), 
+        len(compressed), 100.0 * len(compressed) / len(data), 
+        compress_time * 1000, decompress_time * 1000)
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print "%-30s %5s %9s %9s %8s %9s %9s" % ("payload", "level", "bytes", 
+        "gzipped", "ratio", "gzip ms", "gunzip ms")
+    for name, data in get_payloads():
+        for level in (1, 6, 9):
+            bench(name, data, level, iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    bench-hydrate
+    ~~~~~~~~~~~~~
+
+    Times initializing Node models from result dicts with the per-property 
+    getattr/setattr path versus the type system's precompiled ConverterPlan,
+    and, for wide nodes with large list and dict properties, with and 
+    without copying those values up front for change tracking.
+
+    Usage: python scripts/bench-hydrate.py [elements] [iterations]
+
+"""
+import os
+import sys
+import time
+import copy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bulbs.config import Config
+from bulbs.model import Node
+from bulbs.property import Property, String, Integer, Long, Float, List, Dictionary
+from bulbs.element import Vertex
+from bulbs.neo4jserver.resource import Neo4jResource, Neo4jResult
+
+
+class Person(Node):
+
+    element_type = "person"
+
+    name = Property(String)
+    email = Property(String)
+    age = Property(Integer)
+    visits = Property(Long)
+    score = Property(Float)
+    tags = Property(List)
+
+
+class WidePerson(Person):
+
+    prefs = Property(Dictionary)
+
+
+def get_results(elements,wide=False):
+    results = []
+    for i in xrange(elements):
+        uri = "http://localhost:7474/db/data/node/%d" % i
+        data = dict(element_type="person", name="person %d" % i, 
+                    email="person%d@example.com" % i, age=i % 90, 
+                    visits=i, score=i / 3.0, tags=["a", "b"])
+        if wide:
+            data['tags'] = ["tag %d" % j for j in xrange(200)]
+            data['prefs'] = dict(("pref %d" % j, j) for j in xrange(50))
+        results.append(dict(self=uri,data=data))
+    return results
+
+def initialize_per_property(node,result):
+    # the path Node._initialize used before ConverterPlan
+    Vertex._initialize(node,result)
+    element_type = node._get_element_type()
+    node._set_default_values()
+    node._set_property_data()
+    node._index = node._get_index(element_type)
+    node._reset_changes()
+
+def initialize_with_plan(node,result):
+    node._initialize(result)
+
+def initialize_with_eager_copy(node,result):
+    # the copies _reset_changes took of every list and dict before they 
+    # were taken on first access
+    node._initialize(result)
+    for key, value in node._data.items():
+        if isinstance(value,(list,dict)):
+            node._mutables[key] = copy.deepcopy(value)
+
+def bench(name, initialize, resource, raw, iterations, model_class=Person):
+    elapsed = 0
+    for i in xrange(iterations):
+        results = [Neo4jResult(r) for r in copy.deepcopy(raw)]
+        start = time.time()
+        for result in results:
+            initialize(model_class(resource),result)
+        elapsed += time.time() - start
+    per_element = elapsed / (iterations * len(raw)) * 1000000
+    print "%-14s %8d elements %10.2f us per element" % (name, len(raw), per_element)
+
+def main():
+    elements = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    resource = Neo4jResource(Config("http://localhost:7474/db/data/"))
+    raw = get_results(elements)
+    bench("per-property", initialize_per_property, resource, raw, iterations)
+    bench("plan", initialize_with_plan, resource, raw, iterations)
+    wide = get_results(elements,wide=True)
+    bench("wide, eager", initialize_with_eager_copy, resource, wide, iterations, WidePerson)
+    bench("wide, lazy", initialize_with_plan, resource, wide, iterations, WidePerson)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    bench-memory
+    ~~~~~~~~~~~~
+
+    Measures the memory used per hydrated Node model and per Neo4jResult,
+    for narrow nodes and for wide nodes with large list and dict properties.
+
+    Uses tracemalloc when it's available; otherwise the size is the sum of 
+    sys.getsizeof() over the objects reachable from each element, not 
+    counting the objects shared by all elements (the resource, classes, etc).
+
+    Usage: python scripts/bench-memory.py [elements]
+
+"""
+import os
+import sys
+import gc
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bulbs.config import Config
+from bulbs.model import Node
+from bulbs.property import Property, String, Integer, List, Dictionary
+from bulbs.neo4jserver.resource import Neo4jResource, Neo4jResult
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class Person(Node):
+
+    element_type = "person"
+
+    name = Property(String)
+    age = Property(Integer)
+
+
+class WidePerson(Person):
+
+    tags = Property(List)
+    prefs = Property(Dictionary)
+
+
+def get_raw(elements,wide=False):
+    raw = []
+    for i in xrange(elements):
+        uri = "http://localhost:7474/db/data/node/%d" % i
+        data = dict(element_type="person", name="person %d" % i, age=i % 90)
+        if wide:
+            data['tags'] = ["tag %d" % j for j in xrange(200)]
+            data['prefs'] = dict(("pref %d" % j, j) for j in xrange(50))
+        raw.append(dict(self=uri,data=data))
+    return raw
+
+def get_size(obj, shared, seen):
+    """Returns the size of obj and the objects it references."""
+    if id(obj) in seen or id(obj) in shared or isinstance(obj,(type,types.ModuleType)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj,dict):
+        for key, value in obj.items():
+            size += get_size(key,shared,seen) + get_size(value,shared,seen)
+    elif isinstance(obj,(list,tuple,set,frozenset)):
+        for item in obj:
+            size += get_size(item,shared,seen)
+    if hasattr(obj,"__dict__"):
+        size += get_size(obj.__dict__,shared,seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls,"__slots__",()):
+            if hasattr(obj,name):
+                size += get_size(getattr(obj,name),shared,seen)
+    return size
+
+def measure(build, elements, shared):
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        objects = build()
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    else:
+        objects = build()
+        seen = set()
+        size = sum(get_size(obj,shared,seen) for obj in objects)
+    return size / float(elements)
+
+def report(label, resource, raw, model_class):
+    elements = len(raw)
+    # the raw dicts are what the response decoder allocates either way
+    shared = set(id(obj) for obj in (resource, resource.config, resource.registry,
+                                     resource.type_system))
+    seen = set()
+    raw_size = sum(get_size(r,shared,seen) for r in raw) / float(elements)
+    shared.update(id(r) for r in raw)
+    shared.update(id(r['data']) for r in raw)
+    shared.update(id(value) for r in raw for value in r['data'].values())
+    shared.update(id(r['self']) for r in raw)
+
+    def build_results():
+        return [Neo4jResult(r) for r in raw]
+
+    def build_elements():
+        elements = []
+        for r in raw:
+            person = model_class(resource)
+            person._initialize(Neo4jResult(r))
+            elements.append(person)
+        return elements
+
+    print label
+    print "  %-12s %8.1f bytes per element" % ("raw dicts", raw_size)
+    print "  %-12s %8.1f bytes per element" % ("results", measure(build_results,elements,shared))
+    print "  %-12s %8.1f bytes per element" % ("nodes", measure(build_elements,elements,shared))
+
+def main():
+    elements = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    resource = Neo4jResource(Config("http://localhost:7474/db/data/"))
+    report("narrow", resource, get_raw(elements), Person)
+    report("wide", resource, get_raw(elements,wide=True), WidePerson)
+
+if __name__ == '__main__':
+    main()
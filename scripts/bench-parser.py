@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    bench-parser
+    ~~~~~~~~~~~~
+
+    Times parsing generated Groovy script files with 1k methods (and more), 
+    bypassing the script catalog cache.
+
+    Usage: python scripts/bench-parser.py [methods] [iterations]
+
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bulbs.groovy import Parser
+
+
+METHOD = """// method %(i)d
+def method_%(i)d(_id,label) {
+  vertex = g.v(_id)
+  if (label == null)
+    vertex.outE()
+  else
+    vertex.outE(label)
+}
+
+"""
+
+def write_file(methods):
+    fd, file_name = tempfile.mkstemp(suffix=".groovy")
+    fout = os.fdopen(fd, 'w')
+    for i in xrange(methods):
+        fout.write(METHOD % dict(i=i))
+    fout.close()
+    return file_name
+
+def bench(methods, iterations):
+    file_name = write_file(methods)
+    try:
+        start = time.time()
+        for i in xrange(iterations):
+            parsed = Parser(file_name).get_methods()
+        elapsed = time.time() - start
+    finally:
+        os.remove(file_name)
+    assert len(parsed) == methods
+    print "%6d methods %10.2f ms per parse" % (methods, elapsed / iterations * 1000)
+
+def main():
+    methods = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for size in (methods, methods * 10):
+        bench(size, iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    bench-startup
+    ~~~~~~~~~~~~~
+
+    Times creating Neo4jResource and RexsterResource objects with the 
+    script catalog parsed from scratch, loaded from the on-disk cache, 
+    and shared in memory. No database connection is needed.
+
+    Usage: python scripts/bench-startup.py [iterations]
+
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bulbs import groovy
+from bulbs.config import Config
+from bulbs.neo4jserver.resource import Neo4jResource
+from bulbs.rexster.resource import RexsterResource
+
+
+def create_resources():
+    # get() forces the lazy catalogs to load
+    Neo4jResource(Config("http://localhost:7474/db/data/")).scripts.get("outE")
+    RexsterResource(Config("http://localhost:8182/graphs/tinkergraph")).scripts.get("outE")
+
+def parse_every_time():
+    groovy.CATALOG_DIR = None
+    groovy.clear_catalogs()
+    create_resources()
+
+def load_from_disk():
+    groovy.clear_catalogs()
+    create_resources()
+
+def shared_in_memory():
+    create_resources()
+
+def bench(name, func, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        func()
+    elapsed = time.time() - start
+    print "%-18s %8.3f ms per Neo4j + Rexster resource pair" % \
+        (name, elapsed / iterations * 1000)
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    catalog_dir = tempfile.mkdtemp()
+    try:
+        bench("parse", parse_every_time, iterations)
+        groovy.CATALOG_DIR = catalog_dir
+        create_resources()
+        bench("disk cache", load_from_disk, iterations)
+        bench("memory cache", shared_in_memory, iterations)
+    finally:
+        shutil.rmtree(catalog_dir)
+
+if __name__ == '__main__':
+    main()